@@ -41,12 +41,92 @@ class Settings(BaseSettings):
     DEEPSEEK_BASE_URL: str = "https://api.deepseek.com/v1"
     DASHSCOPE_API_KEY: str = ""
 
-    # 项目数据文件路径
+    # LLM HTTP 连接池（每个提供商一个长连接客户端）
+    LLM_HTTP2: bool = True  # 提供商支持时启用 HTTP/2（需安装 h2）
+    LLM_HTTP_MAX_CONNECTIONS: int = 20
+    LLM_HTTP_MAX_KEEPALIVE: int = 10
+    LLM_HTTP_KEEPALIVE_EXPIRY: float = 60.0  # 空闲连接保持秒数
+    LLM_HTTP_CONNECT_TIMEOUT: float = 10.0
+    LLM_REQUEST_TIMEOUT: float = 60.0  # 单次请求超时秒数
+
+    # 结构化输出
+    LLM_JSON_MODE: bool = True  # 需要 JSON 的调用使用提供商的 JSON 输出模式（response_format=json_object），不支持时自动退回普通模式
+    LLM_MAX_CONTINUATIONS: int = 1  # 输出达到 max_tokens 被截断时自动续写的次数
+
+    # LLM 故障转移
+    LLM_FALLBACK_PROVIDERS: str = ""  # 备用提供商，逗号分隔，按顺序故障转移，如 "dashscope,deepseek"
+    LLM_MAX_RETRIES: int = 2  # 429/5xx/连接失败时同一提供商的重试次数
+    LLM_RETRY_BASE_DELAY: float = 0.5  # 指数退避基数（秒），实际等待时间带随机抖动
+    LLM_RETRY_MAX_DELAY: float = 8.0
+    LLM_CIRCUIT_FAILURE_THRESHOLD: int = 3  # 连续失败多少次后熔断
+    LLM_CIRCUIT_COOLDOWN_SECONDS: float = 60.0  # 熔断冷却时间
+
+    # 请求限速（令牌桶，按提供商分别限速，0 表示不限）：交互式请求（解析预览）优先于批量任务
+    LLM_RATE_RPM: int = 60  # 每个 LLM 提供商每分钟请求数
+    LLM_RATE_TPM: int = 100000  # 每个 LLM 提供商每分钟 token 数（按估算预留，响应后按实际用量结算）
+    LLM_RATE_OVERRIDES: str = ""  # 按提供商覆盖，逗号分隔，如 "deepseek=120/200000,dashscope=300/0"
+    EMBEDDING_RATE_RPM: int = 300
+    EMBEDDING_RATE_TPM: int = 500000
+    LLM_RATE_BURST_SECONDS: float = 5.0  # 桶容量 = 每分钟额度 × 该秒数 / 60，允许的瞬时突发
+
+    # 模型级联：指定调用位置先用快速模型，输出无法通过校验（JSON 无效、项目不在已知列表）时再用默认模型重做
+    LLM_CASCADE_CALL_SITES: str = ""  # 启用级联的调用位置，逗号分隔，如 "report_parse,report_parse_lines,project_match"；为空不启用
+    # 各提供商的快速模型，逗号分隔，如 "dashscope=qwen-flash"（qwen-flash 效果不稳定，需自行评估后显式开启）；
+    # 首选提供商没有配置时不启用级联
+    LLM_CASCADE_FAST_MODELS: str = ""
+
+    # LLM 响应缓存
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_TTL_HOURS: int = 168  # 7天
+    LLM_CACHE_MAX_ENTRIES: int = 5000
+
+    # LLM 调用遥测
+    LLM_TELEMETRY_ENABLED: bool = True
+    LLM_TELEMETRY_BUFFER_SIZE: int = 1000  # 内存中保留的最近调用条数
+    LLM_TELEMETRY_RETENTION_DAYS: int = 30  # 数据库记录保留天数
+
+    # Prompt 项目列表裁剪：只详细列出与文本相关的 top-k 个项目，其余仅列名称
+    PROMPT_PROJECT_PRUNING: bool = False
+    PROMPT_PROJECT_TOP_K: int = 15
+
+    # 多份周报批量解析（补录、批量重新解析）
+    REPORT_BATCH_TOKEN_BUDGET: int = 3000  # 单批周报正文的估算 token 上限（不含项目列表）
+    REPORT_BATCH_MAX_REPORTS: int = 10  # 单批最多周报数
+    REPORT_BATCH_MAX_OUTPUT_TOKENS: int = 8000  # 批量解析的输出 token 上限
+    REPORT_BATCH_CONCURRENCY: int = 3  # 同时进行的批次数
+
+    # 周报修改后的增量解析：只把新增/修改的行交给 LLM，未改动行的条目（含手动修正）保留
+    REPORT_INCREMENTAL_PARSE: bool = True
+    REPORT_INCREMENTAL_MAX_CHANGED_RATIO: float = 0.6  # 改动行占比超过该值时改为全量解析
+
+    # 规则预解析：只命中一个项目别名的行直接标注项目，其余行再交给 LLM
+    REPORT_RULE_PREPARSE: bool = True
+
+    # 工作行 → 项目 记忆（由用户确认的条目学习，解析时优先于规则和 LLM）
+    LINE_MEMO_ENABLED: bool = True
+    LINE_MEMO_MIN_CONFIRMATIONS: int = 2  # 至少被确认多少次才直接采用
+    LINE_MEMO_MIN_SHARE: float = 0.8  # 同一行有多个项目记录时，采用项目的确认次数占比下限
+
+    # 后台解析任务队列
+    PARSE_JOB_WORKERS: int = 2  # 并发执行的解析任务数
+    PARSE_JOB_DEBOUNCE_SECONDS: float = 5.0  # 同一报告连续修改时，最后一次修改后等待多久再解析
+    PARSE_JOB_MAX_ATTEMPTS: int = 3
+    PARSE_JOB_RETRY_BASE_DELAY: float = 30.0  # 重试退避基数（秒）
+    PARSE_JOB_POLL_INTERVAL: float = 2.0  # 空闲时轮询间隔（秒）
+    PARSE_JOB_RETENTION_DAYS: int = 7  # 已结束任务的保留天数
+    PARSE_JOB_HEARTBEAT_INTERVAL: float = 30.0  # 执行中任务的心跳间隔（秒）
+    PARSE_JOB_STALE_SECONDS: float = 180.0  # 心跳超过该时间未更新的执行中任务视为所属进程已退出，重新排队
+
+    # 项目数据文件路径（项目知识库已存入数据库，该文件仅用于首次导入；项目向量文件与其同目录）
     PROJECTS_DATA_PATH: str = "./data/projects.json"
 
     # Embedding 模型配置
     EMBEDDING_MODEL: str = "text-embedding-v3"  # text-embedding-v4 或 text-embedding-v3
     EMBEDDING_DIMENSION: int = 1024  # 向量维度，v4支持64-2048，v3固定1024
+    EMBEDDING_CONCURRENCY: int = 4  # 批量向量化时的最大并发批次数
+    EMBEDDING_BATCH_RETRIES: int = 2  # 单批失败重试次数
+    EMBEDDING_CACHE_ENABLED: bool = True  # 文本向量持久化缓存
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 20000
 
     class Config:
         env_file = ".env"
@@ -1,5 +1,7 @@
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.orm import DeclarativeBase, sessionmaker
 from app.config import get_settings
 
 settings = get_settings()
@@ -7,6 +9,18 @@ settings = get_settings()
 engine = create_async_engine(settings.DATABASE_URL, echo=settings.DEBUG)
 async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+# 同步引擎：供同步调用路径（项目知识库的增删改查）使用，与异步引擎访问同一数据库
+# 会阻塞调用线程，只能在线程池中使用，不要在事件循环上直接调用
+_sync_url = make_url(settings.DATABASE_URL)
+_sync_url = _sync_url.set(drivername=_sync_url.get_backend_name())
+sync_engine = create_engine(
+    _sync_url,
+    echo=settings.DEBUG,
+    # SQLite 写锁被异步引擎占用时等待而不是立即报错
+    connect_args={"timeout": 30} if _sync_url.get_backend_name() == "sqlite" else {}
+)
+sync_session = sessionmaker(sync_engine, expire_on_commit=False)
+
 
 class Base(DeclarativeBase):
     pass
@@ -1,8 +1,9 @@
+import asyncio
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.database import init_db, async_session
-from app.routers import auth_router, reports_router, summary_router, admin_router, projects_router, project_suggest_router, daily_reports_router, tasks_router
+from app.routers import auth_router, reports_router, summary_router, admin_router, projects_router, project_suggest_router, daily_reports_router, tasks_router, llm_admin_router, parse_jobs_router
 from app.tasks.scheduler import setup_scheduler
 from app.models.user import User, UserRole
 from app.models import holiday  # 确保节假日表被创建
@@ -30,10 +31,22 @@ async def lifespan(app: FastAPI):
                 db.add(admin)
                 await db.commit()
 
+    # 在线程中加载项目知识库快照（首次启动时从 projects.json 导入），之后读取快照不访问数据库
+    from app.services.llm_service import get_project_extractor
+    await asyncio.to_thread(get_project_extractor().knowledge_base)
+
     # 初始化节假日数据（从API获取并缓存到数据库）
     from app.services.holiday_service import init_holiday_data
     await init_holiday_data()
 
+    # 创建 LLM 共享 HTTP 连接池
+    from app.services.http_client import init_http_clients, close_http_clients
+    await init_http_clients()
+
+    # 启动后台解析任务队列
+    from app.services.parse_job_service import get_parse_job_queue
+    await get_parse_job_queue().start()
+
     # 启动定时任务
     scheduler = setup_scheduler()
     scheduler.start()
@@ -42,6 +55,13 @@ async def lifespan(app: FastAPI):
 
     # 关闭定时任务
     scheduler.shutdown()
+    # 停止解析任务 worker（执行中的任务下次启动时恢复）
+    await get_parse_job_queue().stop()
+    # 写入尚未落库的 LLM 调用记录
+    from app.services.llm_telemetry import get_llm_telemetry
+    await get_llm_telemetry().flush()
+    # 关闭 LLM 连接池
+    await close_http_clients()
 
 
 app = FastAPI(
@@ -78,6 +98,8 @@ app.include_router(summary_router)
 app.include_router(admin_router)
 app.include_router(projects_router)
 app.include_router(project_suggest_router)
+app.include_router(llm_admin_router)
+app.include_router(parse_jobs_router)
 
 
 @app.get("/")
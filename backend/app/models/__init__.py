@@ -3,3 +3,9 @@ from app.models.report import Report
 from app.models.summary import WeeklySummary
 from app.models.daily_report import DailyReport, DailyReportItem
 from app.models.task import Task, TaskProgressLog
+from app.models.llm import LLMResponseCache, EmbeddingCache, LLMCallLog
+from app.models.parse_job import ParseJob, ParseJobKind, ParseJobStatus
+from app.models.line_memo import LineProjectMemo
+from app.models.project import (
+    Project, ProjectAlias, ProjectSubItem, ProjectCategory, PendingProject, RejectedMention, ProjectKBMeta
+)
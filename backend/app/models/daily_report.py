@@ -42,6 +42,7 @@ class DailyReportItem(Base):
     task_progress = Column(Integer, nullable=True)  # 任务进度更新（0-100）
     remark = Column(Text, nullable=True)  # 备注
     sequence = Column(Integer, default=0)  # 排序序号
+    parse_source = Column(String(20), nullable=True)  # 条目来源：memo / rule / llm / fallback / user
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
 
@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index, UniqueConstraint
+from datetime import datetime
+from app.database import Base
+
+
+class LineProjectMemo(Base):
+    """
+    工作行 → 项目 记忆 - 由用户确认的周报/日报条目累积
+    同一行在不同周反复出现（如"服务器日常巡检"），解析时先查记忆，命中则不再调用 LLM
+    """
+    __tablename__ = "line_project_memo"
+
+    id = Column(Integer, primary_key=True, index=True)
+    line_hash = Column(String(64), nullable=False)  # 规范化行文本的 sha256
+    line_text = Column(Text, nullable=False)  # 规范化后的行文本，便于排查
+    project_name = Column(String(100), nullable=False)
+    confirm_count = Column(Integer, default=0)  # 用户确认该行属于该项目的次数
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+    __table_args__ = (
+        UniqueConstraint("line_hash", "project_name", name="uq_line_memo_hash_project"),
+        Index("idx_line_memo_project", "project_name"),
+    )
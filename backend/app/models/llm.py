@@ -0,0 +1,71 @@
+"""LLM 相关数据模型"""
+from sqlalchemy import Column, Integer, String, Text, DateTime, LargeBinary, Index, Boolean, Float
+from datetime import datetime
+from app.database import Base
+
+
+class LLMResponseCache(Base):
+    """
+    LLM 响应缓存 - 按 (提供商, 模型, 系统提示词, 提示词, 温度) 的哈希寻址
+    """
+    __tablename__ = "llm_response_cache"
+
+    cache_key = Column(String(64), primary_key=True)  # sha256 十六进制
+    provider = Column(String(20), nullable=False)
+    model = Column(String(50), nullable=False)
+    response = Column(Text, nullable=False)
+    hit_count = Column(Integer, default=0)  # 累计命中次数
+    created_at = Column(DateTime, default=datetime.now)  # 用于 TTL 过期
+    last_accessed_at = Column(DateTime, default=datetime.now)  # 用于 LRU 淘汰
+
+    __table_args__ = (
+        Index("idx_llm_cache_last_accessed", "last_accessed_at"),
+    )
+
+
+class EmbeddingCache(Base):
+    """
+    文本向量缓存 - 按 (模型, 维度, 规范化文本) 的哈希寻址
+    """
+    __tablename__ = "embedding_cache"
+
+    cache_key = Column(String(64), primary_key=True)  # sha256 十六进制
+    text = Column(Text, nullable=False)  # 规范化后的文本
+    model = Column(String(50), nullable=False)
+    dimension = Column(Integer, nullable=False)
+    vector = Column(LargeBinary, nullable=False)  # float32 字节序列
+    hit_count = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.now)
+    last_accessed_at = Column(DateTime, default=datetime.now)  # 用于 LRU 淘汰
+
+    __table_args__ = (
+        Index("idx_embedding_cache_last_accessed", "last_accessed_at"),
+    )
+
+
+class LLMCallLog(Base):
+    """
+    LLM / Embedding 调用记录 - 每次调用的耗时、token 用量、费用与缓存命中情况
+    """
+    __tablename__ = "llm_call_logs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    call_site = Column(String(50), nullable=False)  # 调用位置，如 report_parse
+    kind = Column(String(20), nullable=False)  # chat / stream / embedding
+    provider = Column(String(20))
+    model = Column(String(50))
+    cache_hit = Column(Boolean, default=False)
+    success = Column(Boolean, default=True)
+    queue_wait_ms = Column(Float, default=0)  # 发出请求前的等待（并发限制、重试退避）
+    ttfb_ms = Column(Float)  # 首字节时间
+    latency_ms = Column(Float, default=0)  # 总耗时
+    prompt_tokens = Column(Integer, default=0)
+    completion_tokens = Column(Integer, default=0)
+    tokens_estimated = Column(Boolean, default=False)  # 接口未返回 usage 时为估算值
+    cost = Column(Float, default=0)  # 估算费用（元）
+    error = Column(String(500))
+    created_at = Column(DateTime, default=datetime.now)
+
+    __table_args__ = (
+        Index("idx_llm_call_logs_created", "created_at"),
+    )
@@ -0,0 +1,44 @@
+from sqlalchemy import Column, Integer, String, DateTime, Enum as SQLEnum, Index
+from datetime import datetime
+import enum
+from app.database import Base
+
+
+class ParseJobKind(str, enum.Enum):
+    report = "report"  # 周报
+    daily_report = "daily_report"  # 日报
+
+
+class ParseJobStatus(str, enum.Enum):
+    pending = "pending"  # 等待执行（含防抖延迟、重试退避）
+    running = "running"
+    done = "done"
+    failed = "failed"  # 重试次数用尽
+    cancelled = "cancelled"  # 用户已手动保存条目，无需再解析
+
+
+class ParseJob(Base):
+    """
+    后台解析任务 - 持久化的周报/日报解析队列，服务重启后可继续执行
+    解析时读取报告的最新内容，因此同一报告只需保留一个待执行任务
+    """
+    __tablename__ = "parse_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(SQLEnum(ParseJobKind), nullable=False)
+    target_id = Column(Integer, nullable=False)  # 周报或日报 ID
+    status = Column(SQLEnum(ParseJobStatus), default=ParseJobStatus.pending, nullable=False)
+    attempts = Column(Integer, default=0)  # 已执行次数
+    run_after = Column(DateTime, default=datetime.now)  # 最早执行时间
+    last_error = Column(String(500))
+    created_at = Column(DateTime, default=datetime.now)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    locked_by = Column(String(100))  # 执行该任务的进程标识（多 worker 进程部署时区分归属）
+    locked_at = Column(DateTime)  # 执行中任务的最近心跳时间
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+    __table_args__ = (
+        Index("idx_parse_jobs_status_run_after", "status", "run_after"),
+        Index("idx_parse_jobs_target", "kind", "target_id"),
+    )
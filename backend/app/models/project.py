@@ -0,0 +1,126 @@
+from sqlalchemy import (
+    Column, Integer, String, Text, Float, DateTime, ForeignKey, Index, UniqueConstraint
+)
+from sqlalchemy.orm import relationship
+from datetime import datetime
+from app.database import Base
+
+
+class Project(Base):
+    """项目知识库 - 正式项目"""
+    __tablename__ = "projects"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(100), nullable=False, unique=True)
+    name_key = Column(String(100), nullable=False)  # 小写名称，用于忽略大小写的查找（唯一）
+    category = Column(String(50), default="其他")
+    status = Column(String(20), default="active")  # active / archived
+    description = Column(Text, default="")
+    position = Column(Integer, default=0)  # 列表顺序（重名别名匹配时靠前的项目优先）
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+    aliases = relationship(
+        "ProjectAlias", back_populates="project", cascade="all, delete-orphan",
+        order_by="ProjectAlias.position"
+    )
+    sub_items = relationship(
+        "ProjectSubItem", back_populates="project", cascade="all, delete-orphan",
+        order_by="ProjectSubItem.position"
+    )
+
+    __table_args__ = (
+        Index("idx_projects_name_key", "name_key", unique=True),
+    )
+
+
+class ProjectAlias(Base):
+    """项目别名"""
+    __tablename__ = "project_aliases"
+
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
+    alias = Column(String(100), nullable=False)
+    alias_key = Column(String(100), nullable=False)  # 小写别名（全局唯一；与其他项目名称的冲突由 ProjectStore 检查）
+    position = Column(Integer, default=0)
+
+    project = relationship("Project", back_populates="aliases")
+
+    __table_args__ = (
+        UniqueConstraint("project_id", "alias", name="uq_project_alias"),
+        Index("idx_project_aliases_key", "alias_key", unique=True),
+    )
+
+
+class ProjectSubItem(Base):
+    """项目子项"""
+    __tablename__ = "project_sub_items"
+
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
+    name = Column(String(100), nullable=False)
+    name_key = Column(String(100), nullable=False)  # 小写名称
+    description = Column(Text, default="")
+    position = Column(Integer, default=0)
+
+    project = relationship("Project", back_populates="sub_items")
+
+    __table_args__ = (
+        UniqueConstraint("project_id", "name", name="uq_project_sub_item"),
+        Index("idx_project_sub_items_key", "project_id", "name_key"),
+    )
+
+
+class ProjectCategory(Base):
+    """项目类别"""
+    __tablename__ = "project_categories"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(50), nullable=False, unique=True)
+    position = Column(Integer, default=0)
+
+
+class PendingProject(Base):
+    """待审核的项目 / 子分类（LLM 发现或用户建议）"""
+    __tablename__ = "pending_projects"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(20), nullable=False, default="project")  # project / sub_item
+    name = Column(String(100), nullable=False)
+    name_key = Column(String(100), nullable=False)  # 小写名称
+    parent_project = Column(String(100), nullable=False, default="")  # 子分类所属项目，项目为空串
+    first_seen = Column(String(20))
+    mentions = Column(Integer, default=1)
+    source_texts = Column(Text, default="[]")  # JSON 数组
+    suggested_category = Column(String(50))
+    confidence = Column(Float)
+    suggested_by = Column(String(50))
+    created_at = Column(DateTime, default=datetime.now)
+
+    __table_args__ = (
+        UniqueConstraint("kind", "parent_project", "name_key", name="uq_pending_project"),
+    )
+
+
+class RejectedMention(Base):
+    """已拒绝的提及（黑名单，避免重复提示）"""
+    __tablename__ = "rejected_mentions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(100), nullable=False, unique=True)
+    name_key = Column(String(100), nullable=False)  # 小写名称
+    created_at = Column(DateTime, default=datetime.now)
+
+    __table_args__ = (
+        Index("idx_rejected_mentions_key", "name_key"),
+    )
+
+
+class ProjectKBMeta(Base):
+    """项目知识库元数据（单行）：每次修改递增版本号，各进程据此判断快照是否过期"""
+    __tablename__ = "project_kb_meta"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    migrated_from = Column(String(255))  # 初始数据来源（projects.json 路径或 "initial"）
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
@@ -25,6 +25,7 @@ class Report(Base):
     this_week_work = Column(Text)
     next_week_plan = Column(Text)
     status = Column(SQLEnum(ReportStatus), default=ReportStatus.draft)
+    parsed_lines = Column(Text)  # 已解析过的行哈希（JSON，按条目类型），用于增量解析
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
 
@@ -48,6 +49,8 @@ class ReportItem(Base):
     project_name = Column(String(100), nullable=True)  # 项目名称，可为空（通用工作）
     content = Column(Text, nullable=False)  # 工作内容
     sequence = Column(Integer, default=0)  # 排序序号
+    source_line = Column(Text, nullable=True)  # 来源行（去除序号前缀），用于修改后的增量解析
+    parse_source = Column(String(20), nullable=True)  # 条目来源：memo / rule / llm / fallback / user
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
 
@@ -6,3 +6,5 @@ from app.routers.projects import router as projects_router
 from app.routers.project_suggest import router as project_suggest_router
 from app.routers.daily_reports import router as daily_reports_router
 from app.routers.tasks import router as tasks_router
+from app.routers.llm_admin import router as llm_admin_router
+from app.routers.parse_jobs import router as parse_jobs_router
@@ -1,26 +1,55 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 from datetime import date, datetime
 from decimal import Decimal
 import logging
 
-from app.database import get_db, async_session
+from app.database import get_db
 from app.schemas.daily_report import (
     DailyReportCreate, DailyReportUpdate, DailyReportResponse,
     DailyReportWithUser, DailyParseResult, DailyParsePreviewRequest,
     WeekDailySummary, DailyReportDeadlineInfo, DailyReportItemUpdate
 )
 from app.services import daily_report_service
-from app.services.report_parser_service import get_report_parser_service
+from app.services.report_parser_service import get_report_parser_service, split_source_lines, match_source_line
+from app.services.parse_job_service import get_parse_job_queue
+from app.services.line_memo_service import get_line_memo_service
 from app.utils.security import get_current_user, get_current_admin
 from app.utils.date_utils import get_current_week
+from app.utils.sse import format_sse, SSE_HEADERS
+from app.utils.token_bucket import request_priority, INTERACTIVE
 from app.models.user import User, UserRole
+from app.models.parse_job import ParseJobKind
 
 router = APIRouter(prefix="/api/daily-reports", tags=["日报"])
 logger = logging.getLogger(__name__)
 
 
+def _confirmed_lines(report) -> list:
+    """用户确认过的日报条目按内容匹配来源行（与周报相同），返回 (来源行, 项目名)，匹配不到来源行的跳过"""
+    lines = split_source_lines(report.work_content)
+    pairs = []
+    for item in report.items:
+        if item.parse_source != "user":
+            continue
+        line = match_source_line(item.content, lines)
+        if line:
+            pairs.append((line, item.project_name))
+    return pairs
+
+
+async def _learn_confirmed_items(db: AsyncSession, report, previous: list = ()):
+    """用户保存的日报条目计入行记忆（previous 为保存前已确认的 (来源行, 项目名)，已有的组合不重复计数）"""
+    try:
+        await get_line_memo_service().learn(db, _confirmed_lines(report), previous)
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        logger.warning(f"日报条目写入行记忆失败: {e}")
+
+
 def build_response(report, editable: bool = None) -> DailyReportResponse:
     """构建日报响应"""
     if editable is None:
@@ -82,7 +111,8 @@ async def parse_preview(
 
     parser = get_report_parser_service()
     # 复用周报解析，只传本周工作
-    parse_result = await parser.parse_report_text(request.work_content, None)
+    with request_priority(INTERACTIVE):
+        parse_result = await parser.parse_report_text(request.work_content, None)
 
     # 转换为日报格式
     return DailyParseResult(
@@ -94,6 +124,44 @@ async def parse_preview(
     )
 
 
+@router.post("/parse-preview/stream")
+async def parse_preview_stream(
+    request: DailyParsePreviewRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    流式解析日报内容预览（SSE）
+
+    - item 事件：每解析出一条立即推送 {"project_name", "content", "hours"}
+    - done 事件：完整的 DailyParseResult
+    """
+    parser = get_report_parser_service()
+
+    async def event_stream():
+        if not request.work_content:
+            yield format_sse("done", DailyParseResult(items=[], raw_content=None).model_dump())
+            return
+
+        # 复用周报解析，只传本周工作
+        with request_priority(INTERACTIVE):
+            async for section, payload in parser.parse_report_text_stream(request.work_content, None):
+                if section == "done":
+                    result = DailyParseResult(
+                        items=[
+                            {"project_name": item.project_name, "content": item.content, "hours": None}
+                            for item in payload.this_week_items
+                        ],
+                        raw_content=request.work_content
+                    )
+                    yield format_sse("done", result.model_dump())
+                elif section == "this_week":
+                    yield format_sse("item", {
+                        "project_name": payload.project_name, "content": payload.content, "hours": None
+                    })
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
 @router.get("/week-summary", response_model=WeekDailySummary)
 async def get_week_summary(
     year: Optional[int] = None,
@@ -159,7 +227,6 @@ async def get_daily_report(
 @router.post("/", response_model=DailyReportResponse)
 async def create_daily_report(
     report_data: DailyReportCreate,
-    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
@@ -184,14 +251,13 @@ async def create_daily_report(
 
     # 保存解析结果
     if report_data.items:
+        # 以用户修正为准，取消尚未完成的后台解析
+        await get_parse_job_queue().cancel(ParseJobKind.daily_report, report.id)
         report = await daily_report_service.save_daily_report_items(db, report, report_data.items)
+        await _learn_confirmed_items(db, report)
     elif report_data.work_content:
-        # 后台异步解析
-        background_tasks.add_task(
-            run_daily_report_parse_background,
-            report.id,
-            report_data.work_content
-        )
+        # 加入后台解析队列（解析时读取最新内容，连续修改只解析一次）
+        await get_parse_job_queue().enqueue(ParseJobKind.daily_report, report.id)
 
     return build_response(report, editable=True)
 
@@ -200,7 +266,6 @@ async def create_daily_report(
 async def update_daily_report(
     report_id: int,
     report_data: DailyReportUpdate,
-    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
@@ -217,19 +282,21 @@ async def update_daily_report(
     if not daily_report_service.is_editable(report.date):
         raise HTTPException(status_code=400, detail="该日报已超过可修改时间")
 
+    # 保存前用户已确认的行（重复保存不重复计入行记忆）
+    previous = _confirmed_lines(report)
+
     # 更新日报
     report = await daily_report_service.update_daily_report(db, report, report_data)
 
     # 保存解析结果
     if report_data.items is not None:
+        # 以用户修正为准，取消尚未完成的后台解析
+        await get_parse_job_queue().cancel(ParseJobKind.daily_report, report.id)
         report = await daily_report_service.save_daily_report_items(db, report, report_data.items)
+        await _learn_confirmed_items(db, report, previous)
     elif report_data.work_content:
-        # 后台异步解析
-        background_tasks.add_task(
-            run_daily_report_parse_background,
-            report.id,
-            report_data.work_content
-        )
+        # 加入后台解析队列（解析时读取最新内容，连续修改只解析一次）
+        await get_parse_job_queue().enqueue(ParseJobKind.daily_report, report.id)
 
     return build_response(report)
 
@@ -304,31 +371,3 @@ async def admin_update_item_hours(
         raise HTTPException(status_code=404, detail="条目不存在")
 
     return {"message": "工时已更新", "hours": float(item.hours)}
-
-
-# ==================== 后台任务 ====================
-
-async def run_daily_report_parse_background(report_id: int, work_content: str):
-    """后台解析日报内容"""
-    try:
-        parser = get_report_parser_service()
-        async with async_session() as db:
-            report = await daily_report_service.get_daily_report_by_id(db, report_id)
-            if report:
-                # 复用周报解析
-                parse_result = await parser.parse_report_text(work_content, None)
-                # 转换为日报格式
-                from app.schemas.daily_report import DailyReportItemInput
-                items = [
-                    DailyReportItemInput(
-                        project_name=item.project_name,
-                        content=item.content,
-                        hours=None,
-                        progress=None,
-                        remark=None
-                    )
-                    for item in parse_result.this_week_items
-                ]
-                await daily_report_service.save_daily_report_items(db, report, items)
-    except Exception:
-        logger.exception(f"后台日报解析失败: report_id={report_id}")
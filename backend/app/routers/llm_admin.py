@@ -0,0 +1,119 @@
+"""
+LLM 运行状态路由 - 管理员查看缓存、提供商健康状况、调用耗时与费用等运行指标
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query
+from app.utils.security import get_current_admin
+from app.models.user import User
+from app.services.llm_cache import get_llm_cache
+from app.services.embedding_cache import get_embedding_cache
+from app.services.llm_telemetry import get_llm_telemetry
+from app.services.llm_cascade import get_model_cascade
+from app.services.line_memo_service import get_line_memo_service
+from app.services.llm_service import (
+    LLMService, get_circuit_breaker, get_circuit_breakers, get_flight_stats,
+    get_rate_limiter, get_rate_limiters
+)
+
+router = APIRouter(prefix="/api/admin/llm", tags=["LLM 管理"])
+
+
+@router.get("/cache")
+async def get_cache_stats(admin: User = Depends(get_current_admin)):
+    """获取 LLM 响应缓存命中统计"""
+    stats = await get_llm_cache().stats()
+    return {"code": 200, "data": stats}
+
+
+@router.delete("/cache")
+async def clear_cache(admin: User = Depends(get_current_admin)):
+    """清空 LLM 响应缓存"""
+    removed = await get_llm_cache().clear()
+    return {"code": 200, "message": f"已清除 {removed} 条缓存"}
+
+
+@router.get("/embedding-cache")
+async def get_embedding_cache_stats(admin: User = Depends(get_current_admin)):
+    """获取文本向量缓存命中统计"""
+    stats = await get_embedding_cache().stats()
+    return {"code": 200, "data": stats}
+
+
+@router.get("/inflight")
+async def get_inflight_stats(admin: User = Depends(get_current_admin)):
+    """获取进行中的合并请求数及累计被合并的请求数"""
+    return {"code": 200, "data": get_flight_stats()}
+
+
+@router.get("/providers")
+async def get_provider_health(admin: User = Depends(get_current_admin)):
+    """获取提供商链及各提供商熔断状态"""
+    chain = LLMService().provider_chain()
+    names = chain + [name for name in get_circuit_breakers() if name not in chain]
+    providers = []
+    for name in names:
+        health = get_circuit_breaker(name).snapshot()
+        health["model"] = LLMService.PROVIDER_MODELS.get(name)
+        health["configured"] = bool(LLMService._endpoint(name)[2])
+        health["in_chain"] = name in chain
+        providers.append(health)
+    return {"code": 200, "data": {"chain": chain, "providers": providers}}
+
+
+@router.post("/providers/{provider}/reset")
+async def reset_provider(provider: str, admin: User = Depends(get_current_admin)):
+    """手动关闭提供商熔断"""
+    if provider not in LLMService.PROVIDER_MODELS:
+        raise HTTPException(status_code=404, detail="未知的提供商")
+    get_circuit_breaker(provider).reset()
+    return {"code": 200, "message": f"已重置 {provider} 熔断状态"}
+
+
+@router.get("/rate-limits")
+async def get_rate_limits(admin: User = Depends(get_current_admin)):
+    """获取各提供商及 Embedding 的限速配置、桶余量、按优先级的排队数与预计等待秒数"""
+    names = LLMService().provider_chain() + ["embedding"]
+    names += [name for name in get_rate_limiters() if name not in names]
+    return {"code": 200, "data": [get_rate_limiter(name).snapshot() for name in names]}
+
+
+@router.get("/telemetry")
+async def get_telemetry_summary(
+    source: str = Query("memory", pattern="^(memory|db)$"),
+    hours: int = Query(24, ge=1, le=24 * 90),
+    group_by: str = Query("call_site", pattern="^(call_site|kind|provider|model)$"),
+    admin: User = Depends(get_current_admin)
+):
+    """
+    获取 LLM 调用统计：调用次数、缓存命中率、错误率、token 用量、估算费用，
+    以及总耗时/首字节时间/排队等待的 p50/p90/p99 分位数
+    source=memory 统计内存中最近的调用，source=db 统计数据库中最近 hours 小时的调用
+    """
+    summary = await get_llm_telemetry().summary(source=source, hours=hours, group_by=group_by)
+    return {"code": 200, "data": summary}
+
+
+@router.get("/telemetry/recent")
+async def get_recent_calls(
+    limit: int = Query(50, ge=1, le=500),
+    admin: User = Depends(get_current_admin)
+):
+    """获取最近的 LLM 调用记录"""
+    return {"code": 200, "data": get_llm_telemetry().recent(limit)}
+
+
+@router.get("/telemetry/prompt-pruning")
+async def get_prompt_pruning_stats(admin: User = Depends(get_current_admin)):
+    """获取已知项目列表裁剪前后的 prompt token 估算及节省比例（本进程累计）"""
+    return {"code": 200, "data": get_llm_telemetry().pruning_summary()}
+
+
+@router.get("/line-memo")
+async def get_line_memo_stats(admin: User = Depends(get_current_admin)):
+    """获取行记忆的记录数与本进程的查询命中率"""
+    return {"code": 200, "data": await get_line_memo_service().stats()}
+
+
+@router.get("/cascade")
+async def get_cascade_stats(admin: User = Depends(get_current_admin)):
+    """获取模型级联统计：各调用位置的升级率、升级原因、端到端耗时，以及快速/默认模型阶段的耗时与费用"""
+    return {"code": 200, "data": await get_model_cascade().summary()}
@@ -0,0 +1,51 @@
+"""
+后台解析任务路由 - 管理员查看队列状态、任务详情并重新执行任务
+"""
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from app.utils.security import get_current_admin
+from app.models.user import User
+from app.models.parse_job import ParseJobKind, ParseJobStatus
+from app.services.parse_job_service import get_parse_job_queue, job_to_dict, ParseJobError
+
+router = APIRouter(prefix="/api/admin/parse-jobs", tags=["解析任务"])
+
+
+@router.get("/stats")
+async def get_queue_stats(admin: User = Depends(get_current_admin)):
+    """获取队列深度、各状态任务数和 worker 数"""
+    stats = await get_parse_job_queue().stats()
+    return {"code": 200, "data": stats}
+
+
+@router.get("/")
+async def list_jobs(
+    status: Optional[ParseJobStatus] = None,
+    kind: Optional[ParseJobKind] = None,
+    target_id: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    admin: User = Depends(get_current_admin)
+):
+    """获取解析任务列表（新的在前）"""
+    jobs = await get_parse_job_queue().list_jobs(status, kind, target_id, limit, offset)
+    return {"code": 200, "data": [job_to_dict(job) for job in jobs]}
+
+
+@router.get("/{job_id}")
+async def get_job(job_id: int, admin: User = Depends(get_current_admin)):
+    """获取单个任务详情"""
+    job = await get_parse_job_queue().get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    return {"code": 200, "data": job_to_dict(job)}
+
+
+@router.post("/{job_id}/rerun")
+async def rerun_job(job_id: int, admin: User = Depends(get_current_admin)):
+    """重新执行已结束（完成/失败/取消）的任务"""
+    try:
+        job = await get_parse_job_queue().rerun(job_id)
+    except ParseJobError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"code": 200, "message": "已重新加入队列", "data": job_to_dict(job)}
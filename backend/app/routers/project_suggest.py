@@ -40,22 +40,22 @@ async def suggest_project(
         raise HTTPException(status_code=400, detail="项目名称不能为空")
 
     # 检查是否已存在于正式项目列表
-    existing = extractor.get_project(project_name)
+    existing = await extractor.get_project(project_name)
     if existing:
         raise HTTPException(status_code=400, detail=f"项目「{project_name}」已存在")
 
     # 检查是否已在待审核列表
-    pending = extractor.get_pending_projects()
+    pending = await extractor.get_pending_projects()
     if any(p.get("name", "").lower() == project_name.lower() for p in pending):
         raise HTTPException(status_code=400, detail=f"项目「{project_name}」已在审核中")
 
     # 检查是否在黑名单中
-    rejected = extractor.get_rejected_list()
+    rejected = await extractor.get_rejected_list()
     if project_name.lower() in [r.lower() for r in rejected]:
         raise HTTPException(status_code=400, detail=f"项目「{project_name}」不可添加")
 
     # 添加到待审核列表
-    success = extractor.add_pending_project(project_name, suggested_by=current_user.name)
+    success = await extractor.add_pending_project(project_name, suggested_by=current_user.name)
     if not success:
         raise HTTPException(status_code=500, detail="提交失败，请稍后重试")
 
@@ -88,7 +88,7 @@ async def suggest_sub_item(
         raise HTTPException(status_code=400, detail="子分类名称不能为空")
 
     # 检查父项目是否存在
-    parent_project = extractor.get_project(project_name)
+    parent_project = await extractor.get_project(project_name)
     if not parent_project:
         raise HTTPException(status_code=400, detail=f"父项目「{project_name}」不存在")
 
@@ -98,7 +98,7 @@ async def suggest_sub_item(
         raise HTTPException(status_code=400, detail=f"子分类「{sub_item_name}」已存在于「{project_name}」中")
 
     # 检查是否已在待审核列表
-    pending = extractor.get_pending_projects()
+    pending = await extractor.get_pending_projects()
     for p in pending:
         if (p.get("type") == "sub_item" and
             p.get("parent_project", "").lower() == project_name.lower() and
@@ -106,7 +106,7 @@ async def suggest_sub_item(
             raise HTTPException(status_code=400, detail=f"子分类「{sub_item_name}」已在审核中")
 
     # 添加到待审核列表
-    success = extractor.add_pending_sub_item(project_name, sub_item_name, suggested_by=current_user.name)
+    success = await extractor.add_pending_sub_item(project_name, sub_item_name, suggested_by=current_user.name)
     if not success:
         raise HTTPException(status_code=500, detail="提交失败，请稍后重试")
 
@@ -90,7 +90,7 @@ async def list_all_projects_detail(admin: User = Depends(get_current_admin)):
 async def get_project_detail(name: str, admin: User = Depends(get_current_admin)):
     """获取单个项目详情"""
     extractor = get_project_extractor()
-    project = extractor.get_project(name)
+    project = await extractor.get_project(name)
     if not project:
         raise HTTPException(status_code=404, detail="项目不存在")
     return {"code": 200, "data": project}
@@ -104,14 +104,14 @@ async def create_project(
     """创建新项目"""
     extractor = get_project_extractor()
     sub_items = [{"name": s.name, "description": s.description} for s in data.sub_items]
-    if not extractor.create_project(
+    if not await extractor.create_project(
         name=data.name,
         category=data.category,
         description=data.description,
         aliases=data.aliases,
         sub_items=sub_items
     ):
-        raise HTTPException(status_code=400, detail="项目已存在")
+        raise HTTPException(status_code=400, detail="项目已存在（名称或别名已被其他项目使用）")
     return {"code": 200, "message": f"项目「{data.name}」创建成功"}
 
 
@@ -127,8 +127,8 @@ async def update_project(
     if updates.get("sub_items") is not None:
         updates["sub_items"] = [{"name": s.name, "description": s.description} for s in data.sub_items]
 
-    if not extractor.update_project(name, updates):
-        raise HTTPException(status_code=404, detail="项目不存在")
+    if not await extractor.update_project(name, updates):
+        raise HTTPException(status_code=400, detail="更新失败（项目不存在或别名已被其他项目使用）")
     return {"code": 200, "message": "更新成功"}
 
 
@@ -138,20 +138,26 @@ async def rename_project(
     data: ProjectRename,
     admin: User = Depends(get_current_admin)
 ):
-    """重命名项目"""
+    """重命名项目（周报/日报条目、任务、行记忆中的项目名随之迁移）"""
     extractor = get_project_extractor()
-    if not extractor.rename_project(name, data.new_name):
+    affected = await extractor.rename_project(name, data.new_name)
+    if affected is None:
         raise HTTPException(status_code=400, detail="重命名失败（项目不存在或新名称已被使用）")
-    return {"code": 200, "message": f"已重命名为「{data.new_name}」"}
+    return {"code": 200, "message": f"已重命名为「{data.new_name}」", "data": {"affected": affected}}
 
 
 @router.delete("/delete/{name}")
-async def delete_project(name: str, admin: User = Depends(get_current_admin)):
-    """删除项目"""
+async def delete_project(
+    name: str,
+    merge_into: Optional[str] = None,
+    admin: User = Depends(get_current_admin)
+):
+    """删除项目（指定 merge_into 时历史条目和任务归入该项目，否则保留原项目名）"""
     extractor = get_project_extractor()
-    if not extractor.delete_project(name):
-        raise HTTPException(status_code=404, detail="项目不存在")
-    return {"code": 200, "message": f"项目「{name}」已删除"}
+    affected = await extractor.delete_project(name, merge_into)
+    if affected is None:
+        raise HTTPException(status_code=404, detail="项目不存在" if not merge_into else "项目或并入项目不存在，或名称与其他项目冲突")
+    return {"code": 200, "message": f"项目「{name}」已删除", "data": {"affected": affected}}
 
 
 # ========== 子项目管理 ==========
@@ -164,7 +170,7 @@ async def add_sub_item(
 ):
     """添加子项目"""
     extractor = get_project_extractor()
-    if not extractor.add_sub_item(project_name, data.name, data.description):
+    if not await extractor.add_sub_item(project_name, data.name, data.description):
         raise HTTPException(status_code=400, detail="添加失败（项目不存在或子项目已存在）")
     return {"code": 200, "message": f"已添加子项目「{data.name}」"}
 
@@ -179,7 +185,7 @@ async def update_sub_item(
     """更新子项目"""
     extractor = get_project_extractor()
     updates = data.model_dump(exclude_unset=True)
-    if not extractor.update_sub_item(project_name, sub_name, updates):
+    if not await extractor.update_sub_item(project_name, sub_name, updates):
         raise HTTPException(status_code=404, detail="子项目不存在")
     return {"code": 200, "message": "更新成功"}
 
@@ -192,7 +198,7 @@ async def remove_sub_item(
 ):
     """删除子项目"""
     extractor = get_project_extractor()
-    if not extractor.remove_sub_item(project_name, sub_name):
+    if not await extractor.remove_sub_item(project_name, sub_name):
         raise HTTPException(status_code=404, detail="子项目不存在")
     return {"code": 200, "message": f"已删除子项目「{sub_name}」"}
 
@@ -203,7 +209,7 @@ async def remove_sub_item(
 async def list_categories(admin: User = Depends(get_current_admin)):
     """获取所有项目类别"""
     extractor = get_project_extractor()
-    categories = extractor.get_categories()
+    categories = await extractor.get_categories()
     return {"code": 200, "data": categories}
 
 
@@ -211,7 +217,7 @@ async def list_categories(admin: User = Depends(get_current_admin)):
 async def add_category(data: CategoryRequest, admin: User = Depends(get_current_admin)):
     """添加项目类别"""
     extractor = get_project_extractor()
-    if not extractor.add_category(data.name):
+    if not await extractor.add_category(data.name):
         raise HTTPException(status_code=400, detail="类别已存在")
     return {"code": 200, "message": f"已添加类别「{data.name}」"}
 
@@ -220,7 +226,7 @@ async def add_category(data: CategoryRequest, admin: User = Depends(get_current_
 async def remove_category(name: str, admin: User = Depends(get_current_admin)):
     """删除项目类别"""
     extractor = get_project_extractor()
-    if not extractor.remove_category(name):
+    if not await extractor.remove_category(name):
         raise HTTPException(status_code=404, detail="类别不存在")
     return {"code": 200, "message": f"已删除类别「{name}」"}
 
@@ -231,7 +237,7 @@ async def remove_category(name: str, admin: User = Depends(get_current_admin)):
 async def list_pending_projects(admin: User = Depends(get_current_admin)):
     """获取待审核项目列表"""
     extractor = get_project_extractor()
-    pending = extractor.get_pending_projects()
+    pending = await extractor.get_pending_projects()
     return {"code": 200, "data": pending}
 
 
@@ -239,7 +245,7 @@ async def list_pending_projects(admin: User = Depends(get_current_admin)):
 async def list_rejected_projects(admin: User = Depends(get_current_admin)):
     """获取已拒绝（黑名单）项目列表"""
     extractor = get_project_extractor()
-    rejected = extractor.get_rejected_list()
+    rejected = await extractor.get_rejected_list()
     return {"code": 200, "data": rejected}
 
 
@@ -250,7 +256,7 @@ async def approve_project(
 ):
     """确认待审核项目，加入正式列表"""
     extractor = get_project_extractor()
-    if not extractor.approve_pending_project(request.name, request.category):
+    if not await extractor.approve_pending_project(request.name, request.category):
         raise HTTPException(status_code=400, detail="项目不在待审核列表中")
     return {"code": 200, "message": f"已将「{request.name}」添加到「{request.category}」类别"}
 
@@ -260,11 +266,16 @@ async def merge_project(
     request: ProjectMergeRequest,
     admin: User = Depends(get_current_admin)
 ):
-    """将待审核项目合并到已有项目（作为别名）"""
+    """将待审核项目合并到已有项目（作为别名，已按待审核名称记录的条目归入目标项目）"""
     extractor = get_project_extractor()
-    if not extractor.merge_pending_to_existing(request.pending_name, request.target_project):
-        raise HTTPException(status_code=400, detail="操作失败：待审核项目不存在或目标项目不存在")
-    return {"code": 200, "message": f"已将「{request.pending_name}」作为「{request.target_project}」的别名"}
+    affected = await extractor.merge_pending_to_existing(request.pending_name, request.target_project)
+    if affected is None:
+        raise HTTPException(status_code=400, detail="操作失败：待审核项目或目标项目不存在，或名称已被其他项目使用")
+    return {
+        "code": 200,
+        "message": f"已将「{request.pending_name}」作为「{request.target_project}」的别名",
+        "data": {"affected": affected}
+    }
 
 
 @router.post("/reject")
@@ -274,7 +285,7 @@ async def reject_project(
 ):
     """拒绝待审核项目（加入黑名单）"""
     extractor = get_project_extractor()
-    if not extractor.reject_pending_project(request.name):
+    if not await extractor.reject_pending_project(request.name):
         raise HTTPException(status_code=400, detail="项目不在待审核列表中")
     return {"code": 200, "message": f"已将「{request.name}」加入黑名单"}
 
@@ -286,8 +297,8 @@ async def add_alias(
 ):
     """为已有项目添加别名"""
     extractor = get_project_extractor()
-    if not extractor.add_alias(request.project_name, request.alias):
-        raise HTTPException(status_code=400, detail="项目不存在")
+    if not await extractor.add_alias(request.project_name, request.alias):
+        raise HTTPException(status_code=400, detail="添加失败（项目不存在或别名已被其他项目使用）")
     return {"code": 200, "message": f"已为「{request.project_name}」添加别名「{request.alias}」"}
 
 
@@ -298,7 +309,7 @@ async def remove_from_rejected(
 ):
     """从黑名单中移除"""
     extractor = get_project_extractor()
-    if not extractor.remove_from_rejected(name):
+    if not await extractor.remove_from_rejected(name):
         raise HTTPException(status_code=400, detail="项目不在黑名单中")
     return {"code": 200, "message": f"已将「{name}」从黑名单移除"}
 
@@ -1,48 +1,57 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 import logging
-from app.database import get_db, async_session
+from app.database import get_db
 from app.schemas.report import ReportCreate, ReportUpdate, ReportResponse, ParseResult, ParsePreviewRequest
 from app.services import report_service
 from app.services.report_parser_service import get_report_parser_service
+from app.services.parse_job_service import get_parse_job_queue
 from app.utils.security import get_current_user, get_current_admin
 from app.utils.date_utils import get_current_week, is_within_deadline, get_deadline_info
+from app.utils.sse import format_sse, SSE_HEADERS
+from app.utils.token_bucket import request_priority, INTERACTIVE
 from app.models.user import User, UserRole
 from app.models.report import ReportStatus
+from app.models.parse_job import ParseJobKind
 
 router = APIRouter(prefix="/api/reports", tags=["周报"])
 logger = logging.getLogger(__name__)
 
 
-async def run_report_parse_background(report_id: int, this_week_work: str, next_week_plan: str):
-    """后台解析周报内容为结构化条目"""
-    from app.services.report_service import get_report_by_id
-    try:
-        parser = get_report_parser_service()
-        async with async_session() as db:
-            report = await get_report_by_id(db, report_id)
-            if report:
-                parse_result = await parser.parse_report_text(this_week_work, next_week_plan)
-                await parser.save_parsed_items(db, report, parse_result)
-    except Exception:
-        logger.exception(f"后台周报解析失败: report_id={report_id}")
-
-
 async def save_user_parsed_items(
     db: AsyncSession,
     report_id: int,
     this_week_items: list,
-    next_week_items: list
+    next_week_items: list,
+    this_week_work: Optional[str] = None,
+    next_week_plan: Optional[str] = None
 ):
-    """保存用户修正后的解析结果"""
-    from sqlalchemy import delete
-    from app.models.report import ReportItem, ItemType
-
-    # 删除旧的 items
+    """保存用户修正后的解析结果（按内容匹配来源行，供后续修改时增量解析），并记入行记忆"""
+    from sqlalchemy import delete, select, update
+    from app.models.report import Report, ReportItem, ItemType
+    from app.services.report_parser_service import split_source_lines, match_source_line, dump_parsed_lines
+    from app.services.line_memo_service import get_line_memo_service
+
+    # 以用户修正为准，取消尚未完成的后台解析
+    await get_parse_job_queue().cancel(ParseJobKind.report, report_id)
+
+    # 删除旧的 items（先记下已确认过的行，重复保存不重复计入行记忆）
+    result = await db.execute(
+        select(ReportItem.source_line, ReportItem.project_name).where(
+            ReportItem.report_id == report_id,
+            ReportItem.parse_source == "user",
+            ReportItem.source_line.is_not(None)
+        )
+    )
+    previous = [tuple(row) for row in result.all()]
     await db.execute(delete(ReportItem).where(ReportItem.report_id == report_id))
 
     count = 0
+    saved = []
+    this_week_lines = split_source_lines(this_week_work)
+    next_week_lines = split_source_lines(next_week_plan)
 
     # 保存本周工作
     for i, item in enumerate(this_week_items or []):
@@ -51,9 +60,12 @@ async def save_user_parsed_items(
             item_type=ItemType.this_week,
             project_name=item.project_name,
             content=item.content,
-            sequence=i
+            sequence=i,
+            source_line=match_source_line(item.content, this_week_lines),
+            parse_source="user"
         )
         db.add(report_item)
+        saved.append(report_item)
         count += 1
 
     # 保存下周计划
@@ -63,11 +75,23 @@ async def save_user_parsed_items(
             item_type=ItemType.next_week,
             project_name=item.project_name,
             content=item.content,
-            sequence=i
+            sequence=i,
+            source_line=match_source_line(item.content, next_week_lines),
+            parse_source="user"
         )
         db.add(report_item)
+        saved.append(report_item)
         count += 1
 
+    await get_line_memo_service().learn(
+        db, [(item.source_line, item.project_name) for item in saved if item.source_line], previous
+    )
+    await db.execute(
+        update(Report).where(Report.id == report_id).values(
+            parsed_lines=dump_parsed_lines(this_week_work, next_week_plan)
+        )
+    )
+
     await db.commit()
     logger.info(f"保存用户修正的周报条目: report_id={report_id}, 共{count}条")
 
@@ -100,8 +124,7 @@ async def get_project_list(
     from datetime import datetime, timedelta, date
 
     extractor = get_project_extractor()
-    data = extractor.load_known_projects()
-    projects = data.get("projects", [])
+    projects = extractor.knowledge_base().active_projects
 
     # 计算30天前的日期
     thirty_days_ago = date.today() - timedelta(days=30)
@@ -154,8 +177,6 @@ async def get_project_list(
     # 构建结果列表
     result = []
     for proj in projects:
-        if proj.get("status") == "archived":
-            continue
         name = proj["name"]
         usage = usage_counts.get(name, 0)
         item = {
@@ -215,10 +236,37 @@ async def parse_preview(
 ):
     """解析周报文本预览（不保存）"""
     parser = get_report_parser_service()
-    result = await parser.parse_report_text(request.this_week_work, request.next_week_plan)
+    with request_priority(INTERACTIVE):
+        result = await parser.parse_report_text(request.this_week_work, request.next_week_plan)
     return result
 
 
+@router.post("/parse-preview/stream")
+async def parse_preview_stream(
+    request: ParsePreviewRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    流式解析周报文本预览（SSE，不保存）
+
+    - item 事件：每解析出一条立即推送 {"section": "this_week"|"next_week", "project_name", "content"}
+    - done 事件：完整的 ParseResult
+    """
+    parser = get_report_parser_service()
+
+    async def event_stream():
+        with request_priority(INTERACTIVE):
+            async for section, payload in parser.parse_report_text_stream(
+                request.this_week_work, request.next_week_plan
+            ):
+                if section == "done":
+                    yield format_sse("done", payload.model_dump())
+                else:
+                    yield format_sse("item", {"section": section, **payload.model_dump()})
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
 @router.get("/", response_model=list[ReportResponse])
 async def get_reports(
     year: Optional[int] = None,
@@ -247,7 +295,6 @@ async def get_report(
 @router.post("/", response_model=ReportResponse)
 async def create_report(
     report_data: ReportCreate,
-    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
@@ -264,16 +311,13 @@ async def create_report(
         await save_user_parsed_items(
             db, report.id,
             report_data.this_week_items,
-            report_data.next_week_items
+            report_data.next_week_items,
+            report.this_week_work,
+            report.next_week_plan
         )
     elif report_data.this_week_work or report_data.next_week_plan:
-        # 用户未修正，后台自动解析
-        background_tasks.add_task(
-            run_report_parse_background,
-            report.id,
-            report_data.this_week_work or "",
-            report_data.next_week_plan or ""
-        )
+        # 用户未修正，加入后台解析队列
+        await get_parse_job_queue().enqueue(ParseJobKind.report, report.id)
 
     # 注意：不再自动触发 trigger_llm_analysis
     # 汇总统计现在直接使用 report_items 数据，LLM 缓存仅作为历史数据的降级方案
@@ -285,7 +329,6 @@ async def create_report(
 async def update_report(
     report_id: int,
     report_data: ReportUpdate,
-    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
@@ -307,18 +350,13 @@ async def update_report(
         await save_user_parsed_items(
             db, report_id,
             report_data.this_week_items,
-            report_data.next_week_items
+            report_data.next_week_items,
+            updated_report.this_week_work,
+            updated_report.next_week_plan
         )
     elif report_data.this_week_work is not None or report_data.next_week_plan is not None:
-        # 内容有更新但用户未修正，后台重新解析
-        this_week = report_data.this_week_work if report_data.this_week_work is not None else report.this_week_work
-        next_week = report_data.next_week_plan if report_data.next_week_plan is not None else report.next_week_plan
-        background_tasks.add_task(
-            run_report_parse_background,
-            report_id,
-            this_week or "",
-            next_week or ""
-        )
+        # 内容有更新但用户未修正，加入后台解析队列（解析时读取最新内容，连续修改只解析一次）
+        await get_parse_job_queue().enqueue(ParseJobKind.report, report_id)
 
     # 注意：不再自动触发 trigger_llm_analysis
     # 汇总统计现在直接使用 report_items 数据
@@ -30,6 +30,7 @@ class DailyReportItemResponse(DailyReportItemBase):
     """日报工作条目响应"""
     id: int
     daily_report_id: int
+    parse_source: Optional[str] = None  # memo / rule / llm / fallback / user
     created_at: datetime
     updated_at: datetime
 
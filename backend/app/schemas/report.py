@@ -26,6 +26,7 @@ class ReportItemResponse(ReportItemBase):
     """工作条目响应"""
     id: int
     report_id: int
+    parse_source: Optional[str] = None  # memo / rule / llm / fallback / user
     created_at: datetime
     updated_at: datetime
 
@@ -87,6 +88,8 @@ class ParsedWorkItem(BaseModel):
     """LLM 解析出的单条工作"""
     project_name: Optional[str] = None
     content: str
+    source_line: Optional[str] = None  # 条目来源行，保存时为空则按内容匹配
+    parse_source: Optional[str] = None  # 条目来源：memo（行记忆）/ rule（规则）/ llm / fallback（降级）
 
 
 class ParseResult(BaseModel):
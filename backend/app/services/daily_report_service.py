@@ -141,9 +141,14 @@ async def delete_daily_report(db: AsyncSession, report: DailyReport):
 async def save_daily_report_items(
     db: AsyncSession,
     report: DailyReport,
-    items: List[DailyReportItemInput]
+    items: List[DailyReportItemInput],
+    parse_sources: Optional[List[Optional[str]]] = None
 ) -> DailyReport:
-    """保存日报工作条目（先删后插），并同步任务进度"""
+    """
+    保存日报工作条目（先删后插），并同步任务进度
+
+    parse_sources 为各条目的来源（与 items 一一对应，后台解析时传入）；不传表示用户保存，记为 user
+    """
     # 删除旧条目
     await db.execute(
         delete(DailyReportItem).where(DailyReportItem.daily_report_id == report.id)
@@ -160,7 +165,8 @@ async def save_daily_report_items(
             progress=item.progress,
             task_progress=item.task_progress,
             remark=item.remark,
-            sequence=i
+            sequence=i,
+            parse_source=parse_sources[i] if parse_sources is not None else "user"
         )
         db.add(db_item)
 
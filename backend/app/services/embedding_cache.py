@@ -0,0 +1,155 @@
+"""
+文本向量缓存服务 - 持久化的 文本 -> 向量 映射
+
+周报中的项目提及（如"清图网站更新"）每周反复出现，
+向量化前先查缓存，只对未命中的文本调用 Embedding 接口。
+- 键：规范化文本 + 模型 + 维度 的哈希，模型或维度变化自动失效
+- 条目数超过上限时按最近访问时间（LRU）淘汰
+"""
+import hashlib
+import logging
+import unicodedata
+from datetime import datetime
+from typing import Dict, List, Optional
+import numpy as np
+from sqlalchemy import select, update, delete, func
+
+from app.config import get_settings
+from app.database import async_session
+from app.models.llm import EmbeddingCache as CacheEntry
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# 每写入多少批执行一次淘汰
+EVICT_EVERY_WRITES = 20
+
+
+def normalize_text(text: str) -> str:
+    """文本规范化：全半角统一、去首尾空白、合并连续空白、忽略大小写（只用于生成缓存键，接口请求发送原文）"""
+    text = unicodedata.normalize("NFKC", text or "")
+    return " ".join(text.split()).casefold()
+
+
+class EmbeddingCache:
+    """文本向量缓存"""
+
+    def __init__(self, model: str, dimension: int):
+        self.model = model
+        self.dimension = dimension
+        self.max_entries = settings.EMBEDDING_CACHE_MAX_ENTRIES
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+
+    def make_key(self, normalized: str) -> str:
+        raw = f"{self.model}\x00{self.dimension}\x00{normalized}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    async def get_many(self, texts: List[str]) -> Dict[str, List[float]]:
+        """
+        批量读取缓存
+        Args:
+            texts: 已规范化的文本
+        Returns:
+            {规范化文本: 向量}，仅包含命中的条目
+        """
+        unique = list(dict.fromkeys(texts))
+        if not unique:
+            return {}
+        keys = {self.make_key(t): t for t in unique}
+
+        async with async_session() as db:
+            result = await db.execute(
+                select(CacheEntry.cache_key, CacheEntry.vector).where(CacheEntry.cache_key.in_(keys))
+            )
+            rows = result.all()
+            if rows:
+                await db.execute(
+                    update(CacheEntry)
+                    .where(CacheEntry.cache_key.in_([row.cache_key for row in rows]))
+                    .values(
+                        hit_count=CacheEntry.hit_count + 1,
+                        last_accessed_at=datetime.now()
+                    )
+                )
+                await db.commit()
+
+        found = {
+            keys[row.cache_key]: np.frombuffer(row.vector, dtype=np.float32).tolist()
+            for row in rows
+        }
+        self.hits += len(found)
+        self.misses += len(unique) - len(found)
+        return found
+
+    async def set_many(self, vectors: Dict[str, List[float]]):
+        """
+        批量写入缓存
+        Args:
+            vectors: {规范化文本: 向量}，空向量会被跳过
+        """
+        now = datetime.now()
+        async with async_session() as db:
+            for text, vec in vectors.items():
+                if not vec:
+                    continue
+                await db.merge(CacheEntry(
+                    cache_key=self.make_key(text),
+                    text=text,
+                    model=self.model,
+                    dimension=len(vec),
+                    vector=np.asarray(vec, dtype=np.float32).tobytes(),
+                    hit_count=0,
+                    created_at=now,
+                    last_accessed_at=now
+                ))
+            await db.commit()
+
+            self._writes += 1
+            if self._writes % EVICT_EVERY_WRITES == 0:
+                await self._evict(db)
+
+    async def _evict(self, db) -> int:
+        """按 LRU 淘汰超出上限的条目"""
+        total = await db.scalar(select(func.count()).select_from(CacheEntry))
+        overflow = (total or 0) - self.max_entries
+        if overflow <= 0:
+            return 0
+
+        oldest = select(CacheEntry.cache_key).order_by(
+            CacheEntry.last_accessed_at.asc()
+        ).limit(overflow)
+        result = await db.execute(delete(CacheEntry).where(CacheEntry.cache_key.in_(oldest)))
+        await db.commit()
+        removed = result.rowcount or 0
+        logger.info(f"向量缓存淘汰 {removed} 条")
+        return removed
+
+    async def stats(self) -> dict:
+        """缓存统计：本进程命中/未命中次数 + 持久化条目数"""
+        async with async_session() as db:
+            entries = await db.scalar(select(func.count()).select_from(CacheEntry))
+
+        lookups = self.hits + self.misses
+        return {
+            "enabled": settings.EMBEDDING_CACHE_ENABLED,
+            "model": self.model,
+            "dimension": self.dimension,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": entries or 0,
+            "max_entries": self.max_entries
+        }
+
+
+# 单例
+_embedding_cache: Optional[EmbeddingCache] = None
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    global _embedding_cache
+    if _embedding_cache is None:
+        _embedding_cache = EmbeddingCache(settings.EMBEDDING_MODEL, settings.EMBEDDING_DIMENSION)
+    return _embedding_cache
@@ -0,0 +1,108 @@
+"""
+项目向量索引 - 预归一化的 float32 矩阵
+
+将所有项目名和别名的向量堆叠成矩阵（每行一个向量，行号映射到项目标准名），
+匹配时只需一次矩阵-向量乘法即可得到全部余弦相似度。
+"""
+from typing import List, Mapping, Optional, Tuple
+import numpy as np
+
+
+class ProjectEmbeddingIndex:
+    """项目向量索引"""
+
+    def __init__(self):
+        self.matrix = np.zeros((0, 0), dtype=np.float32)
+        self.row_projects: List[str] = []  # 行号 -> 项目标准名
+        self.row_texts: List[str] = []  # 行号 -> 项目名或别名原文
+        self.signature = None  # 构建时的数据版本，用于判断是否需要重建
+
+    def __len__(self) -> int:
+        return len(self.row_projects)
+
+    @staticmethod
+    def normalize(vectors: np.ndarray) -> np.ndarray:
+        """按行 L2 归一化，零向量保持为零"""
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def build(self, projects: list, embeddings: Mapping[str, List[float]], signature=None):
+        """从项目列表和向量缓存构建索引（跳过已归档项目和维度不一致的向量）"""
+        rows = []
+        row_projects = []
+        row_texts = []
+        dimension = None
+
+        for proj in projects:
+            if proj.get("status") == "archived":
+                continue
+            proj_name = proj["name"]
+            for text in [proj_name] + proj.get("aliases", []):
+                vec = embeddings.get(text)
+                if vec is None or len(vec) == 0:
+                    continue
+                if dimension is None:
+                    dimension = len(vec)
+                if len(vec) != dimension:
+                    continue
+                rows.append(vec)
+                row_projects.append(proj_name)
+                row_texts.append(text)
+
+        if rows:
+            self.matrix = self.normalize(np.asarray(rows, dtype=np.float32))
+        else:
+            self.matrix = np.zeros((0, 0), dtype=np.float32)
+        self.row_projects = row_projects
+        self.row_texts = row_texts
+        self.signature = signature
+
+    def _top_projects(self, scores: np.ndarray, top_k: int) -> List[Tuple[str, float]]:
+        """从一行相似度中取前 top_k 个不同项目（同一项目取其名称/别名中的最高分）"""
+        results = []
+        seen = set()
+        for row in np.argsort(-scores):
+            proj_name = self.row_projects[row]
+            if proj_name in seen:
+                continue
+            seen.add(proj_name)
+            results.append((proj_name, float(scores[row])))
+            if len(results) >= top_k:
+                break
+        return results
+
+    def search(self, query_vec: List[float], top_k: int = 1) -> List[Tuple[str, float]]:
+        """
+        单个查询向量的 top-k 匹配
+        返回: [(项目标准名, 相似度), ...]，按相似度降序
+        """
+        if not len(self) or not query_vec or len(query_vec) != self.matrix.shape[1]:
+            return []
+        query = self.normalize(np.asarray(query_vec, dtype=np.float32))
+        return self._top_projects(self.matrix @ query, top_k)
+
+    def search_batch(self, query_vecs: List[List[float]], top_k: int = 1) -> List[List[Tuple[str, float]]]:
+        """
+        批量查询：所有查询向量一次矩阵乘法完成打分
+        返回与输入等长的列表，空向量或维度不符的查询对应空结果
+        """
+        results: List[List[Tuple[str, float]]] = [[] for _ in query_vecs]
+        if not len(self):
+            return results
+
+        dimension = self.matrix.shape[1]
+        valid = [i for i, vec in enumerate(query_vecs) if vec and len(vec) == dimension]
+        if not valid:
+            return results
+
+        queries = self.normalize(np.asarray([query_vecs[i] for i in valid], dtype=np.float32))
+        scores = queries @ self.matrix.T  # (查询数, 向量行数)
+        for row, i in enumerate(valid):
+            results[i] = self._top_projects(scores[row], top_k)
+        return results
+
+    def best_match(self, query_vec: List[float]) -> Optional[Tuple[str, float]]:
+        """返回最相似的 (项目标准名, 相似度)，索引为空时返回 None"""
+        results = self.search(query_vec, top_k=1)
+        return results[0] if results else None
@@ -0,0 +1,257 @@
+"""
+项目向量存储 - float32 二进制文件 + 键索引，mmap 方式只读打开
+
+文件布局（以 data/projects_embeddings 为前缀）：
+- projects_embeddings.f32         按行连续存放的 float32 向量
+- projects_embeddings.index.json  {"version", "model", "dimension", "keys"}，keys[i] 对应第 i 行
+- projects_embeddings.lock        跨进程文件锁
+
+新增向量只追加到文件末尾并重写小的索引文件，无需整体重写；
+模型或维度与当前配置不一致时视为过期，按空库处理。
+旧的 projects_embeddings.json 在首次加载时自动迁移。
+
+多个 worker 进程共用同一份文件：写入时持有排他锁，并先按磁盘上的最新内容重新加载再追加；
+读取时定期检查索引文件是否被其他进程修改（inode / 修改时间 / 大小），有变化则重新加载。
+"""
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Mapping, Optional
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows 不支持 flock，只能单进程部署
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+STORE_VERSION = 1
+
+# 检查其他进程是否修改了存储文件的最小间隔（秒）
+RELOAD_CHECK_INTERVAL = 1.0
+
+
+class EmbeddingStore(Mapping):
+    """项目向量存储，按 文本 -> 向量（numpy 行视图）只读访问"""
+
+    def __init__(self, base_path: str, model: str, dimension: int, legacy_json_path: Optional[str] = None):
+        self.data_file = f"{base_path}.f32"
+        self.index_file = f"{base_path}.index.json"
+        self.lock_file = f"{base_path}.lock"
+        self.legacy_json_path = legacy_json_path
+        self.model = model
+        self.dimension = dimension
+        self._keys: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._matrix = np.zeros((0, dimension), dtype=np.float32)
+        self._loaded = False
+        self._file_state = None  # 加载时索引文件的 (inode, 修改时间, 大小)
+        self._checked_at = 0.0
+        self._revision = 0
+
+    @property
+    def revision(self) -> int:
+        """存储内容的版本，本进程或其他进程修改后递增，用于判断由它构建的索引是否过期"""
+        self._ensure_loaded()
+        return self._revision
+
+    # ---------- Mapping 接口 ----------
+
+    def __getitem__(self, key: str) -> np.ndarray:
+        self._ensure_loaded()
+        return self._matrix[self._rows[key]]
+
+    def __contains__(self, key) -> bool:
+        self._ensure_loaded()
+        return key in self._rows
+
+    def __iter__(self) -> Iterator[str]:
+        self._ensure_loaded()
+        return iter(list(self._keys))
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self._keys)
+
+    # ---------- 加载 ----------
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool):
+        """跨进程文件锁：写入用排他锁，加载用共享锁"""
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_file, 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _stat_index(self):
+        try:
+            st = os.stat(self.index_file)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.load()
+            return
+        now = time.monotonic()
+        if now - self._checked_at >= RELOAD_CHECK_INTERVAL:
+            self._checked_at = now
+            if self._stat_index() != self._file_state:
+                self.load()
+
+    def load(self):
+        """加载索引并 mmap 打开向量文件；不存在时尝试从旧 JSON 迁移"""
+        if (not os.path.exists(self.index_file)
+                and self.legacy_json_path and os.path.exists(self.legacy_json_path)):
+            self._migrate_legacy_json()
+        with self._file_lock(exclusive=False):
+            self._read()
+
+    def _read(self):
+        """读取磁盘上的最新内容（调用方持有文件锁）"""
+        self._loaded = True
+        self._checked_at = time.monotonic()
+        self._file_state = self._stat_index()
+        self._revision += 1
+        self._reset()
+
+        if self._file_state is None:
+            return
+
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except Exception as e:
+            logger.warning(f"向量索引文件读取失败，按空库处理: {e}")
+            return
+
+        if (index.get("version") != STORE_VERSION or index.get("model") != self.model
+                or index.get("dimension") != self.dimension):
+            logger.info(
+                f"向量存储版本不匹配（{index.get('model')}/{index.get('dimension')}），"
+                f"当前 {self.model}/{self.dimension}，需重新构建"
+            )
+            return
+
+        keys = index.get("keys", [])
+        if keys:
+            expected_size = len(keys) * self.dimension * 4
+            if not os.path.exists(self.data_file) or os.path.getsize(self.data_file) < expected_size:
+                logger.warning("向量数据文件缺失或不完整，按空库处理")
+                return
+            self._matrix = np.memmap(
+                self.data_file, dtype=np.float32, mode='r', shape=(len(keys), self.dimension)
+            )
+        self._keys = list(keys)
+        self._rows = {key: i for i, key in enumerate(self._keys)}
+
+    def _reset(self):
+        self._keys = []
+        self._rows = {}
+        self._matrix = np.zeros((0, self.dimension), dtype=np.float32)
+
+    def _migrate_legacy_json(self):
+        """从旧的 JSON 向量文件迁移"""
+        try:
+            with open(self.legacy_json_path, 'r', encoding='utf-8') as f:
+                legacy = json.load(f)
+        except Exception as e:
+            logger.warning(f"旧向量文件读取失败，跳过迁移: {e}")
+            return
+
+        vectors = {k: v for k, v in legacy.items() if v and len(v) == self.dimension}
+        with self._file_lock(exclusive=True):
+            # 其他进程可能已完成迁移
+            if os.path.exists(self.index_file):
+                self._read()
+                return
+            self._replace_all(vectors)
+        logger.info(f"已将 {len(vectors)} 条向量从 {self.legacy_json_path} 迁移到二进制存储")
+
+    # ---------- 写入 ----------
+
+    def _write_index(self):
+        """原子写入索引文件"""
+        tmp_file = f"{self.index_file}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({
+                "version": STORE_VERSION,
+                "model": self.model,
+                "dimension": self.dimension,
+                "keys": self._keys
+            }, f, ensure_ascii=False)
+        os.replace(tmp_file, self.index_file)
+
+    def _to_rows(self, vectors: List) -> np.ndarray:
+        return np.asarray(vectors, dtype=np.float32).reshape(-1, self.dimension)
+
+    def append(self, vectors: Mapping[str, List[float]]) -> int:
+        """
+        追加向量：新键追加到数据文件末尾，已有键原地覆盖
+        Returns:
+            写入的条目数
+        """
+        vectors = {k: v for k, v in vectors.items() if v is not None and len(v) == self.dimension}
+        if not vectors:
+            return 0
+
+        with self._file_lock(exclusive=True):
+            # 以磁盘上的最新内容为准（其他进程可能已追加），避免截断掉别人写入的行
+            self._read()
+            self._append(vectors)
+            self._read()
+        return len(vectors)
+
+    def _append(self, vectors: Mapping[str, List[float]]):
+        updates = {k: v for k, v in vectors.items() if k in self._rows}
+        additions = {k: v for k, v in vectors.items() if k not in self._rows}
+
+        if updates:
+            matrix = np.memmap(
+                self.data_file, dtype=np.float32, mode='r+', shape=(len(self._keys), self.dimension)
+            )
+            for key, vec in updates.items():
+                matrix[self._rows[key]] = vec
+            matrix.flush()
+            del matrix
+
+        if additions:
+            # 先截断到已索引的长度，丢弃上次中断时可能残留的半截数据
+            with open(self.data_file, 'ab') as f:
+                f.truncate(len(self._keys) * self.dimension * 4)
+                f.write(self._to_rows(list(additions.values())).tobytes())
+            self._keys.extend(additions.keys())
+            self._write_index()
+
+    def replace_all(self, vectors: Mapping[str, List[float]]):
+        """整体重写存储"""
+        with self._file_lock(exclusive=True):
+            self._replace_all(vectors)
+
+    def _replace_all(self, vectors: Mapping[str, List[float]]):
+        vectors = {k: v for k, v in vectors.items() if v is not None and len(v) == self.dimension}
+        tmp_file = f"{self.data_file}.tmp"
+        with open(tmp_file, 'wb') as f:
+            if vectors:
+                f.write(self._to_rows(list(vectors.values())).tobytes())
+        os.replace(tmp_file, self.data_file)
+        self._keys = list(vectors.keys())
+        self._write_index()
+        self._read()
+
+    def clear(self):
+        """删除存储文件"""
+        with self._file_lock(exclusive=True):
+            for path in (self.index_file, self.data_file):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._read()
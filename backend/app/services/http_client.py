@@ -0,0 +1,87 @@
+"""
+共享 HTTP 连接池 - 每个 LLM 提供商一个长连接客户端
+
+在 FastAPI lifespan 中创建、关闭时统一释放；
+脚本等非 Web 场景下首次使用时自动懒创建。
+"""
+import logging
+from typing import Dict
+import httpx
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# 提供商 -> 是否支持 HTTP/2
+PROVIDER_HTTP2 = {
+    "dashscope": True,
+    "deepseek": True,
+    "openai": False,  # OpenAI 兼容中转，未确认支持 HTTP/2
+}
+
+_clients: Dict[str, httpx.AsyncClient] = {}
+
+
+def _http2_available() -> bool:
+    """HTTP/2 依赖 h2 包，未安装时降级为 HTTP/1.1"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _create_client(provider: str) -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.LLM_HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=settings.LLM_HTTP_KEEPALIVE_EXPIRY
+    )
+    http2 = settings.LLM_HTTP2 and PROVIDER_HTTP2.get(provider, False) and _http2_available()
+    return httpx.AsyncClient(
+        http2=http2,
+        limits=limits,
+        timeout=httpx.Timeout(60.0, connect=settings.LLM_HTTP_CONNECT_TIMEOUT)
+    )
+
+
+def get_http_client(provider: str) -> httpx.AsyncClient:
+    """获取提供商对应的共享客户端（不存在或已关闭时重新创建）"""
+    client = _clients.get(provider)
+    if client is None or client.is_closed:
+        client = _create_client(provider)
+        _clients[provider] = client
+    return client
+
+
+async def post_json(client: httpx.AsyncClient, url: str, headers: dict, payload: dict,
+                    timeout: float, record=None) -> dict:
+    """
+    POST JSON 并返回解析后的响应体
+    record 不为空时在收到成功响应头时记录首字节时间
+    """
+    async with client.stream("POST", url, headers=headers, json=payload, timeout=timeout) as response:
+        if response.is_error:
+            await response.aread()
+            response.raise_for_status()
+        if record is not None:
+            record.mark_first_byte()
+        await response.aread()
+        return response.json()
+
+
+async def init_http_clients():
+    """预创建所有提供商的客户端（应用启动时调用）"""
+    for provider in PROVIDER_HTTP2:
+        get_http_client(provider)
+    logger.info(f"LLM HTTP 连接池已创建: {', '.join(PROVIDER_HTTP2)}")
+
+
+async def close_http_clients():
+    """关闭所有客户端，释放连接（应用关闭时调用）"""
+    for provider, client in list(_clients.items()):
+        try:
+            await client.aclose()
+        except Exception as e:
+            logger.warning(f"关闭 HTTP 客户端失败 ({provider}): {e}")
+    _clients.clear()
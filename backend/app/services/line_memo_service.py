@@ -0,0 +1,220 @@
+"""
+工作行 → 项目 记忆服务
+
+用户保存周报/日报条目即是在确认（或修正）每行工作所属的项目，
+这里按规范化行文本累积确认次数，解析时先查记忆，命中的行不再交给 LLM。
+- 学习：只统计相对上次保存新增的 (行, 项目)，重复保存同一份报告不会重复计数
+- 查询：确认次数和占比都达到阈值才采用
+- 失效：项目重命名、合并时由 taxonomy_service 迁移记录；项目删除或归档后记录保留（恢复项目即可继续使用），
+  查询时忽略
+"""
+import hashlib
+import logging
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Dict, Iterable, Optional, Sequence, Set, Tuple
+from sqlalchemy import select, delete, update, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased
+
+from app.config import get_settings
+from app.database import async_session
+from app.models.line_memo import LineProjectMemo
+from app.services.report_parser_service import LINE_PREFIX_PATTERN
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# 规范化后过短的行（如"会议"）不记忆，避免误命中
+MIN_LINE_LENGTH = 4
+
+_PUNCT_PATTERN = re.compile(r"[\W_]+")
+
+
+def normalize_line(text: str) -> str:
+    """行文本规范化：全半角统一、去除序号前缀、空白和标点，忽略大小写"""
+    text = unicodedata.normalize("NFKC", text or "").strip()
+    text = LINE_PREFIX_PATTERN.sub("", text)
+    return _PUNCT_PATTERN.sub("", text).lower()
+
+
+def _line_hash(normalized: str) -> str:
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class LineMemoService:
+    """工作行 → 项目 记忆"""
+
+    def __init__(self):
+        self.lookups = 0
+        self.hits = 0
+
+    async def learn(
+        self,
+        db: AsyncSession,
+        pairs: Iterable[Tuple[str, Optional[str]]],
+        previous: Iterable[Tuple[str, Optional[str]]] = ()
+    ) -> int:
+        """
+        记录用户确认的 (行, 项目)，在调用方的事务中写入（由调用方提交）
+
+        Args:
+            pairs: 本次保存的 (行文本, 项目名)，项目为空的跳过
+            previous: 保存前已有的 (行文本, 项目名)，其中已存在的组合不重复计数
+
+        Returns:
+            新增确认次数
+        """
+        if not settings.LINE_MEMO_ENABLED:
+            return 0
+
+        seen = {(normalize_line(line), project) for line, project in previous if project}
+        # 同一行拆出的多个条目只算一次确认
+        confirmed: Set[Tuple[str, str]] = set()
+        for line, project in pairs:
+            if not project:
+                continue
+            normalized = normalize_line(line)
+            if len(normalized) >= MIN_LINE_LENGTH and (normalized, project) not in seen:
+                confirmed.add((normalized, project))
+        if not confirmed:
+            return 0
+
+        hashes = {_line_hash(normalized) for normalized, _ in confirmed}
+        result = await db.execute(select(LineProjectMemo).where(LineProjectMemo.line_hash.in_(hashes)))
+        existing = {(row.line_hash, row.project_name): row for row in result.scalars().all()}
+
+        for normalized, project in confirmed:
+            key = (_line_hash(normalized), project)
+            row = existing.get(key)
+            if row is None:
+                db.add(LineProjectMemo(
+                    line_hash=key[0],
+                    line_text=normalized,
+                    project_name=project,
+                    confirm_count=1
+                ))
+            else:
+                row.confirm_count = (row.confirm_count or 0) + 1
+        return len(confirmed)
+
+    async def lookup(self, lines: Sequence[str], active_projects: Set[str]) -> Dict[str, str]:
+        """
+        查询各行记忆的项目
+
+        Args:
+            lines: 行文本
+            active_projects: 当前有效（未归档）的项目名，不在其中的记录忽略
+
+        Returns:
+            {行文本: 项目名}，只包含确认次数和占比达到阈值的行
+        """
+        if not settings.LINE_MEMO_ENABLED or not lines:
+            return {}
+
+        line_hashes = {}
+        for line in lines:
+            normalized = normalize_line(line)
+            if len(normalized) >= MIN_LINE_LENGTH:
+                line_hashes[line] = _line_hash(normalized)
+        if not line_hashes:
+            return {}
+
+        async with async_session() as db:
+            result = await db.execute(
+                select(LineProjectMemo).where(LineProjectMemo.line_hash.in_(set(line_hashes.values())))
+            )
+            rows = list(result.scalars().all())
+
+        by_hash: Dict[str, Dict[str, int]] = defaultdict(dict)
+        for row in rows:
+            if row.project_name in active_projects:
+                by_hash[row.line_hash][row.project_name] = row.confirm_count or 0
+
+        memo = {}
+        for line, line_hash in line_hashes.items():
+            projects = by_hash.get(line_hash)
+            if not projects:
+                continue
+            project, count = max(projects.items(), key=lambda kv: kv[1])
+            if (count >= settings.LINE_MEMO_MIN_CONFIRMATIONS
+                    and count / sum(projects.values()) >= settings.LINE_MEMO_MIN_SHARE):
+                memo[line] = project
+
+        self.lookups += len(line_hashes)
+        self.hits += len(memo)
+        return memo
+
+    def move_projects(self, db: Session, sources: Sequence[str], target: str) -> int:
+        """
+        项目重命名/合并后迁移记忆，在调用方（项目知识库）的同步事务中执行（由调用方提交）
+        同一行在目标项目下已有记录时合并计数。
+        全部是按 project_name 索引的集合操作，不逐行加载
+
+        Returns:
+            迁移的记录数
+        """
+        sources = [name for name in dict.fromkeys(sources) if name and name != target]
+        if not sources:
+            return 0
+        from_sources = LineProjectMemo.project_name.in_(sources)
+
+        source, existing = aliased(LineProjectMemo), aliased(LineProjectMemo)
+        # 目标项目下还没有的行：每行挑一条来源记录直接改名
+        first_ids = (
+            select(func.min(source.id))
+            .where(
+                source.project_name.in_(sources),
+                source.line_hash.not_in(select(existing.line_hash).where(existing.project_name == target))
+            )
+            .group_by(source.line_hash)
+        )
+        result = db.execute(
+            update(LineProjectMemo).where(LineProjectMemo.id.in_(first_ids)).values(project_name=target)
+            .execution_options(synchronize_session=False)
+        )
+        moved = result.rowcount or 0
+
+        # 其余来源记录的确认次数累加到目标记录后删除
+        source_counts = (
+            select(func.coalesce(func.sum(source.confirm_count), 0))
+            .where(source.line_hash == LineProjectMemo.line_hash, source.project_name.in_(sources))
+            .scalar_subquery()
+        )
+        db.execute(
+            update(LineProjectMemo)
+            .where(
+                LineProjectMemo.project_name == target,
+                LineProjectMemo.line_hash.in_(select(source.line_hash).where(source.project_name.in_(sources)))
+            )
+            .values(confirm_count=func.coalesce(LineProjectMemo.confirm_count, 0) + source_counts)
+            .execution_options(synchronize_session=False)
+        )
+        result = db.execute(
+            delete(LineProjectMemo).where(from_sources).execution_options(synchronize_session=False)
+        )
+        return moved + (result.rowcount or 0)
+
+    async def stats(self) -> dict:
+        async with async_session() as db:
+            entries = await db.scalar(select(func.count()).select_from(LineProjectMemo))
+            lines = await db.scalar(select(func.count(func.distinct(LineProjectMemo.line_hash))))
+        return {
+            "entries": entries or 0,
+            "lines": lines or 0,
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.lookups, 4) if self.lookups else 0.0
+        }
+
+
+# 单例
+_line_memo_service: Optional[LineMemoService] = None
+
+
+def get_line_memo_service() -> LineMemoService:
+    global _line_memo_service
+    if _line_memo_service is None:
+        _line_memo_service = LineMemoService()
+    return _line_memo_service
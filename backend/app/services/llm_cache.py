@@ -0,0 +1,150 @@
+"""
+LLM 响应缓存服务 - 内容寻址的持久化缓存
+
+相同的 (提供商, 模型, 系统提示词, 提示词, 温度) 直接返回上次的响应，
+用于草稿重复保存、分析重跑、补录脚本重启等重复请求场景。
+- TTL：超过有效期的条目视为未命中并删除
+- LRU：条目数超过上限时按最近访问时间淘汰
+"""
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import select, delete, func
+
+from app.config import get_settings
+from app.database import async_session
+from app.models.llm import LLMResponseCache as CacheEntry
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# 每写入多少次执行一次淘汰
+EVICT_EVERY_WRITES = 50
+
+
+class LLMResponseCache:
+    """LLM 响应缓存"""
+
+    def __init__(self):
+        self.ttl = timedelta(hours=settings.LLM_CACHE_TTL_HOURS)
+        self.max_entries = settings.LLM_CACHE_MAX_ENTRIES
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+
+    @staticmethod
+    def make_key(provider: str, model: str, system: str, prompt: str, temperature: float) -> str:
+        """计算缓存键"""
+        raw = json.dumps([provider, model, system, prompt, temperature], ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Optional[str]:
+        """读取缓存，未命中或已过期返回 None"""
+        async with async_session() as db:
+            entry = await db.get(CacheEntry, key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            now = datetime.now()
+            if entry.created_at and now - entry.created_at > self.ttl:
+                await db.delete(entry)
+                await db.commit()
+                self.misses += 1
+                return None
+
+            entry.hit_count = (entry.hit_count or 0) + 1
+            entry.last_accessed_at = now
+            response = entry.response
+            await db.commit()
+
+        self.hits += 1
+        return response
+
+    async def set(self, key: str, provider: str, model: str, response: str):
+        """写入缓存"""
+        now = datetime.now()
+        async with async_session() as db:
+            await db.merge(CacheEntry(
+                cache_key=key,
+                provider=provider,
+                model=model,
+                response=response,
+                hit_count=0,
+                created_at=now,
+                last_accessed_at=now
+            ))
+            await db.commit()
+
+            self._writes += 1
+            if self._writes % EVICT_EVERY_WRITES == 0:
+                await self._evict(db)
+
+    async def delete(self, key: str):
+        """删除一条缓存（命中的响应未通过调用方校验时）"""
+        async with async_session() as db:
+            await db.execute(delete(CacheEntry).where(CacheEntry.cache_key == key))
+            await db.commit()
+
+    async def _evict(self, db) -> int:
+        """删除过期条目，并按 LRU 淘汰超出上限的条目"""
+        expired = await db.execute(
+            delete(CacheEntry).where(CacheEntry.created_at < datetime.now() - self.ttl)
+        )
+        removed = expired.rowcount or 0
+
+        total = await db.scalar(select(func.count()).select_from(CacheEntry))
+        overflow = (total or 0) - self.max_entries
+        if overflow > 0:
+            oldest = select(CacheEntry.cache_key).order_by(
+                CacheEntry.last_accessed_at.asc()
+            ).limit(overflow)
+            result = await db.execute(
+                delete(CacheEntry).where(CacheEntry.cache_key.in_(oldest))
+            )
+            removed += result.rowcount or 0
+
+        await db.commit()
+        if removed:
+            logger.info(f"LLM 缓存淘汰 {removed} 条")
+        return removed
+
+    async def clear(self) -> int:
+        """清空缓存"""
+        async with async_session() as db:
+            result = await db.execute(delete(CacheEntry))
+            await db.commit()
+        self.hits = 0
+        self.misses = 0
+        return result.rowcount or 0
+
+    async def stats(self) -> dict:
+        """缓存统计：本进程命中/未命中次数 + 持久化条目数"""
+        async with async_session() as db:
+            entries = await db.scalar(select(func.count()).select_from(CacheEntry))
+            total_hits = await db.scalar(select(func.sum(CacheEntry.hit_count)))
+
+        lookups = self.hits + self.misses
+        return {
+            "enabled": settings.LLM_CACHE_ENABLED,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": entries or 0,
+            "max_entries": self.max_entries,
+            "ttl_hours": settings.LLM_CACHE_TTL_HOURS,
+            "total_hits": total_hits or 0
+        }
+
+
+# 单例
+_llm_cache: Optional[LLMResponseCache] = None
+
+
+def get_llm_cache() -> LLMResponseCache:
+    global _llm_cache
+    if _llm_cache is None:
+        _llm_cache = LLMResponseCache()
+    return _llm_cache
@@ -0,0 +1,181 @@
+"""
+模型级联 - 先用快速模型，输出无法通过校验时再用默认（更强的）模型重做
+
+- 按调用位置启用（LLM_CASCADE_CALL_SITES），且首选提供商在 LLM_CASCADE_FAST_MODELS 中配置了快速模型，
+  否则直接使用默认模型；
+  流式调用先流式输出快速模型的结果，未通过校验时再用默认模型重做并整体替换
+- 校验由调用方提供：返回升级原因（如 invalid_json、unknown_project），通过校验返回 None；
+  需要升级的快速模型输出、无效的默认模型输出都不写入响应缓存
+- 两个阶段分别以 "<调用位置>@fast" / "<调用位置>@strong" 记入调用遥测，
+  级联统计中的耗时与费用取自遥测
+"""
+import logging
+import time
+from typing import AsyncIterator, Callable, Dict, Optional, Tuple
+
+from app.config import get_settings
+from app.services.llm_telemetry import get_llm_telemetry
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# 校验返回该原因表示输出本身不可用（无效 JSON 等），不写入响应缓存；其余原因只影响是否升级
+INVALID_OUTPUT = "invalid_json"
+
+FAST_SUFFIX = "@fast"
+STRONG_SUFFIX = "@strong"
+# 流式调用位置（如 report_parse_stream）随对应的非流式调用位置一起启用
+STREAM_SUFFIX = "_stream"
+
+
+class ModelCascade:
+    """模型级联策略与统计"""
+
+    def __init__(self):
+        self._stats: Dict[str, dict] = {}
+
+    @staticmethod
+    def enabled_call_sites() -> set:
+        return {site.strip() for site in settings.LLM_CASCADE_CALL_SITES.split(",") if site.strip()}
+
+    @staticmethod
+    def fast_models() -> Dict[str, str]:
+        """LLM_CASCADE_FAST_MODELS 解析为 {提供商: 快速模型}（提供商名按 LLMService 规范化）"""
+        from app.services.llm_service import LLMService
+        models = {}
+        for entry in settings.LLM_CASCADE_FAST_MODELS.split(","):
+            provider, _, model = entry.partition("=")
+            if provider.strip() and model.strip():
+                models[LLMService._normalize_provider(provider.strip())] = model.strip()
+        return models
+
+    def is_enabled(self, llm, call_site: str) -> bool:
+        sites = self.enabled_call_sites()
+        return llm.primary_provider in self.fast_models() and (
+            call_site in sites or call_site.removesuffix(STREAM_SUFFIX) in sites
+        )
+
+    def _fast_llm(self, llm):
+        """快速模型的 LLMService（沿用默认模型的提供商和输出上限）"""
+        fast = type(llm)(max_tokens=llm.max_tokens, model=self.fast_models()[llm.primary_provider])
+        fast.provider = llm.provider
+        return fast
+
+    async def call(self, llm, prompt: str, system: str, call_site: str,
+                   validate: Callable[[str], Optional[str]], json_mode: bool = False) -> str:
+        """
+        级联调用
+        Args:
+            llm: 默认模型的 LLMService（快速模型沿用其提供商和输出上限）
+            validate: 校验快速模型的输出，返回升级原因；返回 None 表示采用该输出
+            json_mode: 要求输出 JSON，见 LLMService.call
+        """
+        if not self.is_enabled(llm, call_site):
+            return await llm.call(
+                prompt, system, call_site=call_site, json_mode=json_mode,
+                validate=lambda r: validate(r) != INVALID_OUTPUT
+            )
+
+        started = time.perf_counter()
+        fast = self._fast_llm(llm)
+        # 需要升级的快速模型输出不写入缓存，否则下次仍会命中并再次升级
+        response = await fast.call(
+            prompt, system, call_site=call_site + FAST_SUFFIX, json_mode=json_mode,
+            validate=lambda r: validate(r) is None
+        )
+
+        reason = validate(response)
+        if reason is not None:
+            logger.info(f"级联升级 ({call_site}): {reason}")
+            response = await llm.call(
+                prompt, system, call_site=call_site + STRONG_SUFFIX, json_mode=json_mode,
+                validate=lambda r: validate(r) != INVALID_OUTPUT
+            )
+
+        self._record(call_site, reason, (time.perf_counter() - started) * 1000)
+        return response
+
+    async def stream(self, llm, prompt: str, system: str, call_site: str,
+                     validate: Callable[[str], Optional[str]], json_mode: bool = False) -> AsyncIterator[Tuple[str, str]]:
+        """
+        流式级联：快速模型（未启用级联时为默认模型）的输出逐段产出 ("delta", 增量文本)；
+        快速模型的完整输出未通过校验时用默认模型重做，产出 ("replace", 完整响应)，
+        调用方应以该响应替换之前收到的增量
+        """
+        if not self.is_enabled(llm, call_site):
+            async for delta in llm.stream(
+                prompt, system, call_site=call_site, json_mode=json_mode,
+                validate=lambda r: validate(r) != INVALID_OUTPUT
+            ):
+                yield "delta", delta
+            return
+
+        started = time.perf_counter()
+        chunks = []
+        async for delta in self._fast_llm(llm).stream(
+            prompt, system, call_site=call_site + FAST_SUFFIX, json_mode=json_mode,
+            validate=lambda r: validate(r) is None
+        ):
+            chunks.append(delta)
+            yield "delta", delta
+
+        reason = validate("".join(chunks))
+        if reason is not None:
+            logger.info(f"级联升级 ({call_site}): {reason}")
+            response = await llm.call(
+                prompt, system, call_site=call_site + STRONG_SUFFIX, json_mode=json_mode,
+                validate=lambda r: validate(r) != INVALID_OUTPUT
+            )
+            yield "replace", response
+
+        self._record(call_site, reason, (time.perf_counter() - started) * 1000)
+
+    def _record(self, call_site: str, reason: Optional[str], elapsed_ms: float):
+        stats = self._stats.setdefault(call_site, {
+            "calls": 0, "escalations": 0, "reasons": {}, "total_ms": 0.0, "escalated_ms": 0.0
+        })
+        stats["calls"] += 1
+        stats["total_ms"] += elapsed_ms
+        if reason is not None:
+            stats["escalations"] += 1
+            stats["escalated_ms"] += elapsed_ms
+            stats["reasons"][reason] = stats["reasons"].get(reason, 0) + 1
+
+    async def summary(self) -> dict:
+        """各调用位置的升级次数、升级率、平均端到端耗时，以及两个阶段的调用遥测（含费用）"""
+        telemetry = (await get_llm_telemetry().summary(source="memory", group_by="call_site"))["groups"]
+        sites = {}
+        for call_site, stats in sorted(self._stats.items()):
+            calls, escalations = stats["calls"], stats["escalations"]
+            accepted = calls - escalations
+            sites[call_site] = {
+                "calls": calls,
+                "escalations": escalations,
+                "escalation_rate": round(escalations / calls, 4) if calls else 0.0,
+                "reasons": stats["reasons"],
+                "avg_latency_ms": round(stats["total_ms"] / calls, 1) if calls else None,
+                "avg_accepted_latency_ms": (
+                    round((stats["total_ms"] - stats["escalated_ms"]) / accepted, 1) if accepted else None
+                ),
+                "avg_escalated_latency_ms": (
+                    round(stats["escalated_ms"] / escalations, 1) if escalations else None
+                ),
+                "fast": telemetry.get(call_site + FAST_SUFFIX),
+                "strong": telemetry.get(call_site + STRONG_SUFFIX)
+            }
+        return {
+            "fast_models": self.fast_models(),
+            "enabled_call_sites": sorted(self.enabled_call_sites()),
+            "call_sites": sites
+        }
+
+
+# 单例
+_model_cascade: Optional[ModelCascade] = None
+
+
+def get_model_cascade() -> ModelCascade:
+    global _model_cascade
+    if _model_cascade is None:
+        _model_cascade = ModelCascade()
+    return _model_cascade
@@ -5,16 +5,47 @@ LLM 服务 - 用于智能抽取项目信息
 方案四：混合智能匹配 + Embedding 增强
 1. LLM 原始抽取 → 2. 精确匹配 → 3. Embedding 语义匹配 → 4. LLM智能匹配 → 5. 待审核队列
 """
+import asyncio
+import copy
+import functools
 import json
-import math
+import logging
 import os
+import random
+import time
 from datetime import datetime
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Mapping, AsyncIterator, Callable
 import httpx
+import numpy as np
+from sqlalchemy import select, update
 from app.config import get_settings
-
+from app.services.http_client import get_http_client, post_json
+from app.services.llm_cache import LLMResponseCache, get_llm_cache
+from app.services.embedding_index import ProjectEmbeddingIndex
+from app.services.embedding_store import EmbeddingStore
+from app.services.embedding_cache import get_embedding_cache, normalize_text
+from app.services.project_kb import ProjectKBCache, ProjectKnowledgeBase
+from app.services.project_store import (
+    ProjectStore, name_key, project_to_dict
+)
+from app.models.project import Project, ProjectCategory, PendingProject, RejectedMention
+from app.utils.circuit_breaker import CircuitBreaker
+from app.utils.json_stream import parse_llm_json, is_complete_llm_json
+from app.utils.singleflight import SingleFlight
+from app.utils.token_bucket import PriorityRateLimiter
+from app.utils.token_utils import estimate_tokens
+from app.services.llm_cascade import get_model_cascade
+from app.services.llm_telemetry import (
+    CallRecord, get_llm_telemetry, current_record, set_current_record, reset_current_record
+)
+
+logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# 进行中的相同请求合并（进程内共享）
+_embedding_flight = SingleFlight("embedding")
+_llm_flight = SingleFlight("llm")
+
 
 class EmbeddingService:
     """Embedding 向量服务 - 使用阿里云 DashScope"""
@@ -25,11 +56,53 @@ class EmbeddingService:
         self.dimension = settings.EMBEDDING_DIMENSION
         self.base_url = "https://dashscope.aliyuncs.com/compatible-mode/v1"
 
-    async def get_embedding(self, text: str) -> List[float]:
-        """获取单个文本的向量"""
+    async def _cache_lookup(self, texts: List[str]) -> Dict[str, List[float]]:
+        """查询向量缓存，缓存不可用时视为全部未命中"""
+        if not settings.EMBEDDING_CACHE_ENABLED:
+            return {}
+        try:
+            return await get_embedding_cache().get_many(texts)
+        except Exception as e:
+            logger.warning(f"向量缓存读取失败: {e}")
+            return {}
+
+    async def _cache_store(self, vectors: Dict[str, List[float]]):
+        """写入向量缓存"""
+        if not settings.EMBEDDING_CACHE_ENABLED or not vectors:
+            return
+        try:
+            await get_embedding_cache().set_many(vectors)
+        except Exception as e:
+            logger.warning(f"向量缓存写入失败: {e}")
+
+    async def get_embedding(self, text: str, call_site: str = "unknown") -> List[float]:
+        """获取单个文本的向量（优先读取缓存，并发的相同文本只请求一次）"""
         if not self.api_key:
             return []
 
+        record = CallRecord(call_site, "embedding", "dashscope", self.model)
+        try:
+            normalized = normalize_text(text)
+            cached = await self._cache_lookup([normalized])
+            if normalized in cached:
+                record.cache_hit = True
+                return cached[normalized]
+
+            async def fetch(keys: List[str]) -> Dict[str, List[float]]:
+                # 规范化文本只作缓存键，接口请求发送原文
+                vec = await self._fetch_embedding(text, record)
+                if vec:
+                    await self._cache_store({keys[0]: vec})
+                return {keys[0]: vec}
+
+            vectors = await _embedding_flight.do_many([normalized], fetch)
+            return vectors.get(normalized, [])
+        finally:
+            record.finish()
+            get_llm_telemetry().record(record)
+
+    async def _fetch_embedding(self, text: str, record: Optional[CallRecord] = None) -> List[float]:
+        """调用接口获取单个文本的向量"""
         url = f"{self.base_url}/embeddings"
         headers = {
             "Authorization": f"Bearer {self.api_key}",
@@ -45,51 +118,131 @@ class EmbeddingService:
             payload["dimensions"] = self.dimension
 
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(url, headers=headers, json=payload)
-                response.raise_for_status()
-                result = response.json()
-                return result["data"][0]["embedding"]
+            await _acquire_rate("embedding", estimate_tokens(text), record)
+            client = get_http_client("dashscope")
+            result = await post_json(client, url, headers, payload, 30.0, record)
+            if record is not None:
+                record.add_usage(result.get("usage"), prompt_text=text)
+            return result["data"][0]["embedding"]
         except Exception as e:
-            print(f"Embedding 调用失败: {e}")
+            logger.warning(f"Embedding 调用失败: {e}")
+            if record is not None:
+                record.error = f"{type(e).__name__}: {e}"[:500]
             return []
 
-    async def get_embeddings_batch(self, texts: List[str], batch_size: int = 10) -> List[List[float]]:
-        """批量获取文本向量（分批处理）"""
+    async def _embed_batch(self, url: str, headers: dict, batch: List[str], batch_no: int,
+                           record: Optional[CallRecord] = None) -> List[List[float]]:
+        """请求单个批次，失败时指数退避重试，最终失败用空向量填充"""
+        payload = {
+            "model": self.model,
+            "input": batch,
+            "encoding_format": "float"
+        }
+        if self.model == "text-embedding-v4":
+            payload["dimensions"] = self.dimension
+
+        retries = settings.EMBEDDING_BATCH_RETRIES
+        reserved = estimate_tokens("".join(batch))
+        for attempt in range(retries + 1):
+            try:
+                await _acquire_rate("embedding", reserved, record)
+                client = get_http_client("dashscope")
+                result = await post_json(client, url, headers, payload, 60.0, record)
+                if record is not None:
+                    record.add_usage(result.get("usage"), prompt_text="".join(batch))
+                # 按 index 排序返回
+                embeddings = sorted(result["data"], key=lambda x: x["index"])
+                if len(embeddings) != len(batch):
+                    raise ValueError(f"返回 {len(embeddings)} 条，预期 {len(batch)} 条")
+                return [e["embedding"] for e in embeddings]
+            except Exception as e:
+                # 4xx（429 除外）为请求本身问题，重试无意义
+                status = getattr(getattr(e, "response", None), "status_code", None)
+                retryable = status is None or status == 429 or status >= 500
+                if retryable and attempt < retries:
+                    await asyncio.sleep(0.5 * (2 ** attempt))
+                    continue
+                logger.warning(f"Embedding 批量调用失败 (batch {batch_no}, 第 {attempt + 1} 次尝试): {e}")
+                break
+
+        return [[] for _ in batch]
+
+    async def get_embeddings_batch(self, texts: List[str], batch_size: int = 10,
+                                   call_site: str = "unknown") -> List[List[float]]:
+        """
+        批量获取文本向量（先查缓存，仅对未命中的去重文本调用接口，结果保持输入顺序）
+        其他请求正在获取的文本直接等待其结果，不重复请求
+        """
         if not self.api_key or not texts:
             return []
 
+        record = CallRecord(call_site, "embedding", "dashscope", self.model)
+        try:
+            normalized = [normalize_text(t) for t in texts]
+            # 规范化文本只作缓存键，接口请求发送原文（规范化结果相同的取第一条）
+            originals: Dict[str, str] = {}
+            for key, text in zip(normalized, texts):
+                originals.setdefault(key, text)
+            vectors = await self._cache_lookup(normalized)
+
+            missing = [t for t in dict.fromkeys(normalized) if t not in vectors]
+            record.cache_hit = not missing
+            if missing:
+                async def fetch(keys: List[str]) -> Dict[str, List[float]]:
+                    fetched = dict(zip(keys, await self._fetch_embeddings_batch(
+                        [originals[key] for key in keys], batch_size, record
+                    )))
+                    await self._cache_store({t: vec for t, vec in fetched.items() if vec})
+                    return fetched
+
+                vectors.update(await _embedding_flight.do_many(missing, fetch))
+
+            return [vectors.get(t, []) for t in normalized]
+        finally:
+            record.finish()
+            get_llm_telemetry().record(record)
+
+    async def _fetch_embeddings_batch(self, texts: List[str], batch_size: int = 10,
+                                      record: Optional[CallRecord] = None) -> List[List[float]]:
+        """调用接口批量获取文本向量（分批并发，结果保持输入顺序）"""
         url = f"{self.base_url}/embeddings"
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
 
-        all_embeddings = []
-
-        # 分批处理
-        for i in range(0, len(texts), batch_size):
-            batch = texts[i:i + batch_size]
-            payload = {
-                "model": self.model,
-                "input": batch,
-                "encoding_format": "float"
-            }
-            if self.model == "text-embedding-v4":
-                payload["dimensions"] = self.dimension
-
-            try:
-                async with httpx.AsyncClient(timeout=60.0) as client:
-                    response = await client.post(url, headers=headers, json=payload)
-                    response.raise_for_status()
-                    result = response.json()
-                    # 按 index 排序返回
-                    embeddings = sorted(result["data"], key=lambda x: x["index"])
-                    all_embeddings.extend([e["embedding"] for e in embeddings])
-            except Exception as e:
-                print(f"Embedding 批量调用失败 (batch {i//batch_size + 1}): {e}")
-                # 继续处理剩余批次，用空向量填充失败的
-                all_embeddings.extend([[] for _ in batch])
+        semaphore = asyncio.Semaphore(max(1, settings.EMBEDDING_CONCURRENCY))
+        latencies = []
+
+        async def run(start: int) -> List[List[float]]:
+            queued = time.perf_counter()
+            async with semaphore:
+                began = time.perf_counter()
+                if record is not None:
+                    # 排队等待取各批次中的最大值
+                    record.queue_wait_ms = max(record.queue_wait_ms, (began - queued) * 1000)
+                vectors = await self._embed_batch(
+                    url, headers, texts[start:start + batch_size], start // batch_size + 1, record
+                )
+                latencies.append(time.perf_counter() - began)
+                return vectors
+
+        began = time.perf_counter()
+        # gather 按提交顺序返回，批次内已按 index 排序
+        results = await asyncio.gather(*(run(i) for i in range(0, len(texts), batch_size)))
+        elapsed = time.perf_counter() - began
+
+        all_embeddings = [vec for batch in results for vec in batch]
+
+        latencies.sort()
+        failed = sum(1 for vec in all_embeddings if not vec)
+        if failed and record is not None:
+            record.error = f"{failed}/{len(texts)} 条向量获取失败"
+        logger.info(
+            f"Embedding 批量完成: {len(texts)} 条 / {len(results)} 批, 失败 {failed} 条, "
+            f"耗时 {elapsed:.2f}s, 吞吐 {len(texts) / elapsed if elapsed else 0:.1f} 条/s, "
+            f"批次延迟 p50={latencies[len(latencies) // 2]:.2f}s max={latencies[-1]:.2f}s"
+        )
 
         return all_embeddings
 
@@ -99,109 +252,549 @@ class EmbeddingService:
         if not vec1 or not vec2 or len(vec1) != len(vec2):
             return 0.0
 
-        dot_product = sum(a * b for a, b in zip(vec1, vec2))
-        norm1 = math.sqrt(sum(a * a for a in vec1))
-        norm2 = math.sqrt(sum(b * b for b in vec2))
+        a = np.asarray(vec1, dtype=np.float32)
+        b = np.asarray(vec2, dtype=np.float32)
+        norm1 = np.linalg.norm(a)
+        norm2 = np.linalg.norm(b)
 
         if norm1 == 0 or norm2 == 0:
             return 0.0
 
-        return dot_product / (norm1 * norm2)
+        return float(a @ b / (norm1 * norm2))
+
+
+class LLMUnavailableError(Exception):
+    """提供商链上所有提供商均调用失败"""
+
+
+# 提供商 -> 熔断器（进程内共享）
+_circuit_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_circuit_breaker(provider: str) -> CircuitBreaker:
+    if provider not in _circuit_breakers:
+        _circuit_breakers[provider] = CircuitBreaker(
+            provider,
+            failure_threshold=settings.LLM_CIRCUIT_FAILURE_THRESHOLD,
+            cooldown_seconds=settings.LLM_CIRCUIT_COOLDOWN_SECONDS
+        )
+    return _circuit_breakers[provider]
+
+
+def get_circuit_breakers() -> Dict[str, CircuitBreaker]:
+    return _circuit_breakers
+
+
+# 限速器名（LLM 提供商或 "embedding"）-> 限速器（进程内共享）
+_rate_limiters: Dict[str, PriorityRateLimiter] = {}
+
+
+def _rate_limits(name: str) -> tuple:
+    """限速器名 -> (RPM, TPM)，LLM_RATE_OVERRIDES 中的配置优先"""
+    for entry in settings.LLM_RATE_OVERRIDES.split(","):
+        key, _, value = entry.partition("=")
+        if key.strip() != name or not value.strip():
+            continue
+        rpm, _, tpm = value.partition("/")
+        try:
+            return int(rpm), int(tpm or 0)
+        except ValueError:
+            logger.warning(f"无效的限速配置: {entry}")
+    if name == "embedding":
+        return settings.EMBEDDING_RATE_RPM, settings.EMBEDDING_RATE_TPM
+    return settings.LLM_RATE_RPM, settings.LLM_RATE_TPM
+
+
+def get_rate_limiter(name: str) -> PriorityRateLimiter:
+    if name not in _rate_limiters:
+        rpm, tpm = _rate_limits(name)
+        _rate_limiters[name] = PriorityRateLimiter(name, rpm, tpm, settings.LLM_RATE_BURST_SECONDS)
+    return _rate_limiters[name]
+
+
+def get_rate_limiters() -> Dict[str, PriorityRateLimiter]:
+    return _rate_limiters
+
+
+async def _acquire_rate(name: str, tokens: int, record: Optional[CallRecord] = None):
+    """获取上游请求额度，排队时间计入调用记录"""
+    waited = await get_rate_limiter(name).acquire(tokens)
+    if record is not None and waited:
+        record.queue_wait_ms += waited * 1000
+
+
+def get_flight_stats() -> dict:
+    """请求合并统计"""
+    return {"llm": _llm_flight.stats(), "embedding": _embedding_flight.stats()}
+
+
+# 不支持 JSON 输出模式的 (提供商, 模型)，出现与 response_format 相关的 400 后记录，之后直接使用普通模式
+_json_mode_unsupported: set = set()
+
+
+def _is_json_mode_rejected(e: httpx.HTTPStatusError) -> bool:
+    """400 错误是否因为不支持 JSON 输出模式（错误信息提到 response_format / json_object），其他 400 照常抛出"""
+    if e.response.status_code != 400:
+        return False
+    try:
+        text = e.response.text.lower()
+    except Exception:
+        return False
+    return "response_format" in text or "json_object" in text
 
 
 class LLMService:
     """LLM 调用服务"""
 
-    def __init__(self):
+    TEMPERATURE = 0.3
+    MAX_TOKENS = 2000
+
+    # 输出被截断后的续写指令
+    CONTINUE_PROMPT = "上面的输出因长度限制被截断。请从截断处继续输出剩余内容，不要重复已输出的部分，不要添加任何说明。"
+
+    # 提供商 -> 默认模型
+    PROVIDER_MODELS = {
+        "openai": "qwen-plus",
+        "deepseek": "deepseek-chat",
+        "dashscope": "qwen-plus",  # 禁止使用 qwen-turbo，不建议 qwen-flash
+    }
+
+    def __init__(self, max_tokens: Optional[int] = None, model: Optional[str] = None):
         self.provider = settings.LLM_PROVIDER
+        self.max_tokens = max_tokens or self.MAX_TOKENS  # 单次输出上限，批量解析等长输出场景可调大
+        self.model = model  # 覆盖首选提供商的默认模型（如级联调用的快速模型），备用提供商仍用各自默认模型
 
-    async def _call_openai_compatible(self, prompt: str, system: str = "", model: str = "qwen-plus") -> str:
-        """调用 OpenAI 兼容接口"""
-        url = f"{settings.OPENAI_BASE_URL}/v1/chat/completions"
+    @property
+    def primary_provider(self) -> str:
+        return self._normalize_provider(self.provider)
+
+    def _model_for(self, provider: str) -> str:
+        if self.model and provider == self.primary_provider:
+            return self.model
+        return self.PROVIDER_MODELS[provider]
+
+    @staticmethod
+    def _normalize_provider(provider: str) -> str:
+        """qwen / openai 都走 OpenAI 兼容接口"""
+        return provider if provider in ("deepseek", "dashscope") else "openai"
+
+    @staticmethod
+    def _endpoint(provider: str) -> tuple:
+        """提供商 -> (连接池名, 接口地址, API Key)"""
+        if provider == "deepseek":
+            return "deepseek", f"{settings.DEEPSEEK_BASE_URL}/chat/completions", settings.DEEPSEEK_API_KEY
+        if provider == "dashscope":
+            return (
+                "dashscope",
+                "https://dashscope.aliyuncs.com/compatible-mode/v1/chat/completions",
+                settings.DASHSCOPE_API_KEY
+            )
+        return "openai", f"{settings.OPENAI_BASE_URL}/v1/chat/completions", settings.OPENAI_API_KEY
+
+    def _build_request(self, api_key: str, model: str, prompt: str, system: str = "",
+                       stream: bool = False, json_mode: bool = False,
+                       continuation: Optional[str] = None) -> tuple:
+        """
+        构建请求头和请求体
+        continuation 为上次被截断的输出时，构建续写请求（续写内容是 JSON 片段，不使用 JSON 输出模式）
+        """
         headers = {
-            "Authorization": f"Bearer {settings.OPENAI_API_KEY}",
+            "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json"
         }
         messages = []
         if system:
             messages.append({"role": "system", "content": system})
         messages.append({"role": "user", "content": prompt})
+        if continuation is not None:
+            messages.append({"role": "assistant", "content": continuation})
+            messages.append({"role": "user", "content": self.CONTINUE_PROMPT})
 
         payload = {
             "model": model,
             "messages": messages,
-            "temperature": 0.3,
-            "max_tokens": 2000
+            "temperature": self.TEMPERATURE,
+            "max_tokens": self.max_tokens
         }
+        if json_mode and continuation is None:
+            payload["response_format"] = {"type": "json_object"}
+        if stream:
+            payload["stream"] = True
+        return headers, payload
+
+    async def _chat_completion(self, client_name: str, url: str, api_key: str,
+                               model: str, prompt: str, system: str = "", json_mode: bool = False) -> str:
+        """
+        通过共享连接池调用 chat/completions 接口
+        json_mode 时使用 JSON 输出模式（提供商不支持时退回普通模式并记住）；
+        输出因达到 max_tokens 被截断时自动续写
+        """
+        json_mode = json_mode and settings.LLM_JSON_MODE and (client_name, model) not in _json_mode_unsupported
+        headers, payload = self._build_request(api_key, model, prompt, system, json_mode=json_mode)
 
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(url, headers=headers, json=payload)
+        record = current_record()
+        if record is not None:
+            record.provider, record.model = client_name, model
+
+        client = get_http_client(client_name)
+        reserved = self._reserve_tokens(system + prompt)
+        await _acquire_rate(client_name, reserved, record)
+        try:
+            result = await post_json(client, url, headers, payload, settings.LLM_REQUEST_TIMEOUT, record)
+        except httpx.HTTPStatusError as e:
+            if not json_mode or not _is_json_mode_rejected(e):
+                raise
+            logger.warning(f"{client_name}/{model} 不支持 JSON 输出模式，改用普通模式")
+            _json_mode_unsupported.add((client_name, model))
+            headers, payload = self._build_request(api_key, model, prompt, system)
+            await _acquire_rate(client_name, reserved, record)
+            result = await post_json(client, url, headers, payload, settings.LLM_REQUEST_TIMEOUT, record)
+
+        choice = result["choices"][0]
+        content = choice["message"]["content"] or ""
+        self._settle_rate(client_name, reserved, result.get("usage"), system + prompt, content)
+        if record is not None:
+            record.add_usage(result.get("usage"), prompt_text=system + prompt, completion_text=content)
+
+        for _ in range(settings.LLM_MAX_CONTINUATIONS):
+            if choice.get("finish_reason") != "length":
+                break
+            logger.info(f"LLM 输出达到长度上限，续写 ({client_name}/{model}, 已输出 {len(content)} 字符)")
+            headers, payload = self._build_request(api_key, model, prompt, system, continuation=content)
+            reserved = self._reserve_tokens(system + prompt + content)
+            await _acquire_rate(client_name, reserved, record)
+            result = await post_json(client, url, headers, payload, settings.LLM_REQUEST_TIMEOUT, record)
+            choice = result["choices"][0]
+            more = choice["message"]["content"] or ""
+            if more.lstrip().startswith("```"):
+                # 续写内容不应再包一层代码块
+                more = more.lstrip().split("\n", 1)[-1]
+            self._settle_rate(client_name, reserved, result.get("usage"), system + prompt + content, more)
+            if record is not None:
+                record.add_usage(result.get("usage"), prompt_text=system + prompt + content, completion_text=more)
+            content += more
+        return content
+
+    def _reserve_tokens(self, prompt_text: str) -> int:
+        """限速预留的 token 数：输入按估算，输出按上限的四分之一（响应后按实际用量结算）"""
+        return estimate_tokens(prompt_text) + self.max_tokens // 4
+
+    @staticmethod
+    def _settle_rate(client_name: str, reserved: int, usage: Optional[dict],
+                     prompt_text: str, completion_text: str):
+        usage = usage or {}
+        actual = usage.get("total_tokens")
+        if actual is None:
+            actual = estimate_tokens(prompt_text) + estimate_tokens(completion_text)
+        get_rate_limiter(client_name).settle(reserved, int(actual))
+
+    async def _stream_chat_completion(self, client_name: str, url: str, api_key: str,
+                                      model: str, prompt: str, system: str = "",
+                                      record: Optional[CallRecord] = None,
+                                      json_mode: bool = False) -> AsyncIterator[str]:
+        """以 stream=true 调用 chat/completions，逐段产出增量文本"""
+        json_mode = json_mode and settings.LLM_JSON_MODE and (client_name, model) not in _json_mode_unsupported
+        headers, payload = self._build_request(api_key, model, prompt, system, stream=True, json_mode=json_mode)
+        # 末尾附带一个只含 usage 的数据块
+        payload["stream_options"] = {"include_usage": True}
+        if record is not None:
+            record.provider, record.model = client_name, model
+        usage = None
+        deltas = []
+
+        client = get_http_client(client_name)
+        reserved = self._reserve_tokens(system + prompt)
+        await _acquire_rate(client_name, reserved, record)
+        async with client.stream("POST", url, headers=headers, json=payload,
+                                 timeout=settings.LLM_REQUEST_TIMEOUT) as response:
             response.raise_for_status()
-            result = response.json()
-            return result["choices"][0]["message"]["content"]
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                try:
+                    chunk = json.loads(data)
+                except json.JSONDecodeError:
+                    continue
+                usage = chunk.get("usage") or usage
+                choices = chunk.get("choices") or []
+                delta = (choices[0].get("delta") or {}).get("content") if choices else None
+                if delta:
+                    if record is not None:
+                        record.mark_first_byte()
+                    deltas.append(delta)
+                    yield delta
+
+        self._settle_rate(client_name, reserved, usage, system + prompt, "".join(deltas))
+        if record is not None:
+            record.add_usage(usage, prompt_text=system + prompt, completion_text="".join(deltas))
+
+    async def _call_openai_compatible(self, prompt: str, system: str = "", model: str = "qwen-plus",
+                                      json_mode: bool = False) -> str:
+        """调用 OpenAI 兼容接口"""
+        return await self._chat_completion(*self._endpoint("openai"), model, prompt, system, json_mode)
 
-    async def _call_deepseek(self, prompt: str, system: str = "") -> str:
+    async def _call_deepseek(self, prompt: str, system: str = "", model: str = "deepseek-chat",
+                             json_mode: bool = False) -> str:
         """调用 DeepSeek API"""
-        url = f"{settings.DEEPSEEK_BASE_URL}/chat/completions"
-        headers = {
-            "Authorization": f"Bearer {settings.DEEPSEEK_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        messages = []
-        if system:
-            messages.append({"role": "system", "content": system})
-        messages.append({"role": "user", "content": prompt})
+        return await self._chat_completion(*self._endpoint("deepseek"), model, prompt, system, json_mode)
 
-        payload = {
-            "model": "deepseek-chat",
-            "messages": messages,
-            "temperature": 0.3,
-            "max_tokens": 2000
-        }
+    async def _call_dashscope(self, prompt: str, system: str = "", model: str = "qwen-plus",
+                              json_mode: bool = False) -> str:
+        """调用阿里云 DashScope API"""
+        return await self._chat_completion(*self._endpoint("dashscope"), model, prompt, system, json_mode)
+
+    async def _call_provider(self, provider: str, prompt: str, system: str = "", json_mode: bool = False) -> str:
+        """按提供商分发调用"""
+        model = self._model_for(provider)
+        if provider == "deepseek":
+            return await self._call_deepseek(prompt, system, model, json_mode)
+        elif provider == "dashscope":
+            return await self._call_dashscope(prompt, system, model, json_mode)
+        else:  # 默认使用 qwen (openai compatible)
+            return await self._call_openai_compatible(prompt, system, model, json_mode)
+
+    def provider_chain(self) -> List[str]:
+        """故障转移顺序：当前提供商在前，其后为 LLM_FALLBACK_PROVIDERS 中已配置 API Key 的备用提供商"""
+        chain = [self._normalize_provider(self.provider)]
+        for name in settings.LLM_FALLBACK_PROVIDERS.split(","):
+            name = name.strip()
+            if not name:
+                continue
+            provider = self._normalize_provider(name)
+            if provider not in chain and self._endpoint(provider)[2]:
+                chain.append(provider)
+        return chain
 
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(url, headers=headers, json=payload)
-            response.raise_for_status()
-            result = response.json()
-            return result["choices"][0]["message"]["content"]
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        """429/5xx 和建连失败值得重试；读超时说明提供商已卡住，直接切换下一个提供商"""
+        status = getattr(getattr(error, "response", None), "status_code", None)
+        if status is not None:
+            return status == 429 or status >= 500
+        return isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError))
 
-    async def _call_dashscope(self, prompt: str, system: str = "") -> str:
-        """调用阿里云 DashScope API"""
-        url = "https://dashscope.aliyuncs.com/compatible-mode/v1/chat/completions"
-        headers = {
-            "Authorization": f"Bearer {settings.DASHSCOPE_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        messages = []
-        if system:
-            messages.append({"role": "system", "content": system})
-        messages.append({"role": "user", "content": prompt})
+    @staticmethod
+    def _is_provider_failure(error: Exception) -> bool:
+        """计入熔断的失败：超时、连接错误、429 和 5xx；其余 4xx（请求有误、内容审核等）是请求本身的问题"""
+        status = getattr(getattr(error, "response", None), "status_code", None)
+        if status is not None:
+            return status == 429 or status >= 500
+        return isinstance(error, httpx.TransportError)
+
+    def _record_breaker_failure(self, breaker: CircuitBreaker, error: Exception):
+        if self._is_provider_failure(error):
+            breaker.record_failure(error)
+        else:
+            breaker.record_ignored()
 
-        payload = {
-            "model": "qwen-plus",  # 禁止使用 qwen-turbo，不建议 qwen-flash
-            "messages": messages,
-            "temperature": 0.3,
-            "max_tokens": 2000
-        }
+    @staticmethod
+    def _retry_delay(attempt: int, error: Exception) -> float:
+        """指数退避 + 全抖动；429 带 Retry-After 时以其为准（不超过上限）"""
+        headers = getattr(getattr(error, "response", None), "headers", None) or {}
+        retry_after = headers.get("retry-after")
+        if retry_after:
+            try:
+                return min(float(retry_after), settings.LLM_RETRY_MAX_DELAY)
+            except ValueError:
+                pass
+        delay = min(settings.LLM_RETRY_MAX_DELAY, settings.LLM_RETRY_BASE_DELAY * (2 ** attempt))
+        return random.uniform(0, delay)
+
+    async def _call_with_retry(self, provider: str, prompt: str, system: str = "", json_mode: bool = False) -> str:
+        """调用单个提供商，可重试的错误按退避策略重试"""
+        retries = settings.LLM_MAX_RETRIES
+        for attempt in range(retries + 1):
+            try:
+                return await self._call_provider(provider, prompt, system, json_mode)
+            except Exception as e:
+                if attempt >= retries or not self._is_retryable(e):
+                    raise
+                delay = self._retry_delay(attempt, e)
+                record = current_record()
+                if record is not None:
+                    record.queue_wait_ms += delay * 1000
+                logger.warning(f"LLM 调用失败 ({provider}, 第 {attempt + 1} 次)，{delay:.1f}s 后重试: {e}")
+                await asyncio.sleep(delay)
+
+    async def _call_with_failover(self, prompt: str, system: str = "", json_mode: bool = False) -> str:
+        """
+        按提供商链依次调用：熔断中的提供商直接跳过，失败则切换下一个
+        全部失败时抛出 LLMUnavailableError
+        """
+        errors = []
+        for provider in self.provider_chain():
+            breaker = get_circuit_breaker(provider)
+            if not breaker.allow_request():
+                errors.append(f"{provider}: 熔断中")
+                continue
+            try:
+                response = await self._call_with_retry(provider, prompt, system, json_mode)
+            except Exception as e:
+                self._record_breaker_failure(breaker, e)
+                errors.append(f"{provider}: {e}")
+                logger.warning(f"LLM 提供商 {provider} 调用失败，尝试下一个: {e}")
+                continue
+            breaker.record_success()
+            return response
 
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(url, headers=headers, json=payload)
-            response.raise_for_status()
-            result = response.json()
-            return result["choices"][0]["message"]["content"]
+        raise LLMUnavailableError("; ".join(errors))
+
+    async def _cache_get(self, cache_key: str) -> Optional[str]:
+        try:
+            return await get_llm_cache().get(cache_key)
+        except Exception as e:
+            logger.warning(f"LLM 缓存读取失败: {e}")
+            return None
+
+    async def _cache_set(self, cache_key: str, provider: str, model: str, response: str):
+        try:
+            await get_llm_cache().set(cache_key, provider, model, response)
+        except Exception as e:
+            logger.warning(f"LLM 缓存写入失败: {e}")
 
-    async def call(self, prompt: str, system: str = "") -> str:
-        """统一调用接口"""
+    async def _cache_delete(self, cache_key: str):
         try:
-            if self.provider == "deepseek":
-                return await self._call_deepseek(prompt, system)
-            elif self.provider == "dashscope":
-                return await self._call_dashscope(prompt, system)
-            else:  # 默认使用 qwen (openai compatible)
-                return await self._call_openai_compatible(prompt, system)
+            await get_llm_cache().delete(cache_key)
         except Exception as e:
-            print(f"LLM 调用失败: {e}")
-            return ""
+            logger.warning(f"LLM 缓存删除失败: {e}")
+
+    @staticmethod
+    def _cache_validator(validate: Optional[Callable[[str], bool]], json_mode: bool) -> Optional[Callable[[str], bool]]:
+        """缓存写入条件：调用方提供的校验；JSON 模式默认要求完整的 JSON；都没有时不校验"""
+        if validate is not None:
+            return validate
+        return is_complete_llm_json if json_mode else None
+
+    async def _cached_valid(self, cache_key: str, validate: Optional[Callable[[str], bool]]) -> Optional[str]:
+        """读取缓存，命中的响应未通过校验（如旧版本写入的无效输出）时删除并视为未命中"""
+        cached = await self._cache_get(cache_key)
+        if cached is not None and validate is not None and not validate(cached):
+            await self._cache_delete(cache_key)
+            return None
+        return cached
+
+    def _cache_key(self, prompt: str, system: str) -> tuple:
+        """缓存键按首选提供商计算，故障转移得到的响应同样可被后续请求命中"""
+        provider = self._normalize_provider(self.provider)
+        model = self._model_for(provider)
+        return provider, model, LLMResponseCache.make_key(provider, model, system, prompt, self.TEMPERATURE)
+
+    async def call(self, prompt: str, system: str = "", use_cache: bool = True,
+                   call_site: str = "unknown", json_mode: bool = False,
+                   validate: Optional[Callable[[str], bool]] = None) -> str:
+        """
+        统一调用接口（相同请求优先读取响应缓存，失败时按提供商链故障转移）
+        并发的相同请求合并为一次上游调用；某个调用方被取消不影响其他调用方
+        json_mode: 要求输出 JSON（提供商支持时启用 JSON 输出模式）
+        validate: 响应可用时返回 True，只有可用的响应才写入缓存（拒答、无效 JSON 不缓存，
+                  重试时会重新请求上游）；JSON 模式默认要求完整的 JSON
+        """
+        use_cache = use_cache and settings.LLM_CACHE_ENABLED
+        validate = self._cache_validator(validate, json_mode)
+        provider, model, cache_key = self._cache_key(prompt, system)
+        return await _llm_flight.do(
+            (cache_key, use_cache, json_mode),
+            lambda: self._call_once(prompt, system, use_cache, provider, model, cache_key, call_site, json_mode,
+                                    validate)
+        )
+
+    async def _call_once(self, prompt: str, system: str, use_cache: bool,
+                         provider: str, model: str, cache_key: str, call_site: str,
+                         json_mode: bool = False, validate: Optional[Callable[[str], bool]] = None) -> str:
+        record = CallRecord(call_site, "chat", provider, model)
+        token = set_current_record(record)
+        error = None
+        try:
+            if use_cache:
+                cached = await self._cached_valid(cache_key, validate)
+                if cached is not None:
+                    record.cache_hit = True
+                    return cached
+
+            try:
+                response = await self._call_with_failover(prompt, system, json_mode)
+            except Exception as e:
+                logger.error(f"LLM 调用失败 ({call_site}): {e}")
+                error = e
+                return ""
+
+            if use_cache and response and (validate is None or validate(response)):
+                await self._cache_set(cache_key, provider, model, response)
+
+            return response
+        finally:
+            reset_current_record(token)
+            record.finish(error)
+            get_llm_telemetry().record(record)
+
+    async def stream(self, prompt: str, system: str = "", use_cache: bool = True,
+                     call_site: str = "unknown", json_mode: bool = False,
+                     validate: Optional[Callable[[str], bool]] = None) -> AsyncIterator[str]:
+        """
+        流式调用接口：逐段产出模型输出的增量文本
+        缓存命中时一次性产出完整响应；流结束后通过 validate 校验的响应写入缓存，与 call() 共用缓存
+        尚未产出内容前失败会切换到下一个提供商，已产出部分内容后失败则直接结束
+        """
+        use_cache = use_cache and settings.LLM_CACHE_ENABLED
+        validate = self._cache_validator(validate, json_mode)
+        primary, primary_model, cache_key = self._cache_key(prompt, system)
+        record = CallRecord(call_site, "stream", primary, primary_model)
+
+        try:
+            if use_cache:
+                cached = await self._cached_valid(cache_key, validate)
+                if cached is not None:
+                    record.cache_hit = True
+                    yield cached
+                    return
+
+            chunks = []
+            for provider in self.provider_chain():
+                breaker = get_circuit_breaker(provider)
+                if not breaker.allow_request():
+                    continue
+                try:
+                    async for delta in self._stream_chat_completion(
+                        *self._endpoint(provider), self._model_for(provider), prompt, system, record, json_mode
+                    ):
+                        chunks.append(delta)
+                        yield delta
+                except Exception as e:
+                    self._record_breaker_failure(breaker, e)
+                    record.error = f"{type(e).__name__}: {e}"[:500]
+                    if chunks:
+                        logger.error(f"LLM 流式调用中断 ({provider}): {e}")
+                        return
+                    logger.warning(f"LLM 提供商 {provider} 流式调用失败，尝试下一个: {e}")
+                    continue
+                breaker.record_success()
+                record.error = None
+                break
+            else:
+                logger.error(f"LLM 流式调用失败 ({call_site}): 所有提供商均不可用")
+                record.error = record.error or "所有提供商均不可用"
+                return
+
+            response = "".join(chunks)
+            if use_cache and response and (validate is None or validate(response)):
+                await self._cache_set(cache_key, primary, primary_model, response)
+        finally:
+            record.finish()
+            get_llm_telemetry().record(record)
+
+
+def _in_thread(method):
+    """
+    ProjectExtractor 的知识库管理方法：ProjectStore 是同步的数据库操作，放到线程池中执行，对外是协程
+    （与 extract_from_text 调用 _apply_extraction_updates 的方式相同），调用方 await 即可，不阻塞事件循环
+    """
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        return await asyncio.to_thread(method, *args, **kwargs)
+    return wrapper
 
 
 class ProjectExtractor:
@@ -280,17 +873,18 @@ class ProjectExtractor:
         self.llm = LLMService()
         self.embedding = EmbeddingService()
         self.projects_file = settings.PROJECTS_DATA_PATH
-        self.embeddings_file = settings.PROJECTS_DATA_PATH.replace('.json', '_embeddings.json')
-        self._ensure_projects_file()
-        self._project_embeddings: Dict[str, List[float]] = {}  # 内存缓存
-
-    def _ensure_projects_file(self):
-        """确保项目数据文件存在"""
+        self.embeddings_file = settings.PROJECTS_DATA_PATH.replace('.json', '_embeddings.json')  # 旧格式，仅用于迁移
         os.makedirs(os.path.dirname(self.projects_file), exist_ok=True)
-        if not os.path.exists(self.projects_file):
-            initial_data = self._get_initial_data()
-            with open(self.projects_file, 'w', encoding='utf-8') as f:
-                json.dump(initial_data, f, ensure_ascii=False, indent=2)
+        # 项目知识库存于数据库，首次使用时从 projects.json 导入
+        self.store = ProjectStore(self.projects_file, self._get_initial_data)
+        self.kb_cache = ProjectKBCache(self.store)
+        self.embedding_store = EmbeddingStore(
+            settings.PROJECTS_DATA_PATH.replace('.json', '_embeddings'),
+            settings.EMBEDDING_MODEL,
+            settings.EMBEDDING_DIMENSION,
+            legacy_json_path=self.embeddings_file
+        )
+        self._embedding_index = ProjectEmbeddingIndex()
 
     def _get_initial_data(self) -> dict:
         """获取初始数据结构"""
@@ -365,48 +959,43 @@ class ProjectExtractor:
             "rejected": []  # 已拒绝的（避免重复提示）
         }
 
+    def knowledge_base(self) -> ProjectKnowledgeBase:
+        """项目知识库快照（只读，知识库修改后自动重建）"""
+        return self.kb_cache.get()
+
     def load_known_projects(self) -> dict:
-        """加载项目数据"""
-        try:
-            with open(self.projects_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                # 兼容旧数据结构
-                if "pending_projects" not in data:
-                    data["pending_projects"] = []
-                if "rejected" not in data:
-                    data["rejected"] = []
-                return data
-        except Exception:
-            return self._get_initial_data()
+        """加载项目数据（返回可修改的副本；只读场景请用 knowledge_base()）"""
+        return copy.deepcopy(self.knowledge_base().data)
 
+    @_in_thread
     def save_projects(self, data: dict):
-        """保存项目数据"""
-        with open(self.projects_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        """用完整数据（projects.json 结构）整体替换知识库（导入、恢复用；日常修改请用各管理方法）"""
+        with self.store.transaction() as db:
+            self.store.write_all(db, data)
 
-    def load_embeddings(self) -> Dict[str, List[float]]:
-        """加载项目向量缓存"""
-        if self._project_embeddings:
-            return self._project_embeddings
+    def load_embeddings(self) -> Mapping[str, np.ndarray]:
+        """加载项目向量缓存（二进制 mmap 存储，首次加载时自动迁移旧 JSON）"""
+        return self.embedding_store
 
-        try:
-            if os.path.exists(self.embeddings_file):
-                with open(self.embeddings_file, 'r', encoding='utf-8') as f:
-                    self._project_embeddings = json.load(f)
-        except Exception:
-            self._project_embeddings = {}
+    def save_embeddings(self, embeddings: Mapping[str, List[float]]):
+        """整体重写项目向量缓存"""
+        self.embedding_store.replace_all(embeddings)
 
-        return self._project_embeddings
+    def append_embeddings(self, embeddings: Mapping[str, List[float]]):
+        """追加/更新项目向量（只追加到文件末尾，不整体重写）"""
+        self.embedding_store.append(embeddings)
 
-    def save_embeddings(self, embeddings: Dict[str, List[float]]):
-        """保存项目向量缓存"""
-        self._project_embeddings = embeddings
-        with open(self.embeddings_file, 'w', encoding='utf-8') as f:
-            json.dump(embeddings, f, ensure_ascii=False)
+    def get_embedding_index(self, projects: list) -> ProjectEmbeddingIndex:
+        """获取项目向量矩阵索引，项目知识库或向量缓存（含其他进程写入的）变化时重建"""
+        signature = (self.knowledge_base().version, self.embedding_store.revision)
+
+        if self._embedding_index.signature != signature:
+            self._embedding_index.build(projects, self.load_embeddings(), signature)
+        return self._embedding_index
 
     async def build_project_embeddings(self):
         """构建/更新所有项目的向量索引"""
-        data = self.load_known_projects()
+        data = self.knowledge_base().data
         embeddings = self.load_embeddings()
 
         # 收集需要计算向量的项目名和别名
@@ -436,12 +1025,10 @@ class ProjectExtractor:
         print(f"计算 {len(texts_to_embed)} 个项目/别名的向量...")
 
         # 批量获取向量
-        new_embeddings = await self.embedding.get_embeddings_batch(texts_to_embed)
+        new_embeddings = await self.embedding.get_embeddings_batch(texts_to_embed, call_site="project_index")
 
         if len(new_embeddings) == len(texts_to_embed):
-            for text, vec in zip(texts_to_embed, new_embeddings):
-                embeddings[text] = vec
-            self.save_embeddings(embeddings)
+            self.append_embeddings(dict(zip(texts_to_embed, new_embeddings)))
             print(f"向量索引更新完成，共 {len(embeddings)} 条")
         else:
             print(f"向量计算失败，预期 {len(texts_to_embed)} 条，实际 {len(new_embeddings)} 条")
@@ -451,94 +1038,157 @@ class ProjectExtractor:
         Embedding 语义匹配
         返回: (匹配的项目名, 相似度) 或 None
         """
-        embeddings = self.load_embeddings()
+        index = self.get_embedding_index(projects)
 
         # 如果没有项目向量，跳过
-        if not embeddings:
+        if not len(index):
             return None
 
         # 获取查询文本的向量
-        query_vec = await self.embedding.get_embedding(mention)
+        query_vec = await self.embedding.get_embedding(mention, call_site="embedding_match")
         if not query_vec:
             return None
 
-        best_match = None
-        best_score = 0.0
+        # 一次矩阵-向量乘法得到所有项目名/别名的相似度
+        result = index.best_match(query_vec)
+        if result and result[1] >= self.EMBEDDING_LOW_THRESHOLD:
+            return result
 
-        for proj in projects:
-            if proj.get("status") == "archived":
-                continue
+        return None
 
-            proj_name = proj["name"]
+    async def embedding_match_batch(self, mentions: List[str], projects: list) -> List[Optional[tuple]]:
+        """
+        批量 Embedding 语义匹配：所有提及一次批量向量化，一次矩阵乘法打分
+        返回: 与 mentions 等长的列表，元素为 (匹配的项目名, 相似度) 或 None
+        """
+        if not mentions:
+            return []
 
-            # 检查项目名
-            if proj_name in embeddings:
-                score = EmbeddingService.cosine_similarity(query_vec, embeddings[proj_name])
-                if score > best_score:
-                    best_score = score
-                    best_match = proj_name
+        index = self.get_embedding_index(projects)
+        if not len(index):
+            return [None] * len(mentions)
 
-            # 检查别名
-            for alias in proj.get("aliases", []):
-                if alias in embeddings:
-                    score = EmbeddingService.cosine_similarity(query_vec, embeddings[alias])
-                    if score > best_score:
-                        best_score = score
-                        best_match = proj_name
+        query_vecs = await self.embedding.get_embeddings_batch(mentions, call_site="embedding_match")
+        if len(query_vecs) != len(mentions):
+            return [None] * len(mentions)
 
-        if best_match and best_score >= self.EMBEDDING_LOW_THRESHOLD:
-            return (best_match, best_score)
+        results = []
+        for top in index.search_batch(query_vecs, top_k=1):
+            if top and top[0][1] >= self.EMBEDDING_LOW_THRESHOLD:
+                results.append(top[0])
+            else:
+                results.append(None)
+        return results
 
-        return None
+    async def known_projects_block(self, text: str, projects: list,
+                                   format_line: Callable[[dict], str], call_site: str) -> str:
+        """
+        生成 prompt 中的已知项目列表
+        开启 PROMPT_PROJECT_PRUNING 时只详细列出与文本相关的候选项目，其余项目仅列名称，
+        并记录裁剪前后的估算 token 数
+        """
+        active = [p for p in projects if p.get("status") != "archived"]
+        full_block = "\n".join(format_line(p) for p in active)
+        if not settings.PROMPT_PROJECT_PRUNING:
+            return full_block or "暂无"
+
+        candidates = await self.shortlist_projects(text, projects, settings.PROMPT_PROJECT_TOP_K)
+        if candidates is None:
+            block = full_block
+        else:
+            candidate_names = {p["name"] for p in candidates}
+            others = [p["name"] for p in active if p["name"] not in candidate_names]
+            block = "\n".join(format_line(p) for p in candidates)
+            if others:
+                block += f"\n\n其他项目（仅列名称，内容明确相关时才选择）：{'、'.join(others)}"
+
+        full_tokens, pruned_tokens = estimate_tokens(full_block), estimate_tokens(block)
+        get_llm_telemetry().record_prompt_pruning(call_site, full_tokens, pruned_tokens)
+        logger.debug(f"项目列表裁剪 ({call_site}): {full_tokens} -> {pruned_tokens} tokens")
+        return block or "暂无"
+
+    async def shortlist_projects(self, text: str, projects: list, top_k: int) -> Optional[List[dict]]:
+        """
+        为给定文本挑选最可能相关的 top_k 个项目，用于裁剪 prompt 中的项目列表
+        - 项目名、别名、子项名出现在文本中的项目优先（全部保留）
+        - 其余名额按文本各行与项目向量的最高相似度排序
+        返回按项目库原顺序排列的候选项目；项目数不超过 top_k 或无法得出候选时返回 None（使用完整列表）
+        """
+        active = [p for p in projects if p.get("status") != "archived"]
+        if len(active) <= top_k or not text:
+            return None
 
-    def exact_match(self, mention: str, projects: list) -> Optional[str]:
-        """精确匹配：项目名或别名完全匹配"""
-        mention_lower = mention.lower().strip()
-        for proj in projects:
-            if proj.get("status") == "archived":
-                continue
-            # 项目名匹配
-            if mention_lower == proj["name"].lower():
-                return proj["name"]
-            # 别名匹配
-            for alias in proj.get("aliases", []):
-                if mention_lower == alias.lower():
-                    return proj["name"]
-                # 包含匹配（如 "清图网站更新" 包含 "清图"）
-                if alias.lower() in mention_lower and len(alias) >= 2:
-                    return proj["name"]
-        return None
+        # 名称命中（得分高于任何相似度）：项目名/别名/子项名一次扫描全部找出
+        name_hit_score = 2.0
+        kb = self.knowledge_base()
+        active_names = {p["name"] for p in active}
+        hits = kb.name_automaton.find_all(text) + kb.sub_item_automaton.find_all(text)
+        scores: Dict[str, float] = {
+            match.value: name_hit_score for match in hits if match.value in active_names
+        }
 
-    def is_rejected(self, mention: str, rejected: list) -> bool:
-        """检查是否在拒绝列表中"""
-        mention_lower = mention.lower().strip()
-        for r in rejected:
-            if r.lower() == mention_lower:
-                return True
-        return False
+        # 语义相似度：每行工作内容分别检索，取各项目的最高分
+        if len(scores) < top_k and self.embedding.api_key:
+            lines = [line.strip() for line in text.splitlines() if len(line.strip()) > 2][:50]
+            index = self.get_embedding_index(projects)
+            if lines and len(index):
+                query_vecs = await self.embedding.get_embeddings_batch(lines, call_site="prompt_shortlist")
+                for top in index.search_batch(query_vecs, top_k=top_k):
+                    for proj_name, score in top:
+                        if score > scores.get(proj_name, -1.0):
+                            scores[proj_name] = score
+
+        if not scores:
+            return None
+        # 名称命中的项目全部保留，即使超过 top_k
+        name_hits = sum(1 for score in scores.values() if score >= name_hit_score)
+        ranked = sorted(scores, key=scores.get, reverse=True)
+        selected = set(ranked[:max(top_k, name_hits)])
+        return [p for p in active if p["name"] in selected]
+
+    def exact_match(self, mention: str) -> Optional[str]:
+        """精确匹配：项目名或别名完全匹配，其次为包含匹配（如 "清图网站更新" 包含 "清图"，取最长的命中）"""
+        kb = self.knowledge_base()
+        matched = kb.match(mention)
+        if matched:
+            return matched
+        matches = kb.name_automaton.find_longest(mention)
+        if matches:
+            return max(matches, key=lambda m: m.length).value
+        return None
 
-    def is_pending(self, mention: str, pending: list) -> bool:
-        """检查是否已在待审核列表中"""
-        mention_lower = mention.lower().strip()
-        for p in pending:
-            if p["name"].lower() == mention_lower:
-                return True
-        return False
+    def is_rejected(self, mention: str, rejected: Optional[list] = None) -> bool:
+        """检查是否在拒绝列表中（不传列表时查询数据库）"""
+        if rejected is None:
+            with self.store.session() as db:
+                return self.store.is_rejected(db, mention)
+        mention_key = name_key(mention)
+        return any(name_key(r) == mention_key for r in rejected)
+
+    def is_pending(self, mention: str, pending: Optional[list] = None) -> bool:
+        """检查是否已在待审核列表中（不传列表时查询数据库）"""
+        if pending is None:
+            with self.store.session() as db:
+                return self.store.find_pending(db, mention, ignore_case=True) is not None
+        mention_key = name_key(mention)
+        return any(name_key(p["name"]) == mention_key for p in pending)
 
     async def phase1_extract(self, work_content: str) -> dict:
         """第一阶段：LLM 原始提取"""
         prompt = self.EXTRACT_PROMPT_TEMPLATE.format(work_content=work_content)
 
         try:
-            response = await self.llm.call(prompt, self.EXTRACT_SYSTEM_PROMPT)
-            response = self._clean_json_response(response)
-            result = json.loads(response)
+            response = await get_model_cascade().call(
+                self.llm, prompt, self.EXTRACT_SYSTEM_PROMPT, "project_extract", self._extract_escalation_reason,
+                json_mode=True
+            )
+            result, _ = parse_llm_json(response, ("raw_mentions",))
             return {
                 "raw_mentions": result.get("raw_mentions", []),
                 "work_categories": result.get("work_categories", {})
             }
         except Exception as e:
-            print(f"第一阶段提取失败: {e}")
+            logger.warning(f"第一阶段提取失败: {e}")
             return {"raw_mentions": [], "work_categories": {}}
 
     async def phase2_match(self, mentions: list, known_data: dict) -> dict:
@@ -547,42 +1197,77 @@ class ProjectExtractor:
             return {"matches": [], "suggested_aliases": []}
 
         # 生成已知项目列表
-        projects_list = "\n".join([
-            f"- {p['name']}（别名：{', '.join(p.get('aliases', []))}）"
-            for p in known_data["projects"]
-            if p.get("status") != "archived"
-        ])
+        projects_list = await self.known_projects_block(
+            "\n".join(mentions),
+            known_data["projects"],
+            lambda p: f"- {p['name']}（别名：{', '.join(p.get('aliases', []))}）",
+            call_site="project_match"
+        )
 
         prompt = self.MATCH_PROMPT_TEMPLATE.format(
-            known_projects=projects_list or "暂无",
+            known_projects=projects_list,
             mentions=json.dumps(mentions, ensure_ascii=False)
         )
 
+        known_names = {p["name"] for p in known_data["projects"] if p.get("status") != "archived"}
         try:
-            response = await self.llm.call(prompt, self.MATCH_SYSTEM_PROMPT)
-            response = self._clean_json_response(response)
-            return json.loads(response)
+            response = await get_model_cascade().call(
+                self.llm, prompt, self.MATCH_SYSTEM_PROMPT, "project_match",
+                lambda r: self._match_escalation_reason(r, known_names),
+                json_mode=True
+            )
+            result, _ = parse_llm_json(response, ("matches",))
+            return result
         except Exception as e:
-            print(f"第二阶段匹配失败: {e}")
+            logger.warning(f"第二阶段匹配失败: {e}")
             return {"matches": [], "suggested_aliases": []}
 
-    def _clean_json_response(self, response: str) -> str:
-        """清理 LLM 响应，提取 JSON"""
-        response = response.strip()
-        if response.startswith("```"):
-            parts = response.split("```")
-            if len(parts) >= 2:
-                response = parts[1]
-                if response.startswith("json"):
-                    response = response[4:]
-        return response.strip()
+    # 匹配置信度低于该值（且未标记为新项目/忽略）时，级联调用升级到默认模型
+    CASCADE_MIN_CONFIDENCE = 0.5
+
+    def _extract_escalation_reason(self, response: str) -> Optional[str]:
+        """第一阶段级联校验：输出须为含 raw_mentions 列表的 JSON"""
+        try:
+            result, _ = parse_llm_json(response, ("raw_mentions",))
+        except json.JSONDecodeError:
+            return "invalid_json"
+        if not isinstance(result, dict) or not isinstance(result.get("raw_mentions"), list):
+            return "invalid_json"
+        return None
+
+    def _match_escalation_reason(self, response: str, known_names: set) -> Optional[str]:
+        """第二阶段级联校验：JSON 有效，匹配结果须为已知项目且置信度足够"""
+        try:
+            result, _ = parse_llm_json(response, ("matches",))
+        except json.JSONDecodeError:
+            return "invalid_json"
+        if not isinstance(result, dict) or not isinstance(result.get("matches"), list):
+            return "invalid_json"
+        for match in result["matches"]:
+            if not isinstance(match, dict):
+                return "invalid_json"
+            if match.get("is_new_project") or match.get("should_ignore"):
+                continue
+            matched = match.get("matched_project")
+            if matched and matched not in known_names:
+                return "unknown_project"
+            try:
+                confidence = float(match.get("confidence", 1.0))
+            except (TypeError, ValueError):
+                confidence = 0.0
+            if confidence < self.CASCADE_MIN_CONFIDENCE:
+                return "low_confidence"
+        return None
 
     async def extract_from_text(self, work_content: str) -> dict:
-        """混合匹配流程：提取并匹配项目"""
-        known_data = self.load_known_projects()
+        """
+        混合匹配流程：提取并匹配项目
+        匹配期间（LLM / Embedding 调用）其他请求可能修改了项目数据，
+        因此新的拒绝项、待审核项目和学习到的别名先收集起来，最后在最新数据上合并保存
+        """
+        kb = self.knowledge_base()
+        known_data = kb.data
         projects = known_data.get("projects", [])
-        rejected = known_data.get("rejected", [])
-        pending = known_data.get("pending_projects", [])
 
         # 第一阶段：原始提取
         phase1_result = await self.phase1_extract(work_content)
@@ -592,14 +1277,16 @@ class ProjectExtractor:
         # 分类处理
         matched_projects = {}  # {标准名: {mentions, work_items}}
         unmatched_mentions = []  # 需要进一步匹配的
+        new_rejected = []  # 新增的拒绝项
+        learned_aliases = []  # 学习到的 (项目标准名, 别名)
 
         for mention in raw_mentions:
             # 检查拒绝列表
-            if self.is_rejected(mention, rejected):
+            if name_key(mention) in kb.rejected_names:
                 continue
 
             # 精确匹配
-            matched_name = self.exact_match(mention, projects)
+            matched_name = self.exact_match(mention)
             if matched_name:
                 if matched_name not in matched_projects:
                     matched_projects[matched_name] = {"name": matched_name, "mentions": 0, "work_items": []}
@@ -608,10 +1295,10 @@ class ProjectExtractor:
             else:
                 unmatched_mentions.append(mention)
 
-        # 第1.5阶段：Embedding 语义匹配
+        # 第1.5阶段：Embedding 语义匹配（所有未匹配提及一次批量处理）
         still_unmatched = []
-        for mention in unmatched_mentions:
-            embed_result = await self.embedding_match(mention, projects)
+        embed_results = await self.embedding_match_batch(unmatched_mentions, projects)
+        for mention, embed_result in zip(unmatched_mentions, embed_results):
             if embed_result:
                 matched_name, score = embed_result
                 if score >= self.EMBEDDING_HIGH_THRESHOLD:
@@ -643,8 +1330,8 @@ class ProjectExtractor:
 
                 if should_ignore:
                     # 添加到拒绝列表（低置信度的忽略项）
-                    if confidence > 0.7 and mention not in rejected:
-                        rejected.append(mention)
+                    if confidence > 0.7 and name_key(mention) not in kb.rejected_names and mention not in new_rejected:
+                        new_rejected.append(mention)
                     continue
 
                 if matched_project and confidence >= 0.6:
@@ -655,7 +1342,8 @@ class ProjectExtractor:
                     matched_projects[matched_project]["work_items"].append(mention)
                 elif is_new and confidence >= 0.7:
                     # 新项目，加入待审核
-                    if not self.is_pending(mention, pending) and mention not in rejected:
+                    if (name_key(mention) not in kb.pending_names and name_key(mention) not in kb.rejected_names
+                            and mention not in new_rejected):
                         new_pending.append({
                             "name": mention,
                             "first_seen": datetime.now().strftime("%Y-%m-%d"),
@@ -670,25 +1358,10 @@ class ProjectExtractor:
                 proj_name = alias_suggestion.get("project")
                 new_alias = alias_suggestion.get("new_alias")
                 if proj_name and new_alias:
-                    for proj in projects:
-                        if proj["name"] == proj_name and new_alias not in proj.get("aliases", []):
-                            proj.setdefault("aliases", []).append(new_alias)
-                            print(f"自动学习别名: {proj_name} <- {new_alias}")
-
-        # 更新待审核列表
-        for new_p in new_pending:
-            # 检查是否已存在
-            existing = next((p for p in pending if p["name"].lower() == new_p["name"].lower()), None)
-            if existing:
-                existing["mentions"] += 1
-                existing["source_texts"].extend(new_p["source_texts"])
-            else:
-                pending.append(new_p)
+                    learned_aliases.append((proj_name, new_alias))
 
-        # 保存更新
-        known_data["rejected"] = rejected
-        known_data["pending_projects"] = pending
-        self.save_projects(known_data)
+        # 同步数据库事务，放到线程池中执行
+        await asyncio.to_thread(self._apply_extraction_updates, new_rejected, new_pending, learned_aliases)
 
         return {
             "projects": list(matched_projects.values()),
@@ -696,6 +1369,49 @@ class ProjectExtractor:
             "new_projects": [p["name"] for p in new_pending]
         }
 
+    def _apply_extraction_updates(self, new_rejected: list, new_pending: list, learned_aliases: list):
+        """
+        在一个数据库事务中合并抽取结果（期间其他请求的修改不会被覆盖）
+        没有任何变化时不递增知识库版本号
+        """
+        if not (new_rejected or new_pending or learned_aliases):
+            return
+        with self.store.transaction() as db:
+            for mention in new_rejected:
+                if not db.scalar(select(RejectedMention.id).where(RejectedMention.name == mention)):
+                    db.add(RejectedMention(name=mention, name_key=name_key(mention)))
+                    db.flush()
+
+            # 更新待审核列表
+            for new_p in new_pending:
+                # 检查是否已存在
+                existing = self.store.find_pending(db, new_p["name"], ignore_case=True)
+                if existing:
+                    existing.mentions = (existing.mentions or 0) + 1
+                    existing.source_texts = json.dumps(
+                        json.loads(existing.source_texts or "[]") + new_p["source_texts"], ensure_ascii=False
+                    )
+                else:
+                    db.add(PendingProject(
+                        kind="project",
+                        name=new_p["name"],
+                        name_key=name_key(new_p["name"]),
+                        first_seen=new_p["first_seen"],
+                        mentions=new_p["mentions"],
+                        source_texts=json.dumps(new_p["source_texts"], ensure_ascii=False),
+                        suggested_category=new_p["suggested_category"],
+                        confidence=new_p["confidence"]
+                    ))
+                db.flush()
+
+            for proj_name, new_alias in learned_aliases:
+                project = self.store.find_project(db, proj_name)
+                if (project and new_alias not in [a.alias for a in project.aliases]
+                        and not self.store.key_taken(db, new_alias, [project.id])):
+                    self.store.set_aliases(project, [a.alias for a in project.aliases] + [new_alias])
+                    db.flush()
+                    print(f"自动学习别名: {proj_name} <- {new_alias}")
+
     async def extract_batch(self, reports: list) -> dict:
         """批量提取多人周报的项目信息"""
         all_work_content = []
@@ -732,193 +1448,170 @@ class ProjectExtractor:
 
     # ========== 项目管理 API ==========
 
+    @_in_thread
     def get_pending_projects(self) -> list:
         """获取待审核项目列表"""
-        data = self.load_known_projects()
-        return data.get("pending_projects", [])
+        with self.store.session() as db:
+            return self.store.list_pending(db)
 
+    @_in_thread
     def add_pending_project(self, name: str, suggested_by: str = "") -> bool:
         """添加待审核项目（用户建议）"""
         from datetime import datetime
-        data = self.load_known_projects()
-        pending = data.get("pending_projects", [])
-
-        # 检查是否已在待审核列表
-        if self.is_pending(name, pending):
-            return False
-
-        # 添加到待审核列表
-        pending.append({
-            "name": name,
-            "first_seen": datetime.now().strftime("%Y-%m-%d"),
-            "mentions": 1,
-            "source_texts": [],
-            "suggested_category": "其他",
-            "confidence": 1.0,
-            "suggested_by": suggested_by
-        })
-
-        data["pending_projects"] = pending
-        self.save_projects(data)
+        with self.store.transaction() as db:
+            # 检查是否已在待审核列表
+            if self.store.find_pending(db, name, ignore_case=True):
+                return False
+
+            # 添加到待审核列表
+            db.add(PendingProject(
+                kind="project",
+                name=name,
+                name_key=name_key(name),
+                first_seen=datetime.now().strftime("%Y-%m-%d"),
+                mentions=1,
+                source_texts="[]",
+                suggested_category="其他",
+                confidence=1.0,
+                suggested_by=suggested_by
+            ))
         return True
 
+    @_in_thread
     def approve_pending_project(self, name: str, category: str = "其他") -> bool:
         """确认待审核项目"""
-        data = self.load_known_projects()
-        pending = data.get("pending_projects", [])
-
-        # 找到待审核项目
-        target = next((p for p in pending if p["name"] == name), None)
-        if not target:
-            return False
-
-        # 添加到正式列表
-        data["projects"].append({
-            "name": name,
-            "aliases": [],
-            "category": category,
-            "status": "active"
-        })
-
-        # 从待审核中移除
-        data["pending_projects"] = [p for p in pending if p["name"] != name]
-        self.save_projects(data)
-        return True
-
-    def merge_pending_to_existing(self, pending_name: str, target_project: str) -> bool:
-        """将待审核项目作为别名合并到已有项目"""
-        data = self.load_known_projects()
-        pending = data.get("pending_projects", [])
-
-        # 找到待审核项目
-        target_pending = next((p for p in pending if p["name"] == pending_name), None)
-        if not target_pending:
-            return False
-
-        # 找到目标项目并添加别名
-        for proj in data["projects"]:
-            if proj["name"] == target_project:
-                if pending_name not in proj.get("aliases", []):
-                    proj.setdefault("aliases", []).append(pending_name)
-                break
-        else:
-            return False
+        with self.store.transaction() as db:
+            # 找到待审核项目
+            target = self.store.find_pending(db, name)
+            if not target:
+                return False
 
-        # 从待审核中移除
-        data["pending_projects"] = [p for p in pending if p["name"] != pending_name]
-        self.save_projects(data)
+            # 添加到正式列表（已有同名项目或别名时只移除待审核记录）
+            if not self.store.key_taken(db, name):
+                db.add(Project(
+                    name=name,
+                    name_key=name_key(name),
+                    category=category,
+                    status="active",
+                    description="",
+                    position=self.store.next_position(db, Project)
+                ))
+
+            # 从待审核中移除
+            db.delete(target)
         return True
 
+    @_in_thread
+    def merge_pending_to_existing(self, pending_name: str, target_project: str) -> Optional[Dict[str, int]]:
+        """
+        将待审核项目作为别名合并到已有项目，已按待审核名称记录的条目、任务、行记忆在同一事务中归入目标项目
+
+        Returns:
+            各业务表受影响的行数；待审核项目或目标项目不存在时返回 None
+        """
+        from app.services.taxonomy_service import get_taxonomy_service
+        with self.store.transaction() as db:
+            # 找到待审核项目
+            target_pending = self.store.find_pending(db, pending_name)
+            if not target_pending:
+                return None
+
+            # 找到目标项目并添加别名
+            project = self.store.find_project(db, target_project)
+            if project is None or self.store.key_taken(db, pending_name, [project.id]):
+                return None
+            self.store.set_aliases(project, [a.alias for a in project.aliases] + [pending_name])
+
+            # 从待审核中移除
+            db.delete(target_pending)
+            return get_taxonomy_service().apply(db, {pending_name: target_project})
+
+    @_in_thread
     def reject_pending_project(self, name: str) -> bool:
         """拒绝待审核项目"""
-        data = self.load_known_projects()
-        pending = data.get("pending_projects", [])
-
-        # 从待审核中移除
-        data["pending_projects"] = [p for p in pending if p["name"] != name]
-
-        # 添加到拒绝列表
-        if name not in data.get("rejected", []):
-            data.setdefault("rejected", []).append(name)
-
-        self.save_projects(data)
+        with self.store.transaction() as db:
+            # 从待审核中移除
+            target = self.store.find_pending(db, name)
+            if target:
+                db.delete(target)
+
+            # 添加到拒绝列表
+            if db.scalar(select(RejectedMention.id).where(RejectedMention.name == name)) is None:
+                db.add(RejectedMention(name=name, name_key=name_key(name)))
         return True
 
+    @_in_thread
     def add_pending_sub_item(self, parent_project: str, sub_item_name: str, suggested_by: str = "") -> bool:
         """添加待审核子分类（用户建议）"""
         from datetime import datetime
-        data = self.load_known_projects()
-
-        # 检查父项目是否存在
-        parent = next((p for p in data.get("projects", []) if p["name"] == parent_project), None)
-        if not parent:
-            return False
-
-        # 检查子分类是否已存在
-        existing_sub_items = parent.get("sub_items", [])
-        for sub in existing_sub_items:
-            sub_name = sub.get("name") if isinstance(sub, dict) else sub
-            if sub_name.lower() == sub_item_name.lower():
+        with self.store.transaction() as db:
+            # 检查父项目是否存在
+            parent = self.store.find_project(db, parent_project)
+            if not parent:
+                return False
+
+            # 检查子分类是否已存在
+            if any(sub.name_key == name_key(sub_item_name) for sub in parent.sub_items):
                 return False  # 子分类已存在
 
-        # 检查是否已在待审核列表
-        pending = data.get("pending_projects", [])
-        for p in pending:
-            if (p.get("type") == "sub_item" and
-                p.get("parent_project") == parent_project and
-                p.get("name", "").lower() == sub_item_name.lower()):
+            # 检查是否已在待审核列表
+            if self.store.find_pending(db, sub_item_name, "sub_item", parent_project, ignore_case=True):
                 return False  # 已在审核中
 
-        # 添加到待审核列表
-        pending.append({
-            "type": "sub_item",
-            "name": sub_item_name,
-            "parent_project": parent_project,
-            "first_seen": datetime.now().strftime("%Y-%m-%d"),
-            "suggested_by": suggested_by
-        })
-
-        data["pending_projects"] = pending
-        self.save_projects(data)
+            # 添加到待审核列表
+            db.add(PendingProject(
+                kind="sub_item",
+                name=sub_item_name,
+                name_key=name_key(sub_item_name),
+                parent_project=parent_project,
+                first_seen=datetime.now().strftime("%Y-%m-%d"),
+                suggested_by=suggested_by
+            ))
         return True
 
+    @_in_thread
     def approve_pending_sub_item(self, parent_project: str, sub_item_name: str) -> bool:
         """批准待审核子分类"""
-        data = self.load_known_projects()
-        pending = data.get("pending_projects", [])
-
-        # 找到待审核子分类
-        target = next((p for p in pending
-                       if p.get("type") == "sub_item" and
-                       p.get("parent_project") == parent_project and
-                       p.get("name") == sub_item_name), None)
-        if not target:
-            return False
-
-        # 找到父项目并添加子分类
-        for proj in data["projects"]:
-            if proj["name"] == parent_project:
-                if "sub_items" not in proj:
-                    proj["sub_items"] = []
-                # 添加为对象格式
-                proj["sub_items"].append({
-                    "name": sub_item_name,
-                    "description": ""
-                })
-                break
-        else:
-            return False
-
-        # 从待审核中移除
-        data["pending_projects"] = [p for p in pending
-                                    if not (p.get("type") == "sub_item" and
-                                            p.get("parent_project") == parent_project and
-                                            p.get("name") == sub_item_name)]
-        self.save_projects(data)
+        with self.store.transaction() as db:
+            # 找到待审核子分类
+            target = self.store.find_pending(db, sub_item_name, "sub_item", parent_project)
+            if not target:
+                return False
+
+            # 找到父项目并添加子分类
+            project = self.store.find_project(db, parent_project)
+            if project is None:
+                return False
+            self.store.set_sub_items(
+                project,
+                [{"name": s.name, "description": s.description} for s in project.sub_items]
+                + [{"name": sub_item_name, "description": ""}]
+            )
+
+            # 从待审核中移除
+            db.delete(target)
         return True
 
     def get_all_projects(self) -> list:
         """获取所有项目（用于下拉选择）"""
-        data = self.load_known_projects()
         return [{"name": p["name"], "category": p.get("category", "其他")}
-                for p in data.get("projects", [])
-                if p.get("status") != "archived"]
+                for p in self.knowledge_base().active_projects]
 
+    @_in_thread
     def add_alias(self, project_name: str, alias: str) -> bool:
-        """为项目添加别名"""
-        data = self.load_known_projects()
-        for proj in data["projects"]:
-            if proj["name"] == project_name:
-                if alias not in proj.get("aliases", []):
-                    proj.setdefault("aliases", []).append(alias)
-                    self.save_projects(data)
-                return True
-        return False
+        """为项目添加别名（别名已被其他项目用作名称或别名时失败）"""
+        with self.store.transaction() as db:
+            project = self.store.find_project(db, project_name)
+            if project is None or self.store.key_taken(db, alias, [project.id]):
+                return False
+            if alias not in [a.alias for a in project.aliases]:
+                self.store.set_aliases(project, [a.alias for a in project.aliases] + [alias])
+        return True
 
     async def rebuild_embeddings(self):
         """重建所有项目向量索引"""
-        # 清空缓存
-        self._project_embeddings = {}
+        # 清空缓存（旧 JSON 一并删除，避免被重新迁移）
+        self.embedding_store.clear()
         if os.path.exists(self.embeddings_file):
             os.remove(self.embeddings_file)
         # 重新构建
@@ -926,83 +1619,121 @@ class ProjectExtractor:
 
     # ========== 项目完整管理 API ==========
 
+    @_in_thread
     def get_project(self, name: str) -> Optional[dict]:
         """获取单个项目详情"""
-        data = self.load_known_projects()
-        for proj in data.get("projects", []):
-            if proj["name"] == name:
-                return proj
-        return None
+        with self.store.session() as db:
+            project = self.store.find_project(db, name)
+            return project_to_dict(project) if project else None
 
     def get_all_projects_detail(self) -> list:
         """获取所有项目详情（含子项目）"""
-        data = self.load_known_projects()
-        return data.get("projects", [])
+        return self.load_known_projects().get("projects", [])
 
+    @_in_thread
     def create_project(self, name: str, category: str = "其他",
                        description: str = "", aliases: list = None,
                        sub_items: list = None) -> bool:
-        """创建新项目"""
-        data = self.load_known_projects()
-
-        # 检查是否已存在
-        for proj in data["projects"]:
-            if proj["name"] == name:
+        """创建新项目（名称或别名忽略大小写后已被其他项目使用时失败）"""
+        with self.store.transaction() as db:
+            # 检查是否已存在
+            if self.store.any_key_taken(db, [name] + list(aliases or [])):
                 return False
 
-        new_project = {
-            "name": name,
-            "aliases": aliases or [],
-            "category": category,
-            "status": "active",
-            "description": description,
-            "sub_items": sub_items or []
-        }
-        data["projects"].append(new_project)
-        self.save_projects(data)
+            project = Project(
+                name=name,
+                name_key=name_key(name),
+                category=category,
+                status="active",
+                description=description,
+                position=self.store.next_position(db, Project),
+                aliases=[],
+                sub_items=[]
+            )
+            self.store.set_aliases(project, aliases or [])
+            self.store.set_sub_items(project, sub_items or [])
+            db.add(project)
         return True
 
+    @_in_thread
     def update_project(self, name: str, updates: dict) -> bool:
-        """更新项目信息"""
-        data = self.load_known_projects()
-
-        for proj in data["projects"]:
-            if proj["name"] == name:
-                # 可更新字段
-                allowed_fields = ["description", "category", "status", "aliases", "sub_items"]
-                for field in allowed_fields:
-                    if field in updates:
-                        proj[field] = updates[field]
-                self.save_projects(data)
-                return True
-        return False
-
-    def rename_project(self, old_name: str, new_name: str) -> bool:
-        """重命名项目"""
-        data = self.load_known_projects()
-
-        # 检查新名称是否已存在
-        for proj in data["projects"]:
-            if proj["name"] == new_name:
+        """更新项目信息（新别名已被其他项目使用时失败）"""
+        with self.store.transaction() as db:
+            project = self.store.find_project(db, name)
+            if project is None:
+                return False
+            if "aliases" in updates and self.store.any_key_taken(db, updates["aliases"] or [], [project.id]):
                 return False
+            # 可更新字段
+            for field in ["description", "category", "status"]:
+                if field in updates:
+                    setattr(project, field, updates[field])
+            if "aliases" in updates:
+                self.store.set_aliases(project, updates["aliases"] or [])
+            if "sub_items" in updates:
+                self.store.set_sub_items(project, updates["sub_items"] or [])
+        return True
 
-        for proj in data["projects"]:
-            if proj["name"] == old_name:
-                proj["name"] = new_name
-                self.save_projects(data)
-                return True
-        return False
+    @_in_thread
+    def rename_project(self, old_name: str, new_name: str) -> Optional[Dict[str, int]]:
+        """
+        重命名项目，周报/日报条目、任务、行记忆中的项目名在同一事务中随之迁移
 
-    def delete_project(self, name: str) -> bool:
-        """删除项目"""
-        data = self.load_known_projects()
-        original_len = len(data["projects"])
-        data["projects"] = [p for p in data["projects"] if p["name"] != name]
+        Returns:
+            各业务表受影响的行数；项目不存在或新名称已被使用时返回 None
+        """
+        from app.services.taxonomy_service import get_taxonomy_service
+        with self.store.transaction() as db:
+            project = self.store.find_project(db, old_name, load_children=False)
+            if project is None:
+                return None
+            # 检查新名称是否已被其他项目用作名称或别名（只改大小写允许）
+            if self.store.key_taken(db, new_name, [project.id]):
+                return None
+            project.name = new_name
+            project.name_key = name_key(new_name)
+            # 子分类待审核记录跟随父项目
+            db.execute(
+                update(PendingProject)
+                .where(PendingProject.kind == "sub_item", PendingProject.parent_project == old_name)
+                .values(parent_project=new_name)
+            )
+            return get_taxonomy_service().apply(db, {old_name: new_name})
+
+    @_in_thread
+    def delete_project(self, name: str, merge_into: Optional[str] = None) -> Optional[Dict[str, int]]:
+        """
+        删除项目
 
-        if len(data["projects"]) < original_len:
-            self.save_projects(data)
-            return True
-        return False
+        Args:
+            merge_into: 并入的项目。指定时被删项目的名称和别名作为其别名，历史条目、任务、行记忆在同一事务中归入该项目；
+                不指定时历史数据保留原项目名，不做修改
+
+        Returns:
+            各业务表受影响的行数；项目或并入项目不存在时返回 None
+        """
+        from app.services.taxonomy_service import get_taxonomy_service
+        with self.store.transaction() as db:
+            project = self.store.find_project(db, name)
+            if project is None:
+                return None
+            target = None
+            if merge_into:
+                target = self.store.find_project(db, merge_into)
+                if target is None or target.id == project.id:
+                    return None
+            merged_names = [name] + [a.alias for a in project.aliases]
+            # 被删项目的名称和别名并入目标项目，不能与第三个项目冲突
+            if target is not None and self.store.any_key_taken(db, merged_names, [project.id, target.id]):
+                return None
+
+            # 先删除项目（释放其名称和别名的唯一键），再把名称和别名加到目标项目
+            db.delete(project)
+            db.flush()
+            if target is None:
+                return get_taxonomy_service().apply(db, {})
+            self.store.set_aliases(target, [a.alias for a in target.aliases] + merged_names)
+            return get_taxonomy_service().apply(db, {name: merge_into})
 
     def _normalize_sub_items(self, sub_items: list) -> list:
         """将子项目列表规范化为对象格式"""
@@ -1020,98 +1751,93 @@ class ProjectExtractor:
             return item
         return item.get("name", "")
 
+    @_in_thread
     def add_sub_item(self, project_name: str, sub_name: str, description: str = "") -> bool:
         """添加子项目"""
-        data = self.load_known_projects()
-
-        for proj in data["projects"]:
-            if proj["name"] == project_name:
-                if "sub_items" not in proj:
-                    proj["sub_items"] = []
-                # 规范化现有数据
-                proj["sub_items"] = self._normalize_sub_items(proj["sub_items"])
-                # 检查是否已存在
-                for item in proj["sub_items"]:
-                    if item["name"] == sub_name:
-                        return False
-                proj["sub_items"].append({"name": sub_name, "description": description})
-                self.save_projects(data)
-                return True
-        return False
+        with self.store.transaction() as db:
+            project = self.store.find_project(db, project_name)
+            if project is None:
+                return False
+            # 检查是否已存在
+            if any(s.name == sub_name for s in project.sub_items):
+                return False
+            self.store.set_sub_items(
+                project,
+                [{"name": s.name, "description": s.description} for s in project.sub_items]
+                + [{"name": sub_name, "description": description}]
+            )
+        return True
 
+    @_in_thread
     def remove_sub_item(self, project_name: str, sub_name: str) -> bool:
         """移除子项目"""
-        data = self.load_known_projects()
-
-        for proj in data["projects"]:
-            if proj["name"] == project_name:
-                if "sub_items" not in proj:
-                    return False
-                # 规范化现有数据
-                proj["sub_items"] = self._normalize_sub_items(proj["sub_items"])
-                original_len = len(proj["sub_items"])
-                proj["sub_items"] = [s for s in proj["sub_items"] if s["name"] != sub_name]
-                if len(proj["sub_items"]) < original_len:
-                    self.save_projects(data)
-                    return True
-        return False
+        with self.store.transaction() as db:
+            project = self.store.find_project(db, project_name)
+            if project is None:
+                return False
+            remaining = [s for s in project.sub_items if s.name != sub_name]
+            if len(remaining) == len(project.sub_items):
+                return False
+            project.sub_items = remaining
+        return True
 
+    @_in_thread
     def update_sub_item(self, project_name: str, sub_name: str, updates: dict) -> bool:
         """更新子项目信息"""
-        data = self.load_known_projects()
-
-        for proj in data["projects"]:
-            if proj["name"] == project_name:
-                # 规范化现有数据
-                proj["sub_items"] = self._normalize_sub_items(proj.get("sub_items", []))
-                for item in proj["sub_items"]:
-                    if item["name"] == sub_name:
-                        if "description" in updates:
-                            item["description"] = updates["description"]
-                        if "name" in updates and updates["name"] != sub_name:
-                            item["name"] = updates["name"]
-                        self.save_projects(data)
-                        return True
-        return False
+        with self.store.transaction() as db:
+            project = self.store.find_project(db, project_name)
+            if project is None:
+                return False
+            item = next((s for s in project.sub_items if s.name == sub_name), None)
+            if item is None:
+                return False
+            if "description" in updates:
+                item.description = updates["description"]
+            if "name" in updates and updates["name"] != sub_name:
+                item.name = updates["name"]
+                item.name_key = name_key(updates["name"])
+        return True
 
+    @_in_thread
     def add_category(self, category: str) -> bool:
         """添加项目类别"""
-        data = self.load_known_projects()
-        if category not in data.get("categories", []):
-            data.setdefault("categories", []).append(category)
-            self.save_projects(data)
-            return True
-        return False
+        with self.store.transaction() as db:
+            if db.scalar(select(ProjectCategory.id).where(ProjectCategory.name == category)) is not None:
+                return False
+            db.add(ProjectCategory(name=category, position=self.store.next_position(db, ProjectCategory)))
+        return True
 
+    @_in_thread
     def remove_category(self, category: str) -> bool:
         """移除项目类别"""
-        data = self.load_known_projects()
-        if category in data.get("categories", []):
-            data["categories"].remove(category)
-            self.save_projects(data)
-            return True
-        return False
+        with self.store.transaction() as db:
+            row = db.scalar(select(ProjectCategory).where(ProjectCategory.name == category))
+            if row is None:
+                return False
+            db.delete(row)
+        return True
 
+    @_in_thread
     def get_rejected_list(self) -> list:
         """获取已拒绝（黑名单）列表"""
-        data = self.load_known_projects()
-        return data.get("rejected", [])
+        with self.store.session() as db:
+            return self.store.list_rejected(db)
 
+    @_in_thread
     def get_categories(self) -> list:
         """获取所有项目类别"""
-        data = self.load_known_projects()
-        return data.get("categories", ["业务系统", "AI项目", "网站", "运维", "其他"])
+        with self.store.session() as db:
+            return self.store.list_categories(db) or ["业务系统", "AI项目", "网站", "运维", "其他"]
 
+    @_in_thread
     def remove_from_rejected(self, name: str) -> bool:
         """从黑名单中移除"""
-        data = self.load_known_projects()
-        rejected = data.get("rejected", [])
-        if name in rejected:
-            rejected.remove(name)
-            data["rejected"] = rejected
-            self.save_projects(data)
-            return True
-        return False
+        with self.store.transaction() as db:
+            row = db.scalar(select(RejectedMention).where(RejectedMention.name == name))
+            if row is None:
+                return False
+            db.delete(row)
+        return True
 
 
 # 单例
@@ -0,0 +1,274 @@
+"""
+LLM 调用遥测 - 记录每次 LLM / Embedding 调用的耗时、token、费用与缓存命中情况
+
+- 内存环形缓冲区保留最近 N 条记录，用于实时查看
+- 记录批量异步写入 SQLite（llm_call_logs），用于按时间段统计，超过保留期的记录定期清理
+- 统计按调用位置 / 提供商 / 模型分组，给出 p50/p90/p99 分位数
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import numpy as np
+from sqlalchemy import select, delete
+
+from app.config import get_settings
+from app.database import async_session
+from app.models.llm import LLMCallLog
+from app.utils.token_utils import estimate_tokens
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# 模型单价：元 / 千 token（输入, 输出），参考官方公开定价，仅用于费用估算
+MODEL_PRICES = {
+    "qwen-plus": (0.0008, 0.002),
+    "qwen-flash": (0.00015, 0.0015),
+    "deepseek-chat": (0.002, 0.008),
+    "text-embedding-v3": (0.0005, 0.0),
+    "text-embedding-v4": (0.0005, 0.0),
+}
+
+FLUSH_DELAY_SECONDS = 2.0  # 记录攒批写入的延迟
+CLEANUP_EVERY_FLUSHES = 100  # 每写入多少批清理一次过期记录
+
+GROUP_FIELDS = ("call_site", "kind", "provider", "model")
+
+# 当前正在进行的 LLM 调用记录（在共享调用的 Task 内设置，供底层请求方法补充首字节时间和 usage）
+_current_record: ContextVar[Optional["CallRecord"]] = ContextVar("llm_call_record", default=None)
+
+
+class CallRecord:
+    """单次调用记录"""
+
+    def __init__(self, call_site: str, kind: str, provider: Optional[str] = None, model: Optional[str] = None):
+        self.call_site = call_site or "unknown"
+        self.kind = kind
+        self.provider = provider
+        self.model = model
+        self.cache_hit = False
+        self.success = True
+        self.queue_wait_ms = 0.0
+        self.ttfb_ms: Optional[float] = None
+        self.latency_ms = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.tokens_estimated = False
+        self.cost = 0.0
+        self.error: Optional[str] = None
+        self.created_at = datetime.now()
+        self._started = time.perf_counter()
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self._started) * 1000
+
+    def mark_first_byte(self):
+        """记录首字节时间（仅第一次生效）"""
+        if self.ttfb_ms is None:
+            self.ttfb_ms = self.elapsed_ms()
+
+    def add_usage(self, usage: Optional[dict], prompt_text: str = "", completion_text: str = ""):
+        """累加 token 用量，接口未返回 usage 时按文本估算"""
+        usage = usage or {}
+        prompt_tokens = usage.get("prompt_tokens", usage.get("total_tokens"))
+        completion_tokens = usage.get("completion_tokens")
+        if prompt_tokens is None:
+            prompt_tokens = estimate_tokens(prompt_text)
+            self.tokens_estimated = True
+        if completion_tokens is None:
+            completion_tokens = estimate_tokens(completion_text)
+            if completion_text:
+                self.tokens_estimated = True
+        self.prompt_tokens += int(prompt_tokens)
+        self.completion_tokens += int(completion_tokens)
+
+    def finish(self, error: Optional[BaseException] = None):
+        self.latency_ms = self.elapsed_ms()
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"[:500]
+        self.success = self.error is None
+        input_price, output_price = MODEL_PRICES.get(self.model or "", (0.0, 0.0))
+        self.cost = (self.prompt_tokens * input_price + self.completion_tokens * output_price) / 1000
+
+    def to_dict(self) -> dict:
+        return {
+            "call_site": self.call_site,
+            "kind": self.kind,
+            "provider": self.provider,
+            "model": self.model,
+            "cache_hit": self.cache_hit,
+            "success": self.success,
+            "queue_wait_ms": round(self.queue_wait_ms, 1),
+            "ttfb_ms": round(self.ttfb_ms, 1) if self.ttfb_ms is not None else None,
+            "latency_ms": round(self.latency_ms, 1),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "tokens_estimated": self.tokens_estimated,
+            "cost": round(self.cost, 6),
+            "error": self.error,
+            "created_at": self.created_at
+        }
+
+
+def current_record() -> Optional[CallRecord]:
+    return _current_record.get()
+
+
+def set_current_record(record: Optional[CallRecord]):
+    """设置当前调用记录，返回用于恢复的 token"""
+    return _current_record.set(record)
+
+
+def reset_current_record(token):
+    _current_record.reset(token)
+
+
+def _percentiles(values: List[float]) -> dict:
+    if not values:
+        return {"p50": None, "p90": None, "p99": None}
+    p50, p90, p99 = np.percentile(np.asarray(values, dtype=np.float64), [50, 90, 99])
+    return {"p50": round(float(p50), 1), "p90": round(float(p90), 1), "p99": round(float(p99), 1)}
+
+
+def _summarize(rows: List) -> dict:
+    """汇总一组记录（rows 的元素需有与 CallRecord 同名的属性）"""
+    count = len(rows)
+    cache_hits = sum(1 for r in rows if r.cache_hit)
+    errors = sum(1 for r in rows if not r.success)
+    upstream = [r for r in rows if not r.cache_hit]
+    return {
+        "count": count,
+        "cache_hits": cache_hits,
+        "cache_hit_rate": round(cache_hits / count, 4) if count else 0.0,
+        "errors": errors,
+        "error_rate": round(errors / count, 4) if count else 0.0,
+        "prompt_tokens": sum(r.prompt_tokens or 0 for r in rows),
+        "completion_tokens": sum(r.completion_tokens or 0 for r in rows),
+        "cost": round(sum(r.cost or 0 for r in rows), 4),
+        # 耗时分位数只统计实际请求了上游的调用
+        "latency_ms": _percentiles([r.latency_ms for r in upstream if r.latency_ms is not None]),
+        "ttfb_ms": _percentiles([r.ttfb_ms for r in upstream if r.ttfb_ms is not None]),
+        "queue_wait_ms": _percentiles([r.queue_wait_ms for r in upstream if r.queue_wait_ms is not None])
+    }
+
+
+class LLMTelemetry:
+    """LLM 调用遥测"""
+
+    def __init__(self):
+        self.buffer: deque = deque(maxlen=settings.LLM_TELEMETRY_BUFFER_SIZE)
+        self._pending: List[CallRecord] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flushes = 0
+        self._pruning: Dict[str, dict] = {}  # 调用位置 -> 项目列表裁剪统计
+
+    def record(self, record: CallRecord):
+        """保存一条已结束的调用记录（写库延迟攒批进行）"""
+        if not settings.LLM_TELEMETRY_ENABLED:
+            return
+        self.buffer.append(record)
+        self._pending.append(record)
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = loop.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(FLUSH_DELAY_SECONDS)
+        await self.flush()
+
+    async def flush(self) -> int:
+        """将待写入的记录写入数据库"""
+        pending, self._pending = self._pending, []
+        if not pending:
+            return 0
+        try:
+            async with async_session() as db:
+                db.add_all([LLMCallLog(**record.to_dict()) for record in pending])
+                await db.commit()
+
+                self._flushes += 1
+                if self._flushes % CLEANUP_EVERY_FLUSHES == 0:
+                    await self._cleanup(db)
+        except Exception as e:
+            logger.warning(f"LLM 调用记录写入失败: {e}")
+            return 0
+        return len(pending)
+
+    async def _cleanup(self, db) -> int:
+        """删除超过保留期的记录"""
+        cutoff = datetime.now() - timedelta(days=settings.LLM_TELEMETRY_RETENTION_DAYS)
+        result = await db.execute(delete(LLMCallLog).where(LLMCallLog.created_at < cutoff))
+        await db.commit()
+        return result.rowcount or 0
+
+    def record_prompt_pruning(self, call_site: str, full_tokens: int, pruned_tokens: int):
+        """记录一次 prompt 项目列表裁剪前后的估算 token 数"""
+        stats = self._pruning.setdefault(call_site, {"prompts": 0, "full_tokens": 0, "pruned_tokens": 0})
+        stats["prompts"] += 1
+        stats["full_tokens"] += full_tokens
+        stats["pruned_tokens"] += pruned_tokens
+
+    def pruning_summary(self) -> dict:
+        """项目列表裁剪节省的 token 统计（本进程累计）"""
+        summary = {}
+        for call_site, stats in self._pruning.items():
+            saved = stats["full_tokens"] - stats["pruned_tokens"]
+            summary[call_site] = {
+                **stats,
+                "saved_tokens": saved,
+                "saved_ratio": round(saved / stats["full_tokens"], 4) if stats["full_tokens"] else 0.0
+            }
+        return summary
+
+    def recent(self, limit: int = 50) -> List[dict]:
+        """最近的调用记录（新的在前）"""
+        return [record.to_dict() for record in list(self.buffer)[-limit:][::-1]]
+
+    async def summary(self, source: str = "memory", hours: int = 24, group_by: str = "call_site") -> dict:
+        """
+        按分组汇总调用统计
+        Args:
+            source: memory（环形缓冲区）或 db（数据库，按 hours 截取时间段）
+            hours: 统计最近多少小时（仅 db）
+            group_by: call_site / kind / provider / model
+        """
+        if group_by not in GROUP_FIELDS:
+            raise ValueError(f"不支持的分组字段: {group_by}")
+
+        if source == "db":
+            await self.flush()
+            since = datetime.now() - timedelta(hours=hours)
+            async with async_session() as db:
+                result = await db.execute(select(LLMCallLog).where(LLMCallLog.created_at >= since))
+                rows = list(result.scalars().all())
+        else:
+            rows = list(self.buffer)
+
+        groups: Dict[str, List] = {}
+        for row in rows:
+            groups.setdefault(getattr(row, group_by) or "unknown", []).append(row)
+
+        return {
+            "source": source,
+            "group_by": group_by,
+            "total": _summarize(rows),
+            "groups": {name: _summarize(items) for name, items in sorted(groups.items())}
+        }
+
+
+# 单例
+_llm_telemetry: Optional[LLMTelemetry] = None
+
+
+def get_llm_telemetry() -> LLMTelemetry:
+    global _llm_telemetry
+    if _llm_telemetry is None:
+        _llm_telemetry = LLMTelemetry()
+    return _llm_telemetry
@@ -0,0 +1,494 @@
+"""
+后台解析任务队列 - 数据库持久化的周报/日报解析任务
+
+- 任务存放在 parse_jobs 表，服务重启后未完成的任务自动恢复执行
+- 执行中的任务记录所属进程并定期心跳，只有心跳过期（所属进程已退出）的任务才会被重新排队，
+  多个 worker 进程共用同一数据库时不会抢走彼此正在执行的任务
+- 应用启动时创建固定数量的 worker，限制同时进行的解析数
+- 防抖：同一报告已有待执行任务时只推迟其执行时间，连续修改只解析一次
+- 失败按指数退避重试，最后一次尝试允许使用降级解析，保证报告总有条目
+- 同一报告同时只执行一个任务，避免旧内容的解析结果覆盖新内容
+"""
+import asyncio
+import logging
+import os
+import random
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional, List
+from sqlalchemy import select, update, delete, func, and_, or_
+from sqlalchemy.orm import aliased
+
+from app.config import get_settings
+from app.database import async_session
+from app.models.parse_job import ParseJob, ParseJobKind, ParseJobStatus
+from app.utils.token_bucket import request_priority, BATCH
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# 已结束任务的清理间隔（秒）
+CLEANUP_INTERVAL_SECONDS = 3600
+
+# 当前进程的标识，写入所领取任务的 locked_by
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class ParseJobError(Exception):
+    """任务状态不允许当前操作"""
+
+
+# ==================== 任务处理 ====================
+
+async def _job_cancelled(db, job_id: int) -> bool:
+    """任务执行期间是否已被取消（用户手动保存了条目），或因心跳过期已不归本进程执行"""
+    result = await db.execute(select(ParseJob.status, ParseJob.locked_by).where(ParseJob.id == job_id))
+    row = result.first()
+    return row is None or row.status != ParseJobStatus.running or row.locked_by != WORKER_ID
+
+
+async def _parse_report(job_id: int, report_id: int, allow_fallback: bool):
+    """解析周报最新内容并保存条目"""
+    from app.services.report_service import get_report_by_id
+    from app.services.report_parser_service import get_report_parser_service
+
+    parser = get_report_parser_service()
+    async with async_session() as db:
+        report = await get_report_by_id(db, report_id)
+        if not report:
+            return
+        this_week_work, next_week_plan = report.this_week_work, report.next_week_plan
+        # 已有条目时只解析改动的行
+        changed = parser.plan_incremental_parse(
+            this_week_work, next_week_plan, report.items, report.parsed_lines
+        )
+
+    if changed is None:
+        parse_result = await parser.parse_report_text(
+            this_week_work or "", next_week_plan or "", allow_fallback=allow_fallback
+        )
+    else:
+        parse_result = await parser.parse_changed_lines(
+            this_week_work, next_week_plan, changed, allow_fallback=allow_fallback
+        )
+
+    async with async_session() as db:
+        report = await get_report_by_id(db, report_id)
+        if not report or await _job_cancelled(db, job_id):
+            return
+        if changed is None:
+            await parser.save_parsed_items(db, report, parse_result)
+        else:
+            await parser.save_incremental_items(db, report, parse_result)
+
+
+async def _parse_daily_report(job_id: int, report_id: int, allow_fallback: bool):
+    """解析日报最新内容并保存条目（复用周报解析）"""
+    from app.services import daily_report_service
+    from app.services.report_parser_service import get_report_parser_service
+    from app.schemas.daily_report import DailyReportItemInput
+
+    parser = get_report_parser_service()
+    async with async_session() as db:
+        report = await daily_report_service.get_daily_report_by_id(db, report_id)
+        if not report or not report.work_content:
+            return
+        work_content = report.work_content
+
+    parse_result = await parser.parse_report_text(work_content, None, allow_fallback=allow_fallback)
+    # 转换为日报格式
+    items = [
+        DailyReportItemInput(
+            project_name=item.project_name,
+            content=item.content,
+            hours=None,
+            progress=None,
+            remark=None
+        )
+        for item in parse_result.this_week_items
+    ]
+
+    async with async_session() as db:
+        report = await daily_report_service.get_daily_report_by_id(db, report_id)
+        if not report or await _job_cancelled(db, job_id):
+            return
+        await daily_report_service.save_daily_report_items(
+            db, report, items, [item.parse_source for item in parse_result.this_week_items]
+        )
+
+
+JOB_HANDLERS = {
+    ParseJobKind.report: _parse_report,
+    ParseJobKind.daily_report: _parse_daily_report,
+}
+
+
+def job_to_dict(job: ParseJob) -> dict:
+    return {
+        "id": job.id,
+        "kind": job.kind.value if job.kind else None,
+        "target_id": job.target_id,
+        "status": job.status.value if job.status else None,
+        "attempts": job.attempts,
+        "run_after": job.run_after,
+        "last_error": job.last_error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "locked_by": job.locked_by,
+        "locked_at": job.locked_at
+    }
+
+
+# ==================== 队列 ====================
+
+class ParseJobQueue:
+    """解析任务队列与 worker 池"""
+
+    def __init__(self):
+        self._workers: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._last_cleanup = 0.0
+        self._last_recover = 0.0
+
+    @property
+    def worker_count(self) -> int:
+        return sum(1 for task in self._workers if not task.done())
+
+    async def start(self):
+        """恢复中断的任务并启动 worker（应用启动时调用）"""
+        if self._workers:
+            return
+        self._wakeup = asyncio.Event()
+        await self._recover()
+        await self._cleanup()
+        self._workers = [
+            asyncio.create_task(self._worker(i))
+            for i in range(max(1, settings.PARSE_JOB_WORKERS))
+        ]
+        logger.info(f"解析任务队列已启动: {len(self._workers)} 个 worker")
+
+    async def stop(self):
+        """停止 worker，本进程执行中的任务立即重新排队"""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        async with async_session() as db:
+            await db.execute(
+                update(ParseJob)
+                .where(ParseJob.status == ParseJobStatus.running, ParseJob.locked_by == WORKER_ID)
+                .values(status=ParseJobStatus.pending, run_after=datetime.now(), locked_by=None, locked_at=None)
+            )
+            await db.commit()
+
+    def _notify(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _recover(self):
+        """心跳已过期的执行中任务（所属进程已退出）重新排队，启动时和空闲时定期调用"""
+        self._last_recover = time.monotonic()
+        now = datetime.now()
+        stale_before = now - timedelta(seconds=settings.PARSE_JOB_STALE_SECONDS)
+        async with async_session() as db:
+            result = await db.execute(
+                update(ParseJob)
+                .where(
+                    ParseJob.status == ParseJobStatus.running,
+                    or_(ParseJob.locked_at.is_(None), ParseJob.locked_at < stale_before)
+                )
+                .values(status=ParseJobStatus.pending, run_after=now, locked_by=None, locked_at=None)
+            )
+            await db.commit()
+        if result.rowcount:
+            logger.info(f"恢复 {result.rowcount} 个中断的解析任务")
+
+    async def _cleanup(self):
+        """删除超过保留期的已结束任务"""
+        self._last_cleanup = time.monotonic()
+        cutoff = datetime.now() - timedelta(days=settings.PARSE_JOB_RETENTION_DAYS)
+        async with async_session() as db:
+            await db.execute(
+                delete(ParseJob).where(
+                    ParseJob.status.in_([ParseJobStatus.done, ParseJobStatus.cancelled, ParseJobStatus.failed]),
+                    ParseJob.updated_at < cutoff
+                )
+            )
+            await db.commit()
+
+    # ---------- 入队 / 取消 / 重跑 ----------
+
+    async def enqueue(self, kind: ParseJobKind, target_id: int, debounce: bool = True) -> ParseJob:
+        """
+        提交解析任务
+        同一报告已有待执行任务时，仅将其执行时间推迟到本次提交后的防抖时间
+        """
+        delay = settings.PARSE_JOB_DEBOUNCE_SECONDS if debounce else 0
+        run_after = datetime.now() + timedelta(seconds=delay)
+
+        async with async_session() as db:
+            result = await db.execute(
+                select(ParseJob)
+                .where(
+                    ParseJob.kind == kind,
+                    ParseJob.target_id == target_id,
+                    ParseJob.status == ParseJobStatus.pending
+                )
+                .order_by(ParseJob.id.desc())
+                .limit(1)
+            )
+            job = result.scalar_one_or_none()
+            if job:
+                job.run_after = run_after
+            else:
+                job = ParseJob(kind=kind, target_id=target_id, run_after=run_after)
+                db.add(job)
+            await db.commit()
+
+        self._notify()
+        return job
+
+    async def cancel(self, kind: ParseJobKind, target_id: int) -> int:
+        """取消报告的待执行和执行中的任务（用户已手动保存条目时调用）"""
+        async with async_session() as db:
+            result = await db.execute(
+                update(ParseJob)
+                .where(
+                    ParseJob.kind == kind,
+                    ParseJob.target_id == target_id,
+                    ParseJob.status.in_([ParseJobStatus.pending, ParseJobStatus.running])
+                )
+                .values(status=ParseJobStatus.cancelled, finished_at=datetime.now())
+            )
+            await db.commit()
+        return result.rowcount or 0
+
+    async def rerun(self, job_id: int) -> ParseJob:
+        """重新执行已结束的任务"""
+        async with async_session() as db:
+            job = await db.get(ParseJob, job_id)
+            if job is None:
+                raise ParseJobError("任务不存在")
+            if job.status in (ParseJobStatus.pending, ParseJobStatus.running):
+                raise ParseJobError("任务尚未结束")
+            job.status = ParseJobStatus.pending
+            job.attempts = 0
+            job.run_after = datetime.now()
+            job.last_error = None
+            job.started_at = None
+            job.finished_at = None
+            job.locked_by = None
+            job.locked_at = None
+            await db.commit()
+
+        self._notify()
+        return job
+
+    # ---------- 执行 ----------
+
+    async def _claim(self) -> Optional[ParseJob]:
+        """领取一个到期任务（跳过同一报告已有任务在执行的情况）"""
+        running = aliased(ParseJob)
+        busy = select(running.id).where(
+            running.status == ParseJobStatus.running,
+            running.kind == ParseJob.kind,
+            running.target_id == ParseJob.target_id
+        ).exists()
+
+        async with async_session() as db:
+            for _ in range(3):
+                now = datetime.now()
+                job_id = await db.scalar(
+                    select(ParseJob.id)
+                    .where(ParseJob.status == ParseJobStatus.pending, ParseJob.run_after <= now, ~busy)
+                    .order_by(ParseJob.run_after)
+                    .limit(1)
+                )
+                if job_id is None:
+                    return None
+
+                # 条件更新保证同一任务只被一个 worker 领取，且领取时同一报告没有其他任务在执行
+                claimed = await db.execute(
+                    update(ParseJob)
+                    .where(ParseJob.id == job_id, ParseJob.status == ParseJobStatus.pending, ~busy)
+                    .values(
+                        status=ParseJobStatus.running, attempts=ParseJob.attempts + 1,
+                        started_at=now, locked_by=WORKER_ID, locked_at=now
+                    )
+                )
+                await db.commit()
+                if claimed.rowcount == 1:
+                    return await db.get(ParseJob, job_id)
+        return None
+
+    async def _next_delay(self) -> float:
+        """距最早的待执行任务到期还有多久（不超过轮询间隔）"""
+        async with async_session() as db:
+            next_run = await db.scalar(
+                select(func.min(ParseJob.run_after)).where(ParseJob.status == ParseJobStatus.pending)
+            )
+        if next_run is None:
+            return settings.PARSE_JOB_POLL_INTERVAL
+        delay = (next_run - datetime.now()).total_seconds()
+        return min(max(delay, 0.1), settings.PARSE_JOB_POLL_INTERVAL)
+
+    async def _worker(self, worker_no: int):
+        while True:
+            try:
+                job = await self._claim()
+                if job is None:
+                    if worker_no == 0 and time.monotonic() - self._last_recover > settings.PARSE_JOB_STALE_SECONDS:
+                        await self._recover()
+                    if worker_no == 0 and time.monotonic() - self._last_cleanup > CLEANUP_INTERVAL_SECONDS:
+                        await self._cleanup()
+                    delay = await self._next_delay()
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                await self._run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception(f"解析任务 worker {worker_no} 异常")
+                await asyncio.sleep(settings.PARSE_JOB_POLL_INTERVAL)
+
+    @staticmethod
+    def _owned(job_id: int):
+        """本进程仍持有的执行中任务（心跳过期后可能已被其他进程重新领取）"""
+        return and_(
+            ParseJob.id == job_id,
+            ParseJob.status == ParseJobStatus.running,
+            ParseJob.locked_by == WORKER_ID
+        )
+
+    async def _heartbeat(self, job_id: int):
+        """任务执行期间定期刷新 locked_at"""
+        while True:
+            await asyncio.sleep(settings.PARSE_JOB_HEARTBEAT_INTERVAL)
+            try:
+                async with async_session() as db:
+                    await db.execute(
+                        update(ParseJob).where(self._owned(job_id)).values(locked_at=datetime.now())
+                    )
+                    await db.commit()
+            except Exception as e:
+                logger.warning(f"解析任务心跳更新失败 (job={job_id}): {e}")
+
+    async def _run(self, job: ParseJob):
+        # 最后一次尝试允许降级解析，保证报告最终有条目
+        allow_fallback = job.attempts >= settings.PARSE_JOB_MAX_ATTEMPTS
+        heartbeat = asyncio.create_task(self._heartbeat(job.id))
+        try:
+            # 后台解析让位于用户正在等待的解析预览
+            with request_priority(BATCH):
+                await JOB_HANDLERS[job.kind](job.id, job.target_id, allow_fallback)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await self._fail(job, e)
+            return
+        finally:
+            heartbeat.cancel()
+
+        async with async_session() as db:
+            await db.execute(
+                update(ParseJob)
+                .where(self._owned(job.id))
+                .values(status=ParseJobStatus.done, finished_at=datetime.now(), last_error=None, locked_by=None)
+            )
+            await db.commit()
+
+    async def _fail(self, job: ParseJob, error: Exception):
+        """记录失败，未超过重试次数则退避后重新排队"""
+        message = f"{type(error).__name__}: {error}"[:500]
+        values = {"last_error": message, "locked_by": None}
+        if job.attempts < settings.PARSE_JOB_MAX_ATTEMPTS:
+            delay = settings.PARSE_JOB_RETRY_BASE_DELAY * (2 ** (job.attempts - 1))
+            delay *= random.uniform(0.5, 1.0)
+            values.update(status=ParseJobStatus.pending, run_after=datetime.now() + timedelta(seconds=delay))
+            logger.warning(
+                f"解析任务失败 (job={job.id}, {job.kind.value}={job.target_id}, 第 {job.attempts} 次)，"
+                f"{delay:.0f}s 后重试: {message}"
+            )
+        else:
+            values.update(status=ParseJobStatus.failed, finished_at=datetime.now())
+            logger.error(f"解析任务失败 (job={job.id}, {job.kind.value}={job.target_id})，不再重试: {message}")
+
+        async with async_session() as db:
+            await db.execute(
+                update(ParseJob)
+                .where(self._owned(job.id))
+                .values(**values)
+            )
+            await db.commit()
+
+    # ---------- 查询 ----------
+
+    async def stats(self) -> dict:
+        """队列深度与各状态任务数"""
+        now = datetime.now()
+        async with async_session() as db:
+            result = await db.execute(
+                select(ParseJob.status, func.count()).group_by(ParseJob.status)
+            )
+            counts = {status.value: 0 for status in ParseJobStatus}
+            counts.update({status.value: count for status, count in result.all()})
+
+            ready = await db.scalar(
+                select(func.count()).select_from(ParseJob).where(
+                    and_(ParseJob.status == ParseJobStatus.pending, ParseJob.run_after <= now)
+                )
+            )
+            oldest = await db.scalar(
+                select(func.min(ParseJob.created_at)).where(ParseJob.status == ParseJobStatus.pending)
+            )
+
+        return {
+            "workers": self.worker_count,
+            "depth": counts[ParseJobStatus.pending.value] + counts[ParseJobStatus.running.value],
+            "ready": ready or 0,
+            "oldest_pending_seconds": int((now - oldest).total_seconds()) if oldest else 0,
+            "by_status": counts
+        }
+
+    async def list_jobs(
+        self,
+        status: Optional[ParseJobStatus] = None,
+        kind: Optional[ParseJobKind] = None,
+        target_id: Optional[int] = None,
+        limit: int = 50,
+        offset: int = 0
+    ) -> List[ParseJob]:
+        query = select(ParseJob)
+        if status:
+            query = query.where(ParseJob.status == status)
+        if kind:
+            query = query.where(ParseJob.kind == kind)
+        if target_id is not None:
+            query = query.where(ParseJob.target_id == target_id)
+        query = query.order_by(ParseJob.id.desc()).limit(limit).offset(offset)
+
+        async with async_session() as db:
+            result = await db.execute(query)
+            return list(result.scalars().all())
+
+    async def get_job(self, job_id: int) -> Optional[ParseJob]:
+        async with async_session() as db:
+            return await db.get(ParseJob, job_id)
+
+
+# 单例
+_parse_job_queue: Optional[ParseJobQueue] = None
+
+
+def get_parse_job_queue() -> ParseJobQueue:
+    global _parse_job_queue
+    if _parse_job_queue is None:
+        _parse_job_queue = ParseJobQueue()
+    return _parse_job_queue
@@ -0,0 +1,130 @@
+"""
+项目知识库 - 数据库中项目数据的进程内快照及预构建的查找结构
+
+- 快照按 project_kb_meta.version 判断是否过期：本进程的修改提交后在提交所在线程中立即重建，
+  其他 worker 进程的修改由后台线程定期检查版本号，最迟约 2 × VERSION_CHECK_INTERVAL 秒后生效
+- 读取快照不访问数据库（首次加载除外，应用启动时已在线程中预热），可在事件循环上调用
+- 每次重建生成一个新的不可变快照并整体替换引用，读取方拿到的始终是一致的快照
+- 快照中的数据供只读使用；需要修改时通过 ProjectExtractor 的管理方法（数据库事务）进行
+"""
+import asyncio
+import logging
+import time
+from threading import Lock
+from typing import Dict, List, Optional
+
+from app.services.project_store import ProjectStore, name_key
+from app.utils.aho_corasick import AhoCorasick
+
+logger = logging.getLogger(__name__)
+
+# 文本包含匹配时忽略的过短名称（单字别名误命中太多）
+MIN_CONTAINED_NAME_LENGTH = 2
+
+# 检查其他进程是否修改了知识库的最小间隔（秒）
+VERSION_CHECK_INTERVAL = 1.0
+
+
+class ProjectKnowledgeBase:
+    """项目数据快照（只读）"""
+
+    def __init__(self, data: dict, version: int):
+        self.data = data
+        self.version = version  # 知识库版本号，派生索引（如向量矩阵）据此判断是否需要重建
+
+        self.projects: List[dict] = data.get("projects", [])
+        self.active_projects: List[dict] = [p for p in self.projects if p.get("status") != "archived"]
+        self.active_names = {p["name"] for p in self.active_projects}
+        self.by_name: Dict[str, dict] = {p["name"]: p for p in self.projects}
+
+        # 小写的项目名/别名 -> 标准名（仅未归档项目，重名时按项目顺序先出现的优先）
+        self.name_map: Dict[str, str] = {}
+        for proj in self.active_projects:
+            for name in [proj["name"]] + proj.get("aliases", []):
+                self.name_map.setdefault(name.lower(), proj["name"])
+
+        # 项目名 -> 子项名称列表（兼容字符串和对象两种子项格式）
+        self.sub_items: Dict[str, List[str]] = {
+            p["name"]: [s.get("name", "") if isinstance(s, dict) else s for s in p.get("sub_items", [])]
+            for p in self.projects
+        }
+
+        # 未归档项目名/别名 -> 标准名 的多模式匹配自动机，所有"文本中出现了哪些项目"的判断共用
+        self.name_automaton = AhoCorasick(self.name_map.items(), min_length=MIN_CONTAINED_NAME_LENGTH)
+        # 未归档项目的子项名 -> 所属项目名（同名子项可属于多个项目）
+        self.sub_item_automaton = AhoCorasick(
+            ((sub_name, p["name"]) for p in self.active_projects for sub_name in self.sub_items[p["name"]]),
+            min_length=MIN_CONTAINED_NAME_LENGTH
+        )
+
+        self.pending_names = {name_key(p["name"]) for p in data.get("pending_projects", [])}
+        self.rejected_names = {name_key(r) for r in data.get("rejected", [])}
+
+    def match(self, text: Optional[str]) -> Optional[str]:
+        """项目名或别名精确匹配（忽略大小写和首尾空白），返回标准名"""
+        if not text:
+            return None
+        return self.name_map.get(text.strip().lower())
+
+    def find_projects(self, text: str) -> List[str]:
+        """文本中出现的项目（按最左最长、互不重叠的规则匹配项目名/别名），按出现顺序"""
+        return self.name_automaton.values(text)
+
+
+class ProjectKBCache:
+    """项目知识库快照缓存（线程安全）"""
+
+    def __init__(self, store: ProjectStore):
+        self.store = store
+        self._kb: Optional[ProjectKnowledgeBase] = None
+        self._checked_at = 0.0
+        self._checking = False
+        self._lock = Lock()
+        self.loads = 0  # 重建快照的次数
+        store.add_listener(self.refresh)
+
+    def get(self) -> ProjectKnowledgeBase:
+        """当前快照；版本检查到期时在后台检查，本次仍返回现有快照"""
+        kb = self._kb
+        if kb is None:
+            return self.refresh()
+        if time.monotonic() - self._checked_at >= VERSION_CHECK_INTERVAL:
+            self._check_in_background()
+        return kb
+
+    def _check_in_background(self):
+        """在事件循环上时交给线程池检查，不阻塞事件循环；不在事件循环上（线程池、脚本）时直接检查"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.refresh()
+            return
+        if self._checking:
+            return
+        self._checking = True
+        loop.run_in_executor(None, self.refresh).add_done_callback(self._check_done)
+
+    def _check_done(self, future: asyncio.Future):
+        self._checking = False
+        if not future.cancelled() and future.exception() is not None:
+            logger.warning(f"项目知识库版本检查失败: {future.exception()}")
+
+    def refresh(self) -> ProjectKnowledgeBase:
+        """检查版本号，知识库有修改时重建快照（访问数据库，不要在事件循环上直接调用）"""
+        with self._lock:
+            version = self.store.version()
+            self._checked_at = time.monotonic()
+            if self._kb is None or self._kb.version != version:
+                self._kb = ProjectKnowledgeBase(self.store.load_data(), version)
+                self.loads += 1
+            return self._kb
+
+    def stats(self) -> dict:
+        kb = self._kb
+        return {
+            "loads": self.loads,
+            "version": kb.version if kb else None,
+            "projects": len(kb.projects) if kb else 0,
+            "active_projects": len(kb.active_projects) if kb else 0,
+            "names": len(kb.name_map) if kb else 0
+        }
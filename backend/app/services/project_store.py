@@ -0,0 +1,348 @@
+"""
+项目知识库存储 - 项目、别名、子项、类别、待审核和黑名单保存在数据库表中
+
+- 同步接口，使用 app.database.sync_engine；只能在线程池中调用，不要在事件循环上直接调用
+  （ProjectExtractor 的管理方法用 asyncio.to_thread 包装为协程）
+- 名称类字段另存小写列并建索引，按名称查找、查重都是索引查询；
+  项目名称和别名共用一个忽略大小写的命名空间：每个小写名称只属于一个项目（唯一索引 + key_taken 检查）
+- 每次修改在同一事务中递增 project_kb_meta.version，多个 worker 进程据此判断内存快照是否过期
+- 首次使用时自动从 projects.json 导入（只导入一次，原文件保留作备份）
+"""
+import json
+import logging
+import os
+from contextlib import contextmanager
+from threading import Lock
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence
+
+from sqlalchemy import event, select, delete, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, selectinload
+
+from app.database import Base, sync_engine, sync_session
+from app.models.project import (
+    Project, ProjectAlias, ProjectSubItem, ProjectCategory, PendingProject, RejectedMention, ProjectKBMeta
+)
+
+logger = logging.getLogger(__name__)
+
+_TABLES = [
+    Project.__table__, ProjectAlias.__table__, ProjectSubItem.__table__, ProjectCategory.__table__,
+    PendingProject.__table__, RejectedMention.__table__, ProjectKBMeta.__table__
+]
+
+META_ID = 1
+
+_CHANGED_KEY = "project_kb_changed"
+
+
+@event.listens_for(sync_session, "after_flush")
+def _mark_changed(session: Session, flush_context):
+    """事务内有过写入（flush 只在有待写入的对象时触发）"""
+    session.info[_CHANGED_KEY] = True
+
+
+def name_key(name: str) -> str:
+    """名称的查找键：去除首尾空白并转小写"""
+    return (name or "").strip().lower()
+
+
+def project_to_dict(project: Project) -> dict:
+    return {
+        "name": project.name,
+        "aliases": [a.alias for a in project.aliases],
+        "category": project.category or "其他",
+        "status": project.status or "active",
+        "description": project.description or "",
+        "sub_items": [{"name": s.name, "description": s.description or ""} for s in project.sub_items]
+    }
+
+
+def pending_to_dict(pending: PendingProject) -> dict:
+    if pending.kind == "sub_item":
+        return {
+            "type": "sub_item",
+            "name": pending.name,
+            "parent_project": pending.parent_project,
+            "first_seen": pending.first_seen,
+            "suggested_by": pending.suggested_by or ""
+        }
+    result = {
+        "name": pending.name,
+        "first_seen": pending.first_seen,
+        "mentions": pending.mentions or 0,
+        "source_texts": json.loads(pending.source_texts or "[]"),
+        "suggested_category": pending.suggested_category or "其他",
+        "confidence": pending.confidence
+    }
+    if pending.suggested_by:
+        result["suggested_by"] = pending.suggested_by
+    return result
+
+
+class ProjectStore:
+    """项目知识库的数据库存储"""
+
+    def __init__(self, legacy_json_path: str, initial_data: Callable[[], dict]):
+        self.legacy_json_path = legacy_json_path
+        self.initial_data = initial_data
+        self._listeners: List[Callable[[], None]] = []  # 有修改的事务提交后调用（在提交所在线程中）
+        self._ready = False
+        self._ready_lock = Lock()
+
+    def ensure_ready(self):
+        """建表并在首次使用时导入初始数据"""
+        if self._ready:
+            return
+        with self._ready_lock:
+            if self._ready:
+                return
+            Base.metadata.create_all(sync_engine, tables=_TABLES)
+            with sync_session() as db:
+                if db.get(ProjectKBMeta, META_ID) is None:
+                    self._import_initial(db)
+            self._ready = True
+
+    def _import_initial(self, db: Session):
+        source, data = "initial", None
+        if os.path.exists(self.legacy_json_path):
+            try:
+                with open(self.legacy_json_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                source = self.legacy_json_path
+            except Exception as e:
+                logger.warning(f"读取 {self.legacy_json_path} 失败，使用初始数据: {e}")
+        if data is None:
+            data = self.initial_data()
+
+        try:
+            db.add(ProjectKBMeta(id=META_ID, version=1, migrated_from=source))
+            self.write_all(db, data)
+            db.commit()
+        except IntegrityError:
+            # 其他 worker 进程已完成导入
+            db.rollback()
+            return
+        logger.info(f"项目知识库已从 {source} 导入数据库: {len(data.get('projects', []))} 个项目")
+
+    def add_listener(self, callback: Callable[[], None]):
+        self._listeners.append(callback)
+
+    def _notify(self):
+        for callback in self._listeners:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning(f"项目知识库修改通知失败: {e}")
+
+    @contextmanager
+    def session(self) -> Iterator[Session]:
+        """只读会话"""
+        self.ensure_ready()
+        with sync_session() as db:
+            yield db
+
+    @contextmanager
+    def transaction(self) -> Iterator[Session]:
+        """修改事务：正常结束时提交，有实际修改时同时递增版本号；异常时回滚"""
+        self.ensure_ready()
+        with sync_session() as db:
+            try:
+                yield db
+                db.flush()
+                changed = db.info.pop(_CHANGED_KEY, False)
+                if changed:
+                    db.execute(update(ProjectKBMeta).where(ProjectKBMeta.id == META_ID)
+                               .values(version=ProjectKBMeta.version + 1))
+                db.commit()
+            except BaseException:
+                db.rollback()
+                raise
+        if changed:
+            self._notify()
+
+    def version(self) -> int:
+        with self.session() as db:
+            return db.scalar(select(ProjectKBMeta.version).where(ProjectKBMeta.id == META_ID)) or 0
+
+    # ========== 查询 ==========
+
+    @staticmethod
+    def find_project(db: Session, name: str, load_children: bool = True) -> Optional[Project]:
+        query = select(Project).where(Project.name == name)
+        if load_children:
+            query = query.options(selectinload(Project.aliases), selectinload(Project.sub_items))
+        return db.scalar(query)
+
+    @staticmethod
+    def find_pending(db: Session, name: str, kind: str = "project", parent_project: str = "",
+                     ignore_case: bool = False) -> Optional[PendingProject]:
+        query = select(PendingProject).where(
+            PendingProject.kind == kind, PendingProject.parent_project == parent_project
+        )
+        if ignore_case:
+            query = query.where(PendingProject.name_key == name_key(name))
+        else:
+            query = query.where(PendingProject.name == name)
+        return db.scalars(query.limit(1)).first()
+
+    @staticmethod
+    def key_taken(db: Session, name: str, exclude_ids: Sequence[int] = ()) -> bool:
+        """名称（忽略大小写）是否已被其他项目用作名称或别名"""
+        key = name_key(name)
+        by_name = select(Project.id).where(Project.name_key == key)
+        by_alias = select(ProjectAlias.id).where(ProjectAlias.alias_key == key)
+        if exclude_ids:
+            by_name = by_name.where(Project.id.not_in(exclude_ids))
+            by_alias = by_alias.where(ProjectAlias.project_id.not_in(exclude_ids))
+        return (db.scalar(by_name.limit(1)) is not None
+                or db.scalar(by_alias.limit(1)) is not None)
+
+    def any_key_taken(self, db: Session, names: Iterable[str], exclude_ids: Sequence[int] = ()) -> bool:
+        return any(self.key_taken(db, name, exclude_ids) for name in names if name)
+
+    @staticmethod
+    def is_rejected(db: Session, name: str) -> bool:
+        return db.scalar(
+            select(RejectedMention.id).where(RejectedMention.name_key == name_key(name)).limit(1)
+        ) is not None
+
+    @staticmethod
+    def list_projects(db: Session) -> List[Project]:
+        return list(db.scalars(
+            select(Project)
+            .options(selectinload(Project.aliases), selectinload(Project.sub_items))
+            .order_by(Project.position, Project.id)
+        ).all())
+
+    @staticmethod
+    def list_categories(db: Session) -> List[str]:
+        return list(db.scalars(select(ProjectCategory.name).order_by(ProjectCategory.position, ProjectCategory.id)))
+
+    @staticmethod
+    def list_pending(db: Session) -> List[dict]:
+        rows = db.scalars(select(PendingProject).order_by(PendingProject.id))
+        return [pending_to_dict(row) for row in rows]
+
+    @staticmethod
+    def list_rejected(db: Session) -> List[str]:
+        return list(db.scalars(select(RejectedMention.name).order_by(RejectedMention.id)))
+
+    def load_data(self) -> dict:
+        """读取完整知识库，结构与原 projects.json 相同"""
+        with self.session() as db:
+            return {
+                "projects": [project_to_dict(p) for p in self.list_projects(db)],
+                "categories": self.list_categories(db),
+                "pending_projects": self.list_pending(db),
+                "rejected": self.list_rejected(db)
+            }
+
+    # ========== 修改 ==========
+
+    @staticmethod
+    def next_position(db: Session, model) -> int:
+        last = db.scalar(select(model.position).order_by(model.position.desc()).limit(1))
+        return (last or 0) + 1
+
+    @staticmethod
+    def set_aliases(project: Project, aliases: List[str]):
+        """
+        按给定顺序重设别名（忽略大小写去重，保留已有行）
+        与其他项目名称/别名的冲突由调用方先用 key_taken 检查
+        """
+        existing = {a.alias_key: a for a in project.aliases}
+        result, seen = [], set()
+        for alias in aliases:
+            key = name_key(alias)
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            # 同一别名只改大小写时沿用原有行（避免先插入后删除触发唯一索引冲突）
+            row = existing.get(key) or ProjectAlias(alias_key=key)
+            row.alias = alias
+            row.position = len(result)
+            result.append(row)
+        project.aliases = result
+
+    @staticmethod
+    def set_sub_items(project: Project, sub_items: list):
+        """按给定顺序重设子项（兼容字符串和对象格式，同名只保留第一个）"""
+        existing = {s.name: s for s in project.sub_items}
+        result, seen = [], set()
+        for item in sub_items or []:
+            name = item if isinstance(item, str) else (item or {}).get("name", "")
+            if not name or name in seen:
+                continue
+            seen.add(name)
+            row = existing.get(name) or ProjectSubItem(name=name, name_key=name_key(name))
+            row.description = "" if isinstance(item, str) else item.get("description", "") or ""
+            row.position = len(result)
+            result.append(row)
+        project.sub_items = result
+
+    def write_all(self, db: Session, data: dict):
+        """
+        用完整数据（projects.json 结构）替换知识库内容
+        名称忽略大小写重复的项目只保留第一个；与其他项目名称或先出现的别名重复的别名丢弃
+        """
+        for model in (ProjectAlias, ProjectSubItem, Project, ProjectCategory, PendingProject, RejectedMention):
+            db.execute(delete(model))
+
+        projects, taken = [], set()
+        for proj in data.get("projects", []):
+            if proj.get("name") and name_key(proj["name"]) not in taken:
+                projects.append(proj)
+                taken.add(name_key(proj["name"]))
+
+        for position, proj in enumerate(projects):
+            aliases = []
+            for alias in proj.get("aliases", []):
+                key = name_key(alias)
+                if not key or (key in taken and key != name_key(proj["name"])):
+                    if key:
+                        logger.warning(f"别名「{alias}」（项目「{proj['name']}」）与其他项目重复，已忽略")
+                    continue
+                taken.add(key)
+                aliases.append(alias)
+            project = Project(
+                name=proj["name"],
+                name_key=name_key(proj["name"]),
+                category=proj.get("category", "其他"),
+                status=proj.get("status", "active"),
+                description=proj.get("description", ""),
+                position=position,
+                aliases=[],
+                sub_items=[]
+            )
+            self.set_aliases(project, aliases)
+            self.set_sub_items(project, proj.get("sub_items", []))
+            db.add(project)
+
+        for position, category in enumerate(dict.fromkeys(data.get("categories", []))):
+            db.add(ProjectCategory(name=category, position=position))
+
+        seen = set()
+        for item in data.get("pending_projects", []):
+            kind = item.get("type", "project")
+            key = (kind, item.get("parent_project", ""), name_key(item.get("name", "")))
+            if not key[2] or key in seen:
+                continue
+            seen.add(key)
+            db.add(PendingProject(
+                kind=kind,
+                name=item["name"],
+                name_key=key[2],
+                parent_project=key[1],
+                first_seen=item.get("first_seen"),
+                mentions=item.get("mentions", 1),
+                source_texts=json.dumps(item.get("source_texts", []), ensure_ascii=False),
+                suggested_category=item.get("suggested_category"),
+                confidence=item.get("confidence"),
+                suggested_by=item.get("suggested_by")
+            ))
+
+        for name in dict.fromkeys(data.get("rejected", [])):
+            if name:
+                db.add(RejectedMention(name=name, name_key=name_key(name)))
+        db.flush()
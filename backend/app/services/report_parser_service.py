@@ -2,17 +2,88 @@
 周报解析服务 - 将自由文本解析为结构化工作条目
 使用 LLM 分析文本，识别项目名和工作条目，与 projects.json 匹配
 """
+import asyncio
+import hashlib
 import json
 import logging
-from typing import Optional
-from sqlalchemy import delete
+import re
+from difflib import SequenceMatcher
+from typing import Optional, AsyncIterator, Dict, Hashable, List, Sequence, Tuple
+from sqlalchemy import delete, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import get_settings
 from app.services.llm_service import LLMService, get_project_extractor
+from app.services.llm_cascade import get_model_cascade
+from app.services.project_kb import ProjectKnowledgeBase
 from app.models.report import Report, ReportItem, ItemType
 from app.schemas.report import ParseResult, ParsedWorkItem
+from app.utils.aho_corasick import AhoCorasick
+from app.utils.json_stream import StreamingItemParser, parse_llm_json, is_complete_llm_json
+from app.utils.token_utils import estimate_tokens
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# 增量解析时为每个改动行附带的未改动上文行数（帮助判断所属项目）
+INCREMENTAL_CONTEXT_LINES = 2
+
+# 解析结果 JSON 的根对象应包含的键（都不含时视为无效输出）
+PARSE_RESULT_KEYS = ("this_week_items", "next_week_items")
+
+# 行首序号 / 列表符号，如 "1." "2、" "(3)" "-"（不匹配 "1.2版本" 这类内容本身的数字）
+LINE_PREFIX_PATTERN = re.compile(r"^(?:\d{1,3}\s*[.、．)）](?!\d)|[（(]\d{1,3}[)）]|[-*•·])\s*")
+
+# 条目内容与来源行的最低文本相似度，低于该值不指定来源行（避免张冠李戴）
+SOURCE_LINE_MIN_SIMILARITY = 0.5
+
+
+def split_source_lines(text: Optional[str]) -> List[str]:
+    """按行拆分周报文本，去除空行和序号前缀，结果作为条目的来源行"""
+    lines = []
+    for line in (text or "").split("\n"):
+        line = LINE_PREFIX_PATTERN.sub("", line.strip()).strip()
+        if line:
+            lines.append(line)
+    return lines
+
+
+def match_source_line(content: str, lines: Sequence[str]) -> Optional[str]:
+    """
+    为条目找出最可能的来源行：互相包含的行优先，否则取文本相似度最高的行
+    相似度低于 SOURCE_LINE_MIN_SIMILARITY 时返回 None
+    """
+    if not lines:
+        return None
+    for line in lines:
+        if content in line or (len(line) > 2 and line in content):
+            return line
+    ratio, best = max((SequenceMatcher(None, content, line).ratio(), line) for line in lines)
+    return best if ratio >= SOURCE_LINE_MIN_SIMILARITY else None
+
+
+def hash_source_line(line: str) -> str:
+    """来源行的短哈希，用于记录周报中已解析过的行"""
+    return hashlib.sha1(line.encode("utf-8")).hexdigest()[:16]
+
+
+def dump_parsed_lines(this_week_work: Optional[str], next_week_plan: Optional[str]) -> str:
+    """记录本次已解析过的全部行（包括标题、被合并到相邻条目的行），存入 Report.parsed_lines"""
+    return json.dumps({
+        item_type.value: sorted({hash_source_line(line) for line in split_source_lines(text)})
+        for item_type, text in ((ItemType.this_week, this_week_work), (ItemType.next_week, next_week_plan))
+    })
+
+
+def load_parsed_lines(value: Optional[str]) -> Optional[Dict[ItemType, set]]:
+    """读取 Report.parsed_lines，未记录（旧数据）或格式错误时返回 None"""
+    if not value:
+        return None
+    try:
+        data = json.loads(value)
+        return {item_type: set(data.get(item_type.value) or []) for item_type in ItemType}
+    except (json.JSONDecodeError, AttributeError, TypeError):
+        return None
 
 
 class ReportParserService:
@@ -53,53 +124,98 @@ class ReportParserService:
   ]
 }}"""
 
+    # 多份周报批量解析
+    BATCH_PARSE_PROMPT_TEMPLATE = """请解析以下 {count} 份周报，每份周报以 id 标识，各自独立解析。
+
+**重要**：project_name 字段必须从以下项目列表中精确选择，不要自行创造项目名。
+
+已知项目列表：
+{known_projects}
+
+{reports}
+
+请输出 JSON 格式，reports 必须包含上述全部 id，每个 id 恰好一项（project_name 必须是上述列表中的标准项目名，或 null）：
+{{
+  "reports": [
+    {{
+      "id": "周报id",
+      "this_week_items": [
+        {{"project_name": "从列表中选择的标准项目名或null", "content": "具体工作内容"}}
+      ],
+      "next_week_items": [
+        {{"project_name": "从列表中选择的标准项目名或null", "content": "具体计划内容"}}
+      ]
+    }}
+  ]
+}}"""
+
+    BATCH_REPORT_BLOCK_TEMPLATE = """=== 周报 id={report_id} ===
+本周工作内容：
+{this_week_work}
+
+下周计划：
+{next_week_plan}"""
+
+    LINE_PARSE_PROMPT_TEMPLATE = """以下是一份周报中新增或修改的行，请只解析以 [编号] 开头的行；以"（上文）"开头的行仅用于判断所属项目，不要输出。
+
+**重要**：project_name 字段必须从以下项目列表中精确选择，不要自行创造项目名。
+
+已知项目列表：
+{known_projects}
+
+本周工作内容：
+{this_week_lines}
+
+下周计划：
+{next_week_lines}
+
+请输出 JSON 格式，line 为条目来源行的编号（project_name 必须是上述列表中的标准项目名，或 null）：
+{{
+  "this_week_items": [
+    {{"line": 1, "project_name": "从列表中选择的标准项目名或null", "content": "具体工作内容"}}
+  ],
+  "next_week_items": [
+    {{"line": 2, "project_name": "从列表中选择的标准项目名或null", "content": "具体计划内容"}}
+  ]
+}}"""
+
     def __init__(self):
         self.llm = LLMService()
         self.extractor = get_project_extractor()
 
-    def _get_known_projects_str(self) -> str:
-        """获取已知项目列表字符串，包含描述和子项"""
-        data = self.extractor.load_known_projects()
-        projects = data.get("projects", [])
+    @staticmethod
+    def _format_project_line(proj: dict) -> str:
+        """单个项目在 prompt 中的描述行，包含描述、子项和别名"""
+        name = proj['name']
+        desc = proj.get("description", "")
+        sub_items = proj.get("sub_items", [])
+        aliases = proj.get("aliases", [])
 
-        lines = []
-        for proj in projects:
-            if proj.get("status") == "archived":
-                continue
+        # 构建项目信息
+        info_parts = []
+        if desc:
+            info_parts.append(desc)
+        if sub_items:
+            sub_names = [s.get("name", "") for s in sub_items if s.get("name")]
+            if sub_names:
+                info_parts.append(f"子项：{', '.join(sub_names)}")
+        if aliases:
+            info_parts.append(f"别名：{', '.join(aliases)}")
 
-            name = proj['name']
-            desc = proj.get("description", "")
-            sub_items = proj.get("sub_items", [])
-            aliases = proj.get("aliases", [])
-
-            # 构建项目信息
-            info_parts = []
-            if desc:
-                info_parts.append(desc)
-            if sub_items:
-                sub_names = [s.get("name", "") for s in sub_items if s.get("name")]
-                if sub_names:
-                    info_parts.append(f"子项：{', '.join(sub_names)}")
-            if aliases:
-                info_parts.append(f"别名：{', '.join(aliases)}")
-
-            if info_parts:
-                lines.append(f"- {name}：{'; '.join(info_parts)}")
-            else:
-                lines.append(f"- {name}")
+        if info_parts:
+            return f"- {name}：{'; '.join(info_parts)}"
+        return f"- {name}"
 
+    def _get_known_projects_str(self) -> str:
+        """获取已知项目列表字符串，包含描述和子项"""
+        lines = [self._format_project_line(proj) for proj in self.extractor.knowledge_base().active_projects]
         return "\n".join(lines) if lines else "暂无"
 
-    def _clean_json_response(self, response: str) -> str:
-        """清理 LLM 响应，提取 JSON"""
-        response = response.strip()
-        if response.startswith("```"):
-            parts = response.split("```")
-            if len(parts) >= 2:
-                response = parts[1]
-                if response.startswith("json"):
-                    response = response[4:]
-        return response.strip()
+    async def _get_known_projects_block(self, text: str, call_site: str) -> str:
+        """获取 prompt 中的已知项目列表（开启裁剪时只详细列出与 text 相关的项目）"""
+        return await self.extractor.known_projects_block(
+            text, self.extractor.knowledge_base().projects, self._format_project_line, call_site
+        )
 
     def _match_project_name(self, raw_name: Optional[str]) -> Optional[str]:
         """
@@ -113,30 +229,181 @@ class ReportParserService:
         if not raw_name:
             return None
 
-        data = self.extractor.load_known_projects()
-        projects = data.get("projects", [])
+        # 精确匹配标准项目名或别名
+        matched = self.extractor.knowledge_base().match(raw_name)
+        if matched:
+            return matched
 
+        # 不匹配时返回原始值，供用户在前端修正
         raw_stripped = raw_name.strip()
-        raw_lower = raw_stripped.lower()
+        return raw_stripped if raw_stripped else None
 
-        for proj in projects:
-            if proj.get("status") == "archived":
-                continue
-            # 精确匹配标准项目名
-            if raw_lower == proj["name"].lower():
-                return proj["name"]
-            # 精确匹配别名
-            for alias in proj.get("aliases", []):
-                if raw_lower == alias.lower():
-                    return proj["name"]
+    @staticmethod
+    def _rule_label_line(line: str, automaton: AhoCorasick) -> Optional[str]:
+        """
+        规则标注单行：行内只命中一个项目（项目名或别名原文出现）时返回该项目名
+        小标题（以冒号结尾或整行就是项目名）不标注，交给 LLM 结合上下文处理
+        """
+        if line.endswith((":", "：")):
+            return None
+        matches = automaton.find_longest(line)
+        if any(match.length == len(line) for match in matches):
+            return None
+        hits = {match.value for match in matches}
+        return hits.pop() if len(hits) == 1 else None
 
-        # 不匹配时返回原始值，供用户在前端修正
-        return raw_stripped if raw_stripped else None
+    def _rule_pre_parse(self, lines: Sequence[str],
+                        kb: ProjectKnowledgeBase) -> Tuple[List[ParsedWorkItem], List[str]]:
+        """
+        规则预解析：只命中一个项目的行直接生成条目（parse_source=rule）
 
-    async def parse_report_text(
+        Returns:
+            (规则标注的条目, 未命中或命中多个项目、需要交给 LLM 的行)
+        """
+        items, rest = [], []
+        for line in lines:
+            project_name = self._rule_label_line(line, kb.name_automaton) if len(line) > 2 else None
+            if project_name:
+                items.append(ParsedWorkItem(
+                    project_name=project_name,
+                    content=line,
+                    source_line=line,
+                    parse_source="rule"
+                ))
+            else:
+                rest.append(line)
+        return items, rest
+
+    async def _pre_parse(self, lines: Sequence[str],
+                         kb: ProjectKnowledgeBase) -> Tuple[List[ParsedWorkItem], List[str]]:
+        """
+        LLM 前的确定性解析：先查用户确认过的行记忆（parse_source=memo），再做规则标注
+
+        Returns:
+            (已确定项目的条目, 需要交给 LLM 的行)
+        """
+        from app.services.line_memo_service import get_line_memo_service
+
+        items: List[ParsedWorkItem] = []
+        rest = list(lines)
+        if settings.LINE_MEMO_ENABLED and rest:
+            try:
+                memo = await get_line_memo_service().lookup(rest, kb.active_names)
+            except Exception as e:
+                logger.warning(f"查询行记忆失败: {e}")
+                memo = {}
+            items.extend(
+                ParsedWorkItem(project_name=memo[line], content=line, source_line=line, parse_source="memo")
+                for line in rest if line in memo
+            )
+            rest = [line for line in rest if line not in memo]
+        if settings.REPORT_RULE_PREPARSE:
+            rule_items, rest = self._rule_pre_parse(rest, kb)
+            items.extend(rule_items)
+        return items, rest
+
+    @staticmethod
+    def _merge_rule_items(
+        rule_items: List[ParsedWorkItem],
+        llm_items: List[ParsedWorkItem],
+        text: Optional[str]
+    ) -> List[ParsedWorkItem]:
+        """合并预解析条目与 LLM 条目，按来源行在原文中的顺序排列"""
+        if not rule_items:
+            return llm_items
+        lines = split_source_lines(text)
+        line_order: Dict[str, int] = {}
+        for i, line in enumerate(lines):
+            line_order.setdefault(line, i)
+
+        rule_lines = {item.source_line for item in rule_items}
+        rest_lines = [line for line in lines if line not in rule_lines]
+        for item in llm_items:
+            if item.source_line is None:
+                item.source_line = match_source_line(item.content, rest_lines)
+        return sorted(rule_items + llm_items, key=lambda i: line_order.get(i.source_line, len(lines)))
+
+    def _parse_escalation_reason(self, response: str) -> Optional[str]:
+        """
+        级联校验：快速模型的解析输出须为有效 JSON，且条目的项目都在已知列表中
+        返回升级原因，通过校验返回 None
+        """
+        try:
+            parsed, _ = parse_llm_json(response, PARSE_RESULT_KEYS)
+        except json.JSONDecodeError:
+            return "invalid_json"
+        if not isinstance(parsed, dict):
+            return "invalid_json"
+
+        known = self.extractor.knowledge_base().active_names
+        for key in ("this_week_items", "next_week_items"):
+            items = parsed.get(key) or []
+            if not isinstance(items, list) or not all(isinstance(raw, dict) for raw in items):
+                return "invalid_json"
+            for raw in items:
+                project_name = self._match_project_name(raw.get("project_name"))
+                if project_name and project_name not in known:
+                    return "unknown_project"
+        return None
+
+    async def _build_parse_prompt(
         self,
         this_week_work: Optional[str],
+        next_week_plan: Optional[str],
+        call_site: str = "report_parse"
+    ) -> str:
+        """构建解析 prompt"""
+        known_projects = await self._get_known_projects_block(
+            f"{this_week_work or ''}\n{next_week_plan or ''}", call_site
+        )
+        return self.PARSE_PROMPT_TEMPLATE.format(
+            known_projects=known_projects,
+            this_week_work=this_week_work or "（无）",
+            next_week_plan=next_week_plan or "（无）"
+        )
+
+    def _to_parsed_item(self, raw: dict) -> Optional[ParsedWorkItem]:
+        """将 LLM 输出的单条结果转换为 ParsedWorkItem，内容为空时返回 None"""
+        content = (raw.get("content") or "").strip()
+        if not content:
+            return None
+        return ParsedWorkItem(
+            project_name=self._match_project_name(raw.get("project_name")),
+            content=content,
+            parse_source="llm"
+        )
+
+    def _to_parse_result(
+        self,
+        parsed: dict,
+        this_week_work: Optional[str],
         next_week_plan: Optional[str]
+    ) -> ParseResult:
+        """将 LLM 输出的单份周报 JSON 转换为 ParseResult"""
+        result = ParseResult(
+            raw_this_week=this_week_work,
+            raw_next_week=next_week_plan
+        )
+
+        # 处理本周工作
+        for raw in parsed.get("this_week_items") or []:
+            item = self._to_parsed_item(raw)
+            if item:
+                result.this_week_items.append(item)
+
+        # 处理下周计划
+        for raw in parsed.get("next_week_items") or []:
+            item = self._to_parsed_item(raw)
+            if item:
+                result.next_week_items.append(item)
+
+        return result
+
+    async def parse_report_text(
+        self,
+        this_week_work: Optional[str],
+        next_week_plan: Optional[str],
+        allow_fallback: bool = True
     ) -> ParseResult:
         """
         解析周报文本，返回结构化工作条目
@@ -144,6 +411,7 @@ class ReportParserService:
         Args:
             this_week_work: 本周工作文本
             next_week_plan: 下周计划文本
+            allow_fallback: LLM 解析失败时是否使用降级方案；为 False 时直接抛出异常（由调用方重试）
 
         Returns:
             ParseResult: 解析结果
@@ -157,37 +425,49 @@ class ReportParserService:
         if not this_week_work and not next_week_plan:
             return result
 
+        # 行记忆 / 规则预解析：已能确定项目的行直接生成条目，其余行交给 LLM
+        if settings.LINE_MEMO_ENABLED or settings.REPORT_RULE_PREPARSE:
+            kb = self.extractor.knowledge_base()
+            rule_this, rest_this = await self._pre_parse(split_source_lines(this_week_work), kb)
+            rule_next, rest_next = await self._pre_parse(split_source_lines(next_week_plan), kb)
+            if rule_this or rule_next:
+                logger.info(f"预解析命中 {len(rule_this) + len(rule_next)} 行，"
+                            f"{len(rest_this) + len(rest_next)} 行交给 LLM")
+                llm_result = ParseResult()
+                if rest_this or rest_next:
+                    llm_result = await self._parse_with_llm(
+                        "\n".join(rest_this), "\n".join(rest_next), allow_fallback
+                    )
+                result.this_week_items = self._merge_rule_items(
+                    rule_this, llm_result.this_week_items, this_week_work
+                )
+                result.next_week_items = self._merge_rule_items(
+                    rule_next, llm_result.next_week_items, next_week_plan
+                )
+                return result
+
+        return await self._parse_with_llm(this_week_work, next_week_plan, allow_fallback)
+
+    async def _parse_with_llm(
+        self,
+        this_week_work: Optional[str],
+        next_week_plan: Optional[str],
+        allow_fallback: bool
+    ) -> ParseResult:
+        """整份文本交给 LLM 解析，失败时按 allow_fallback 降级或抛出"""
         # 构建 prompt
-        known_projects = self._get_known_projects_str()
-        prompt = self.PARSE_PROMPT_TEMPLATE.format(
-            known_projects=known_projects,
-            this_week_work=this_week_work or "（无）",
-            next_week_plan=next_week_plan or "（无）"
-        )
+        prompt = await self._build_parse_prompt(this_week_work, next_week_plan)
 
         try:
             # 调用 LLM 解析
-            response = await self.llm.call(prompt, self.PARSE_SYSTEM_PROMPT)
-            response = self._clean_json_response(response)
-            parsed = json.loads(response)
-
-            # 处理本周工作
-            for item in parsed.get("this_week_items", []):
-                project_name = self._match_project_name(item.get("project_name"))
-                content = item.get("content", "").strip()
-                if content:
-                    result.this_week_items.append(
-                        ParsedWorkItem(project_name=project_name, content=content)
-                    )
-
-            # 处理下周计划
-            for item in parsed.get("next_week_items", []):
-                project_name = self._match_project_name(item.get("project_name"))
-                content = item.get("content", "").strip()
-                if content:
-                    result.next_week_items.append(
-                        ParsedWorkItem(project_name=project_name, content=content)
-                    )
+            response = await get_model_cascade().call(
+                self.llm, prompt, self.PARSE_SYSTEM_PROMPT, "report_parse", self._parse_escalation_reason,
+                json_mode=True
+            )
+            parsed, complete = parse_llm_json(response, PARSE_RESULT_KEYS)
+            if not complete:
+                logger.warning("LLM 输出被截断，保留已完整的条目")
+            result = self._to_parse_result(parsed, this_week_work, next_week_plan)
 
             logger.info(
                 f"周报解析完成: 本周{len(result.this_week_items)}条, "
@@ -195,14 +475,410 @@ class ReportParserService:
             )
 
         except json.JSONDecodeError as e:
+            if not allow_fallback:
+                raise
             logger.warning(f"LLM 返回 JSON 解析失败: {e}, 使用降级方案")
             result = self._fallback_parse(this_week_work, next_week_plan)
         except Exception as e:
+            if not allow_fallback:
+                raise
             logger.error(f"周报解析失败: {e}, 使用降级方案")
             result = self._fallback_parse(this_week_work, next_week_plan)
 
         return result
 
+    async def parse_report_text_stream(
+        self,
+        this_week_work: Optional[str],
+        next_week_plan: Optional[str]
+    ) -> AsyncIterator[tuple]:
+        """
+        流式解析周报文本：与 parse_report_text 相同的流程（行记忆 / 规则预解析 → LLM → 降级），
+        预解析的条目立即产出，其余行交给 LLM，每输出一条完整条目立即产出
+
+        Yields:
+            ("this_week" | "next_week", ParsedWorkItem)，
+            最后产出 ("done", ParseResult)；级联升级时 done 中的条目会替换之前流式产出的 LLM 条目
+        """
+        result = ParseResult(
+            raw_this_week=this_week_work,
+            raw_next_week=next_week_plan
+        )
+
+        if not this_week_work and not next_week_plan:
+            yield "done", result
+            return
+
+        # 行记忆 / 规则预解析：已能确定项目的行直接产出，其余行交给 LLM
+        rule_this: List[ParsedWorkItem] = []
+        rule_next: List[ParsedWorkItem] = []
+        llm_this, llm_next = this_week_work, next_week_plan
+        if settings.LINE_MEMO_ENABLED or settings.REPORT_RULE_PREPARSE:
+            kb = self.extractor.knowledge_base()
+            rule_this, rest_this = await self._pre_parse(split_source_lines(this_week_work), kb)
+            rule_next, rest_next = await self._pre_parse(split_source_lines(next_week_plan), kb)
+            if rule_this or rule_next:
+                for item in rule_this:
+                    yield "this_week", item
+                for item in rule_next:
+                    yield "next_week", item
+                llm_this, llm_next = "\n".join(rest_this), "\n".join(rest_next)
+
+        llm_result = ParseResult()
+        if llm_this or llm_next:
+            async for section, payload in self._stream_with_llm(llm_this, llm_next):
+                if section == "done":
+                    llm_result = payload
+                else:
+                    yield section, payload
+
+        result.this_week_items = self._merge_rule_items(rule_this, llm_result.this_week_items, this_week_work)
+        result.next_week_items = self._merge_rule_items(rule_next, llm_result.next_week_items, next_week_plan)
+        yield "done", result
+
+    async def _stream_with_llm(
+        self,
+        this_week_work: Optional[str],
+        next_week_plan: Optional[str]
+    ) -> AsyncIterator[tuple]:
+        """流式交给 LLM 解析（经模型级联），失败时降级；产出同 parse_report_text_stream"""
+        result = ParseResult(
+            raw_this_week=this_week_work,
+            raw_next_week=next_week_plan
+        )
+        prompt = await self._build_parse_prompt(this_week_work, next_week_plan, call_site="report_parse_stream")
+        stream_parser = StreamingItemParser()
+        valid = False
+
+        try:
+            async for kind, text in get_model_cascade().stream(
+                self.llm, prompt, self.PARSE_SYSTEM_PROMPT, "report_parse_stream", self._parse_escalation_reason,
+                json_mode=True
+            ):
+                if kind == "replace":
+                    # 级联升级：以默认模型的完整输出为准
+                    parsed, _ = parse_llm_json(text, PARSE_RESULT_KEYS)
+                    result = self._to_parse_result(parsed, this_week_work, next_week_plan)
+                    valid = True
+                    continue
+                for key, raw in stream_parser.feed(text):
+                    if key not in PARSE_RESULT_KEYS:
+                        continue
+                    item = self._to_parsed_item(raw)
+                    if item:
+                        getattr(result, key).append(item)
+                        yield key.removesuffix("_items"), item
+        except Exception as e:
+            logger.error(f"周报流式解析失败: {e}")
+
+        valid = valid or stream_parser.complete
+        if not valid and not result.this_week_items and not result.next_week_items:
+            logger.warning("LLM 流式输出未得到有效 JSON, 使用降级方案")
+            result = self._fallback_parse(this_week_work, next_week_plan)
+            for item in result.this_week_items:
+                yield "this_week", item
+            for item in result.next_week_items:
+                yield "next_week", item
+        else:
+            logger.info(
+                f"周报流式解析完成: 本周{len(result.this_week_items)}条, "
+                f"下周{len(result.next_week_items)}条"
+            )
+
+        yield "done", result
+
+    async def parse_reports_batch(
+        self,
+        reports: Sequence[Tuple[Hashable, Optional[str], Optional[str]]]
+    ) -> Dict[Hashable, ParseResult]:
+        """
+        批量解析多份周报：按 token 预算将多份周报打包进同一个 prompt，
+        已知项目列表每批只发送一次；多批之间并发执行
+
+        Args:
+            reports: [(键, 本周工作, 下周计划), ...]，键用于对应返回结果（如 report.id）
+
+        Returns:
+            {键: ParseResult}，与输入一一对应
+        """
+        results: Dict[Hashable, ParseResult] = {}
+        pending = []
+        for key, this_week_work, next_week_plan in reports:
+            if not this_week_work and not next_week_plan:
+                results[key] = ParseResult(raw_this_week=this_week_work, raw_next_week=next_week_plan)
+            else:
+                pending.append((key, this_week_work, next_week_plan))
+        if not pending:
+            return results
+
+        # 批量输出较长，使用单独的输出上限；提供商跟随 self.llm（补录脚本会指定提供商）
+        llm = LLMService(max_tokens=settings.REPORT_BATCH_MAX_OUTPUT_TOKENS)
+        llm.provider = self.llm.provider
+        # 开启裁剪时每批按本批内容单独生成项目列表
+        known_projects = None if settings.PROMPT_PROJECT_PRUNING else self._get_known_projects_str()
+
+        batches = self._pack_batches(pending)
+        semaphore = asyncio.Semaphore(max(1, settings.REPORT_BATCH_CONCURRENCY))
+
+        async def run(batch: list) -> Dict[Hashable, ParseResult]:
+            async with semaphore:
+                return await self._parse_batch_with_fallback(llm, known_projects, batch)
+
+        for batch_results in await asyncio.gather(*(run(batch) for batch in batches)):
+            results.update(batch_results)
+
+        logger.info(f"批量解析完成: {len(pending)} 份周报, {len(batches)} 批")
+        return results
+
+    def _pack_batches(self, reports: list) -> List[list]:
+        """按正文 token 预算和单批份数上限顺序打包"""
+        batches = []
+        current = []
+        current_tokens = 0
+        for report in reports:
+            _, this_week_work, next_week_plan = report
+            tokens = estimate_tokens(this_week_work or "") + estimate_tokens(next_week_plan or "")
+            if current and (current_tokens + tokens > settings.REPORT_BATCH_TOKEN_BUDGET
+                            or len(current) >= settings.REPORT_BATCH_MAX_REPORTS):
+                batches.append(current)
+                current = []
+                current_tokens = 0
+            current.append(report)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def _build_batch_prompt(self, known_projects: str, batch: list) -> str:
+        """构建批量解析 prompt，批内以 r1、r2... 作为周报 id"""
+        blocks = [
+            self.BATCH_REPORT_BLOCK_TEMPLATE.format(
+                report_id=f"r{i + 1}",
+                this_week_work=this_week_work or "（无）",
+                next_week_plan=next_week_plan or "（无）"
+            )
+            for i, (_, this_week_work, next_week_plan) in enumerate(batch)
+        ]
+        return self.BATCH_PARSE_PROMPT_TEMPLATE.format(
+            count=len(batch),
+            known_projects=known_projects,
+            reports="\n\n".join(blocks)
+        )
+
+    async def _parse_batch_with_fallback(
+        self,
+        llm: LLMService,
+        known_projects: Optional[str],
+        batch: list
+    ) -> Dict[Hashable, ParseResult]:
+        """
+        解析一批周报；JSON 无效或缺少部分周报时，对未得到结果的周报拆成更小的批次重试，
+        拆到单份时改用单份解析（含降级方案）
+        """
+        if len(batch) == 1:
+            key, this_week_work, next_week_plan = batch[0]
+            return {key: await self.parse_report_text(this_week_work, next_week_plan)}
+
+        results: Dict[Hashable, ParseResult] = {}
+        if known_projects is None:
+            batch_text = "\n".join(f"{this or ''}\n{next_ or ''}" for _, this, next_ in batch)
+            block = await self._get_known_projects_block(batch_text, "report_parse_batch")
+        else:
+            block = known_projects
+        prompt = self._build_batch_prompt(block, batch)
+        try:
+            response = await llm.call(
+                prompt, self.PARSE_SYSTEM_PROMPT, call_site="report_parse_batch", json_mode=True,
+                validate=lambda r: is_complete_llm_json(r, ("reports",))
+            )
+            parsed, complete = parse_llm_json(response, ("reports",))
+            entries = parsed.get("reports", [])
+            if not complete:
+                # 输出被截断：最后一份周报的条目可能不全，与未输出的周报一起重新解析
+                entries = entries[:-1]
+            by_id = {
+                str(entry.get("id")): entry
+                for entry in entries
+                if isinstance(entry, dict)
+            }
+            for i, (key, this_week_work, next_week_plan) in enumerate(batch):
+                entry = by_id.get(f"r{i + 1}")
+                if entry is not None:
+                    results[key] = self._to_parse_result(entry, this_week_work, next_week_plan)
+        except (json.JSONDecodeError, AttributeError, TypeError) as e:
+            logger.warning(f"批量解析结果无效（{len(batch)} 份）: {e}, 拆分重试")
+
+        missing = [report for report in batch if report[0] not in results]
+        if missing:
+            if len(missing) < len(batch):
+                logger.warning(f"批量解析缺少 {len(missing)}/{len(batch)} 份周报, 重新解析")
+                results.update(await self._parse_batch_with_fallback(llm, known_projects, missing))
+            else:
+                middle = len(missing) // 2
+                for half in (missing[:middle], missing[middle:]):
+                    results.update(await self._parse_batch_with_fallback(llm, known_projects, half))
+
+        return results
+
+    def plan_incremental_parse(
+        self,
+        this_week_work: Optional[str],
+        next_week_plan: Optional[str],
+        items: Sequence[ReportItem],
+        parsed_lines: Optional[str] = None
+    ) -> Optional[Dict[ItemType, List[str]]]:
+        """
+        对比周报最新文本与上次已解析过的行（Report.parsed_lines）及已有条目的来源行，找出需要重新解析的行
+
+        标题行、被合并进相邻条目的行虽然没有对应条目，但已记录为解析过，不会重复送给 LLM。
+        没有来源行的条目无法判断出处，此时只要有解析过的行被删改就全量解析。
+
+        Returns:
+            {条目类型: 新增或修改的行}；未开启增量解析、没有已有条目、旧数据存在无来源行的条目、
+            无来源行的条目可能已失效，或改动行占比过高时返回 None（需全量解析）
+        """
+        if not settings.REPORT_INCREMENTAL_PARSE or not items:
+            return None
+        processed = load_parsed_lines(parsed_lines)
+        unattributed = any(item.source_line is None for item in items)
+        if unattributed and processed is None:
+            return None
+
+        changed: Dict[ItemType, List[str]] = {}
+        total = 0
+        for item_type, text in ((ItemType.this_week, this_week_work), (ItemType.next_week, next_week_plan)):
+            known = {item.source_line for item in items if item.item_type == item_type}
+            lines = split_source_lines(text)
+            if processed is not None:
+                hashes = {hash_source_line(line) for line in lines}
+                if unattributed and not processed[item_type] <= hashes:
+                    return None
+                known |= {line for line in lines if hash_source_line(line) in processed[item_type]}
+            changed[item_type] = [line for line in dict.fromkeys(lines) if line not in known]
+            total += len(lines)
+
+        changed_count = sum(len(lines) for lines in changed.values())
+        if total and changed_count / total > settings.REPORT_INCREMENTAL_MAX_CHANGED_RATIO:
+            return None
+        return changed
+
+    @staticmethod
+    def _number_changed_lines(
+        lines: List[str],
+        changed: List[str],
+        numbered: Dict[int, Tuple[ItemType, str]],
+        item_type: ItemType
+    ) -> str:
+        """为改动行编号并附带少量上文，编号写入 numbered"""
+        changed_set = set(changed)
+        shown = set()
+        output = []
+        for i, line in enumerate(lines):
+            if line not in changed_set:
+                continue
+            # 重复的行只编号一次
+            changed_set.discard(line)
+            for j in range(max(0, i - INCREMENTAL_CONTEXT_LINES), i):
+                if j not in shown and lines[j] not in changed:
+                    output.append(f"（上文）{lines[j]}")
+                    shown.add(j)
+            number = len(numbered) + 1
+            numbered[number] = (item_type, line)
+            output.append(f"[{number}] {line}")
+            shown.add(i)
+        return "\n".join(output) if output else "无"
+
+    async def parse_changed_lines(
+        self,
+        this_week_work: Optional[str],
+        next_week_plan: Optional[str],
+        changed: Dict[ItemType, List[str]],
+        allow_fallback: bool = True
+    ) -> ParseResult:
+        """
+        只解析新增或修改的行（见 plan_incremental_parse），条目尽量带 source_line（无法对应时为 None）
+
+        Args:
+            allow_fallback: LLM 解析失败时是否按行降级；为 False 时直接抛出异常（由调用方重试）
+        """
+        result = ParseResult(
+            raw_this_week=this_week_work,
+            raw_next_week=next_week_plan
+        )
+        if not any(changed.values()):
+            return result
+
+        # 行记忆 / 规则预解析：已能确定项目的改动行不再交给 LLM
+        if settings.LINE_MEMO_ENABLED or settings.REPORT_RULE_PREPARSE:
+            kb = self.extractor.knowledge_base()
+            rule_this, rest_this = await self._pre_parse(changed[ItemType.this_week], kb)
+            rule_next, rest_next = await self._pre_parse(changed[ItemType.next_week], kb)
+            result.this_week_items.extend(rule_this)
+            result.next_week_items.extend(rule_next)
+            changed = {ItemType.this_week: rest_this, ItemType.next_week: rest_next}
+            if not rest_this and not rest_next:
+                return result
+
+        numbered: Dict[int, Tuple[ItemType, str]] = {}
+        this_week_lines = self._number_changed_lines(
+            split_source_lines(this_week_work), changed[ItemType.this_week], numbered, ItemType.this_week
+        )
+        next_week_lines = self._number_changed_lines(
+            split_source_lines(next_week_plan), changed[ItemType.next_week], numbered, ItemType.next_week
+        )
+        known_projects = await self._get_known_projects_block(
+            "\n".join(line for _, line in numbered.values()), "report_parse_lines"
+        )
+        prompt = self.LINE_PARSE_PROMPT_TEMPLATE.format(
+            known_projects=known_projects,
+            this_week_lines=this_week_lines,
+            next_week_lines=next_week_lines
+        )
+
+        try:
+            response = await get_model_cascade().call(
+                self.llm, prompt, self.PARSE_SYSTEM_PROMPT, "report_parse_lines", self._parse_escalation_reason,
+                json_mode=True
+            )
+            parsed, _ = parse_llm_json(response, PARSE_RESULT_KEYS)
+        except Exception as e:
+            if not allow_fallback:
+                raise
+            logger.warning(f"改动行解析失败: {e}, 使用降级方案")
+            for item_type, target in (
+                (ItemType.this_week, result.this_week_items),
+                (ItemType.next_week, result.next_week_items)
+            ):
+                target.extend(
+                    ParsedWorkItem(project_name=None, content=line, source_line=line, parse_source="fallback")
+                    for line in changed[item_type] if len(line) > 2
+                )
+            return result
+
+        for key, item_type, target in (
+            ("this_week_items", ItemType.this_week, result.this_week_items),
+            ("next_week_items", ItemType.next_week, result.next_week_items)
+        ):
+            for raw in parsed.get(key) or []:
+                item = self._to_parsed_item(raw)
+                if not item:
+                    continue
+                try:
+                    entry = numbered.get(int(raw.get("line")))
+                except (TypeError, ValueError):
+                    entry = None
+                if entry and entry[0] == item_type:
+                    item.source_line = entry[1]
+                else:
+                    item.source_line = match_source_line(item.content, changed[item_type])
+                target.append(item)
+
+        logger.info(
+            f"改动行解析完成: {len(numbered)}行, "
+            f"本周{len(result.this_week_items)}条, 下周{len(result.next_week_items)}条"
+        )
+        return result
+
     def _fallback_parse(
         self,
         this_week_work: Optional[str],
@@ -218,18 +894,12 @@ class ReportParserService:
         )
 
         def parse_lines(text: Optional[str]) -> list[ParsedWorkItem]:
-            if not text:
-                return []
-
-            items = []
-            # 按行拆分，去除空行和纯序号行
-            for line in text.split("\n"):
-                line = line.strip()
-                # 去除序号前缀
-                line = line.lstrip("0123456789.-、）) ")
-                if line and len(line) > 2:
-                    items.append(ParsedWorkItem(project_name=None, content=line))
-            return items
+            # 与规则预解析相同的拆行方式（只去除序号前缀，不误删"2025年"这类内容开头的数字）
+            return [
+                ParsedWorkItem(project_name=None, content=line, source_line=line, parse_source="fallback")
+                for line in split_source_lines(text)
+                if len(line) > 2
+            ]
 
         result.this_week_items = parse_lines(this_week_work)
         result.next_week_items = parse_lines(next_week_plan)
@@ -259,6 +929,8 @@ class ReportParserService:
         )
 
         count = 0
+        this_week_lines = split_source_lines(parse_result.raw_this_week)
+        next_week_lines = split_source_lines(parse_result.raw_next_week)
 
         # 保存本周工作
         for i, item in enumerate(parse_result.this_week_items):
@@ -267,7 +939,9 @@ class ReportParserService:
                 item_type=ItemType.this_week,
                 project_name=item.project_name,
                 content=item.content,
-                sequence=i
+                sequence=i,
+                source_line=item.source_line or match_source_line(item.content, this_week_lines),
+                parse_source=item.parse_source
             )
             db.add(report_item)
             count += 1
@@ -279,16 +953,87 @@ class ReportParserService:
                 item_type=ItemType.next_week,
                 project_name=item.project_name,
                 content=item.content,
-                sequence=i
+                sequence=i,
+                source_line=item.source_line or match_source_line(item.content, next_week_lines),
+                parse_source=item.parse_source
             )
             db.add(report_item)
             count += 1
 
+        report.parsed_lines = dump_parsed_lines(parse_result.raw_this_week, parse_result.raw_next_week)
         await db.commit()
         logger.info(f"保存周报条目完成: report_id={report.id}, 共{count}条")
 
         return count
 
+    async def save_incremental_items(
+        self,
+        db: AsyncSession,
+        report: Report,
+        parse_result: ParseResult
+    ) -> int:
+        """
+        增量保存改动行的解析结果（parse_result 来自 parse_changed_lines）
+        来源行仍在文本中的条目原样保留（包括用户手动修正的项目），来源行已不存在的条目删除，
+        新条目插入后按来源行在文本中的顺序重新排序（无来源行的条目跟随其前一条目）
+
+        Returns:
+            保存后的条目数量
+        """
+        result = await db.execute(select(ReportItem).where(ReportItem.report_id == report.id))
+        existing = list(result.scalars().all())
+
+        count = 0
+        added_count = removed_count = 0
+        for item_type, text, new_items in (
+            (ItemType.this_week, parse_result.raw_this_week, parse_result.this_week_items),
+            (ItemType.next_week, parse_result.raw_next_week, parse_result.next_week_items)
+        ):
+            lines = split_source_lines(text)
+            line_order: Dict[str, int] = {}
+            for i, line in enumerate(lines):
+                line_order.setdefault(line, i)
+
+            # 保留的条目记下排序位置；无来源行的条目（plan_incremental_parse 已确认其出处未被删改）跟随前一条目
+            kept = []
+            position = -1
+            for item in sorted((i for i in existing if i.item_type == item_type), key=lambda i: i.sequence or 0):
+                if item.source_line is None:
+                    kept.append((position, item))
+                elif item.source_line in line_order:
+                    position = line_order[item.source_line]
+                    kept.append((position, item))
+                else:
+                    await db.delete(item)
+                    removed_count += 1
+
+            added = []
+            for item in new_items:
+                report_item = ReportItem(
+                    report_id=report.id,
+                    item_type=item_type,
+                    project_name=item.project_name,
+                    content=item.content,
+                    source_line=item.source_line,
+                    parse_source=item.parse_source
+                )
+                db.add(report_item)
+                added.append((line_order.get(item.source_line, len(lines)), report_item))
+            added_count += len(added)
+
+            merged = sorted(kept + added, key=lambda entry: entry[0])
+            for seq, (_, item) in enumerate(merged):
+                item.sequence = seq
+            count += len(merged)
+
+        report.parsed_lines = dump_parsed_lines(parse_result.raw_this_week, parse_result.raw_next_week)
+        await db.commit()
+        logger.info(
+            f"增量保存周报条目完成: report_id={report.id}, 新增{added_count}条, "
+            f"删除{removed_count}条, 共{count}条"
+        )
+        return count
+
 
 # 单例
 _parser_service: Optional[ReportParserService] = None
@@ -9,6 +9,7 @@ from app.models.user import User
 from app.models.summary import WeeklySummary
 from app.utils.date_utils import get_week_date_range
 from app.services.llm_service import get_project_extractor
+from app.utils.token_bucket import request_priority, BATCH
 
 # Word 文档中的人员顺序
 PERSON_ORDER = ["杨宁", "翦磊", "朱迪", "张士健", "程志强", "闻世坤", "秦闪闪", "蒋奇朴"]
@@ -116,27 +117,8 @@ def extract_projects_from_text(text: str) -> list:
     从工作内容中提取项目名称（使用 ProjectExtractor 统一逻辑）
     这是降级方案，优先使用 report_items 表中的结构化数据
     """
-    extractor = get_project_extractor()
-    data = extractor.load_known_projects()
-
-    # 构建别名到标准名的映射
-    alias_map = {}
-    for proj in data.get("projects", []):
-        if proj.get("status") == "archived":
-            continue
-        std_name = proj["name"]
-        alias_map[std_name.lower()] = std_name
-        for alias in proj.get("aliases", []):
-            alias_map[alias.lower()] = std_name
-
-    # 提取并归一化
-    found_projects = set()
-    text_lower = text.lower()
-    for keyword, std_name in alias_map.items():
-        if keyword in text_lower:
-            found_projects.add(std_name)
-
-    return list(found_projects)
+    # 一次扫描匹配所有项目名/别名并归一化为标准名
+    return get_project_extractor().knowledge_base().find_projects(text)
 
 
 def categorize_work(text: str) -> str:
@@ -194,8 +176,9 @@ async def trigger_llm_analysis(db: AsyncSession, year: int, week_num: int):
             "next_week_plan": report.next_week_plan or ""
         })
 
-    # 调用 LLM 分析
-    llm_result = await extract_projects_with_llm(reports_for_llm)
+    # 调用 LLM 分析（整周批量抽取，按批量优先级限速）
+    with request_priority(BATCH):
+        llm_result = await extract_projects_with_llm(reports_for_llm)
 
     if llm_result:
         # 保存到数据库缓存
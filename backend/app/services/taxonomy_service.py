@@ -0,0 +1,108 @@
+"""
+项目分类变更传播 - 项目重命名、合并后，把业务表中的项目名一并更新
+
+- 由 ProjectExtractor 的重命名 / 合并 / 删除（指定并入项目时）方法在项目知识库的同一事务中调用，
+  知识库与业务数据要么一起提交、要么一起回滚
+- 周报条目、日报条目、任务的 project_name 按旧名称集合批量 UPDATE（走各表的 idx_*_project 索引），
+  行记忆和周汇总的 LLM 分析缓存同步迁移
+- 删除项目而不指定并入项目时不做任何传播：历史条目、任务和行记忆保留原项目名
+- 项目知识库快照和项目向量索引按知识库版本号自动失效，这里不需要额外处理
+"""
+import json
+import logging
+from typing import Dict, Optional
+
+from sqlalchemy import select, update, or_
+from sqlalchemy.orm import Session
+
+from app.models.report import ReportItem
+from app.models.daily_report import DailyReportItem
+from app.models.task import Task
+from app.models.summary import WeeklySummary
+
+logger = logging.getLogger(__name__)
+
+# 保存项目名的业务表：(统计键, 模型)
+PROJECT_NAME_TABLES = [
+    ("report_items", ReportItem),
+    ("daily_report_items", DailyReportItem),
+    ("tasks", Task),
+]
+
+
+class TaxonomyService:
+    """项目名变更传播"""
+
+    def apply(self, db: Session, mapping: Dict[str, str]) -> Dict[str, int]:
+        """
+        按 {旧名称: 新名称} 更新所有表，在调用方的事务中执行（由调用方提交）
+
+        Returns:
+            各表受影响的行数
+        """
+        from app.services.line_memo_service import get_line_memo_service
+
+        # 按目标分组，每个目标每张表一条 UPDATE ... WHERE project_name IN (...)
+        targets: Dict[str, list] = {}
+        for old_name, new_name in mapping.items():
+            if old_name and new_name and old_name != new_name:
+                targets.setdefault(new_name, []).append(old_name)
+
+        counts = {key: 0 for key, _ in PROJECT_NAME_TABLES}
+        counts.update(line_memo=0, weekly_summary=0)
+        if not targets:
+            return counts
+
+        for target, sources in targets.items():
+            for key, model in PROJECT_NAME_TABLES:
+                result = db.execute(
+                    update(model)
+                    .where(model.project_name.in_(sources))
+                    .values(project_name=target)
+                    .execution_options(synchronize_session=False)
+                )
+                counts[key] += result.rowcount or 0
+            counts["line_memo"] += get_line_memo_service().move_projects(db, sources, target)
+        counts["weekly_summary"] = self._rewrite_summaries(db, mapping)
+
+        logger.info(f"项目名变更已传播: {mapping} -> {counts}")
+        return counts
+
+    def _rewrite_summaries(self, db: Session, mapping: Dict[str, str]) -> int:
+        """周汇总中缓存的 LLM 分析结果（项目参与度）按新名称改写，同名合并计数"""
+        patterns = [f"%{json.dumps(name, ensure_ascii=False)}%" for name in mapping]
+        summaries = db.execute(
+            select(WeeklySummary).where(or_(*[WeeklySummary.llm_analysis.like(p) for p in patterns]))
+        ).scalars().all()
+        rewritten = 0
+        for summary in summaries:
+            try:
+                analysis = json.loads(summary.llm_analysis)
+            except json.JSONDecodeError:
+                continue
+            involvement = analysis.get("project_involvement")
+            if not isinstance(involvement, list):
+                continue
+
+            merged: Dict[str, int] = {}
+            for item in involvement:
+                name = mapping.get(item.get("name")) or item.get("name")
+                if name:
+                    merged[name] = merged.get(name, 0) + (item.get("value") or 0)
+            new_involvement = [{"name": k, "value": v} for k, v in sorted(merged.items(), key=lambda x: -x[1])]
+            if new_involvement != involvement:
+                analysis["project_involvement"] = new_involvement
+                summary.llm_analysis = json.dumps(analysis, ensure_ascii=False)
+                rewritten += 1
+        return rewritten
+
+
+# 单例
+_taxonomy_service: Optional[TaxonomyService] = None
+
+
+def get_taxonomy_service() -> TaxonomyService:
+    global _taxonomy_service
+    if _taxonomy_service is None:
+        _taxonomy_service = TaxonomyService()
+    return _taxonomy_service
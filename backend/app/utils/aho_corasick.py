@@ -0,0 +1,109 @@
+"""
+Aho–Corasick 多模式匹配 - 一次扫描文本找出所有项目名/别名的出现位置
+
+- 构建：模式串组成字典树，BFS 计算失败指针，并把失败链上的输出合并到每个结点
+- 匹配：逐字符沿字典树/失败指针转移，时间 O(文本长度 + 命中数)，与模式数量无关
+- 同一模式可对应多个值（如同名子项属于多个项目），每个值各产生一条命中
+"""
+from typing import Any, Dict, Iterable, List, NamedTuple, Tuple
+
+
+class Match(NamedTuple):
+    """一次命中，start/end 为文本中的切片位置"""
+    start: int
+    end: int
+    pattern: str
+    value: Any
+
+    @property
+    def length(self) -> int:
+        return self.end - self.start
+
+
+class AhoCorasick:
+    """
+    多模式匹配自动机（构建后只读，可在多个协程/线程间共享）
+
+    Args:
+        patterns: (模式串, 值) 序列
+        ignore_case: 忽略大小写（模式和文本都转小写后匹配，位置不变）
+        min_length: 短于该长度的模式忽略，避免单字误命中
+    """
+
+    def __init__(self, patterns: Iterable[Tuple[str, Any]], ignore_case: bool = True, min_length: int = 1):
+        self.ignore_case = ignore_case
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[int, str, Any]]] = [[]]  # 结点 -> [(模式长度, 模式串, 值)]
+        self.pattern_count = 0
+
+        for pattern, value in patterns:
+            if not pattern or len(pattern) < min_length:
+                continue
+            key = pattern.lower() if ignore_case else pattern
+            node = 0
+            for char in key:
+                nxt = self._goto[node].get(char)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][char] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                node = nxt
+            self._output[node].append((len(key), pattern, value))
+            self.pattern_count += 1
+        self._build_fail()
+
+    def _build_fail(self):
+        queue = list(self._goto[0].values())
+        for node in queue:
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def __len__(self) -> int:
+        return self.pattern_count
+
+    def find_all(self, text: str) -> List[Match]:
+        """所有命中（含相互重叠、相互包含的），按结束位置排序"""
+        if not text or not self.pattern_count:
+            return []
+        if self.ignore_case:
+            text = text.lower()
+        matches = []
+        goto, fail, output = self._goto, self._fail, self._output
+        node = 0
+        for i, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for length, pattern, value in output[node]:
+                matches.append(Match(i + 1 - length, i + 1, pattern, value))
+        return matches
+
+    def find_longest(self, text: str) -> List[Match]:
+        """
+        最左最长、互不重叠的命中，按出现位置排序
+        从左到右取起点最靠前的命中，同一起点取最长的；被选中命中覆盖的其余命中丢弃。
+        文本完全相同的多个值（同一模式或大小写不同的模式）一并保留
+        """
+        selected: List[Match] = []
+        covered = 0
+        for match in sorted(self.find_all(text), key=lambda m: (m.start, -m.length)):
+            if match.start >= covered:
+                selected.append(match)
+                covered = match.end
+            elif selected and (match.start, match.end) == (selected[-1].start, selected[-1].end):
+                selected.append(match)
+        return selected
+
+    def values(self, text: str, longest: bool = True) -> List[Any]:
+        """命中的值（去重，按首次出现顺序）"""
+        matches = self.find_longest(text) if longest else self.find_all(text)
+        return list(dict.fromkeys(match.value for match in matches))
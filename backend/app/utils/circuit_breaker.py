@@ -0,0 +1,114 @@
+"""熔断器 - 连续失败的后端在冷却期内直接跳过"""
+import time
+from datetime import datetime
+from threading import Lock
+from typing import Optional
+
+CLOSED = "closed"  # 正常放行
+OPEN = "open"  # 熔断中，直接拒绝
+HALF_OPEN = "half_open"  # 冷却结束，放行一次试探请求
+
+
+class CircuitBreaker:
+    """
+    熔断器
+
+    - 连续失败达到 failure_threshold 次后打开，cooldown_seconds 内拒绝所有请求
+    - 冷却结束后进入半开状态，只放行一个试探请求：成功则关闭，失败则重新打开
+    - 线程安全，可在多个事件循环/线程间共享
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 3, cooldown_seconds: float = 60.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._trial_started = 0.0
+        self._lock = Lock()
+
+        # 统计信息
+        self.total_successes = 0
+        self.total_failures = 0
+        self.last_error: Optional[str] = None
+        self.last_failure_at: Optional[datetime] = None
+        self.last_success_at: Optional[datetime] = None
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.cooldown_seconds:
+            self._state = HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    def allow_request(self) -> bool:
+        """是否放行本次请求"""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            # 试探请求被取消时不会回报结果，超过冷却时间视为作废，允许新的试探
+            if state == HALF_OPEN and (
+                not self._trial_in_flight
+                or time.monotonic() - self._trial_started >= self.cooldown_seconds
+            ):
+                self._trial_in_flight = True
+                self._trial_started = time.monotonic()
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._state = CLOSED
+            self._consecutive_failures = 0
+            self._trial_in_flight = False
+            self.total_successes += 1
+            self.last_success_at = datetime.now()
+
+    def record_failure(self, error: Optional[BaseException] = None):
+        with self._lock:
+            self._consecutive_failures += 1
+            self.total_failures += 1
+            self.last_error = f"{type(error).__name__}: {error}" if error else None
+            self.last_failure_at = datetime.now()
+            if self._state == HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def record_ignored(self):
+        """请求失败但与后端健康无关（如请求本身有误的 4xx）：不计入失败，只结束半开状态的试探"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def reset(self):
+        """手动关闭熔断"""
+        with self._lock:
+            self._state = CLOSED
+            self._consecutive_failures = 0
+            self._trial_in_flight = False
+
+    def snapshot(self) -> dict:
+        """当前状态与统计"""
+        with self._lock:
+            state = self._current_state()
+            remaining = 0
+            if state == OPEN:
+                remaining = max(0, int(self.cooldown_seconds - (time.monotonic() - self._opened_at)))
+            return {
+                "name": self.name,
+                "state": state,
+                "consecutive_failures": self._consecutive_failures,
+                "cooldown_remaining": remaining,
+                "total_successes": self.total_successes,
+                "total_failures": self.total_failures,
+                "last_error": self.last_error,
+                "last_failure_at": self.last_failure_at.isoformat() if self.last_failure_at else None,
+                "last_success_at": self.last_success_at.isoformat() if self.last_success_at else None
+            }
@@ -0,0 +1,258 @@
+"""
+LLM 输出的 JSON 解析
+
+- StreamingItemParser：从流式输出中逐个取出已完整的数组元素
+  适用于 {"key_a": [{...}, {...}], "key_b": [...]} 结构：
+  每当顶层某个数组中的一个对象闭合，立即产出 (数组键名, 对象)，
+  无需等待整个 JSON 输出完毕。根对象之前的 Markdown 代码块标记等多余文字会被忽略。
+- parse_llm_json：解析完整输出，容忍前后多余文字；输出被截断时保留已完整的部分
+- is_complete_llm_json：输出是否为完整可用的 JSON
+"""
+import json
+from typing import Any, Iterator, List, Optional, Sequence, Tuple
+
+# 截断修复时最多尝试的截断点数量（从最后一个往前）
+MAX_REPAIR_ATTEMPTS = 20
+
+# 最多尝试的 JSON 起点数量（说明文字里可能有多个 '{' / '['）
+MAX_START_CANDIDATES = 50
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+def _repair_truncated(text: str) -> Optional[Any]:
+    """
+    修复被截断的 JSON：回退到最后一个完整的数组元素之后，丢弃其后的残缺内容并补齐括号
+    只在数组元素边界截断，残缺的对象整个丢弃，不会得到缺少字段的条目
+    text 须以 '{' 或 '[' 开头；无法修复时返回 None
+    """
+    stack: List[str] = []
+    safe_points: List[Tuple[int, str]] = []  # (截断位置, 需要补齐的括号)
+    in_string = escape = False
+
+    for pos, ch in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            # 数组中新开始的元素不作为截断点（否则会留下空元素）
+            in_array = bool(stack) and stack[-1] == "["
+            stack.append(ch)
+            if not in_array:
+                safe_points.append((pos + 1, "".join(_CLOSERS[c] for c in reversed(stack))))
+        elif ch in "}]":
+            if not stack:
+                break
+            closed = stack.pop()
+            if not stack:
+                break
+            # 闭合的是数组元素，或是对象中的一个数组值
+            if stack[-1] == "[" or closed == "[":
+                safe_points.append((pos + 1, "".join(_CLOSERS[c] for c in reversed(stack))))
+        elif ch == "," and stack and stack[-1] == "[":
+            # 逗号之前是一个完整的数组元素
+            safe_points.append((pos, "".join(_CLOSERS[c] for c in reversed(stack))))
+
+    for end, closers in reversed(safe_points[-MAX_REPAIR_ATTEMPTS:]):
+        try:
+            return json.loads(text[:end] + closers)
+        except json.JSONDecodeError:
+            continue
+    return None
+
+
+def _closing_end(text: str, start: int) -> Optional[int]:
+    """从 start 处的括号开始做括号配对（忽略字符串内的括号），返回配对闭合后的位置，未闭合返回 None"""
+    depth = 0
+    in_string = escape = False
+    for pos in range(start, len(text)):
+        ch = text[pos]
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            depth += 1
+        elif ch in "}]":
+            depth -= 1
+            if depth == 0:
+                return pos + 1
+    return None
+
+
+def _looks_like_json(text: str, start: int) -> bool:
+    """起点之后的第一个非空白字符像 JSON 内容（区别于说明文字里的 "{名称}" 之类）"""
+    rest = text[start + 1:start + 64].lstrip()
+    if not rest:
+        return True
+    if text[start] == "{":
+        return rest[0] in '"}'
+    return rest[0] in '{["]-0123456789tfn'
+
+
+def _has_complete_element(value: Any) -> bool:
+    """结果中至少有一个完整的数组元素（截断修复后只剩空容器视为失败）"""
+    if isinstance(value, list):
+        return bool(value)
+    if isinstance(value, dict):
+        return any(_has_complete_element(v) for v in value.values())
+    return False
+
+
+def _acceptable(value: Any, expected_keys: Sequence[str]) -> bool:
+    if not isinstance(value, (dict, list)):
+        return False
+    if expected_keys:
+        return isinstance(value, dict) and any(key in value for key in expected_keys)
+    return True
+
+
+def _candidates(text: str) -> Iterator[int]:
+    count = 0
+    for pos, ch in enumerate(text):
+        if ch in "{[":
+            yield pos
+            count += 1
+            if count >= MAX_START_CANDIDATES:
+                return
+
+
+def parse_llm_json(text: str, expected_keys: Sequence[str] = ()) -> Tuple[Any, bool]:
+    """
+    解析 LLM 输出中的 JSON
+    - 忽略 JSON 前后的 Markdown 代码块标记和说明文字：依次尝试每个 '{' / '[' 起点，
+      说明文字里的括号解析失败或不含期望的键时继续尝试后面的起点
+    - 输出被截断时丢弃最后一个不完整的元素并补齐括号，保留已完整的内容；
+      修复后没有任何完整元素（或不含期望的键）时视为解析失败，由调用方降级或重试
+
+    Args:
+        expected_keys: 根对象应包含的键（至少一个），为空不校验
+
+    Returns:
+        (解析结果, 是否完整)；被截断修复时第二项为 False
+    Raises:
+        json.JSONDecodeError: 找不到可解析的 JSON
+    """
+    text = text or ""
+    decoder = json.JSONDecoder()
+    covered = 0  # 已成功解析（但不符合要求）的 JSON 的结束位置，其内部的起点不再尝试
+    truncated: Optional[int] = None  # 未闭合的起点，可能是被截断的输出
+
+    for start in _candidates(text):
+        if start < covered:
+            continue
+        try:
+            value, end = decoder.raw_decode(text, start)
+        except json.JSONDecodeError:
+            if _closing_end(text, start) is None and _looks_like_json(text, start):
+                # 未闭合：其后的起点都在它内部，只能按截断修复
+                truncated = start
+                break
+            continue
+        if _acceptable(value, expected_keys):
+            return value, True
+        covered = end
+
+    if truncated is not None:
+        value = _repair_truncated(text[truncated:])
+        if value is not None and _acceptable(value, expected_keys) and _has_complete_element(value):
+            return value, False
+
+    raise json.JSONDecodeError("LLM 输出中没有可用的 JSON", text, 0)
+
+
+def is_complete_llm_json(text: str, expected_keys: Sequence[str] = ()) -> bool:
+    """输出是完整可用的 JSON（未截断，含期望的键），可作为响应缓存的写入条件"""
+    try:
+        _, complete = parse_llm_json(text, expected_keys)
+    except json.JSONDecodeError:
+        return False
+    return complete
+
+
+class StreamingItemParser:
+    """流式数组元素解析器"""
+
+    def __init__(self):
+        self.buffer = ""
+        self._pos = 0
+        self._stack: List[str] = []  # 当前嵌套的容器：'{' 或 '['
+        self._array_keys: List[Optional[str]] = []  # 每个打开的 '[' 对应的顶层键名
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string: Optional[str] = None  # 最近一个完整的字符串字面量（用于识别键名）
+        self._item_start: Optional[int] = None
+        self._finished = False  # 根对象已闭合，之后的内容忽略
+
+    def feed(self, chunk: str) -> List[Tuple[str, dict]]:
+        """
+        追加一段文本，返回本次新闭合的 (数组键名, 对象) 列表
+        """
+        self.buffer += chunk
+        items = []
+        buffer = self.buffer
+
+        while self._pos < len(buffer):
+            ch = buffer[self._pos]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._last_string = buffer[self._string_start + 1:self._pos]
+            elif not self._stack:
+                # 根对象开始前的内容（```json 等）及闭合后的内容直接跳过
+                if ch == "{" and not self._finished:
+                    self._stack.append(ch)
+            elif ch == '"':
+                self._in_string = True
+                self._string_start = self._pos
+            elif ch == "[":
+                # 根对象的直接子数组，键名即上一个字符串
+                is_top_level = self._stack == ["{"]
+                self._array_keys.append(self._last_string if is_top_level else None)
+                self._stack.append(ch)
+            elif ch == "{":
+                if self._stack == ["{", "["] and self._array_keys[-1]:
+                    self._item_start = self._pos
+                self._stack.append(ch)
+            elif ch in "}]":
+                self._stack.pop()
+                if not self._stack:
+                    self._finished = True
+                elif ch == "]":
+                    self._array_keys.pop()
+                elif self._item_start is not None and self._stack == ["{", "["]:
+                    raw = buffer[self._item_start:self._pos + 1]
+                    self._item_start = None
+                    try:
+                        item = json.loads(raw)
+                    except json.JSONDecodeError:
+                        item = None
+                    if isinstance(item, dict):
+                        items.append((self._array_keys[-1], item))
+
+            self._pos += 1
+
+        return items
+
+    @property
+    def complete(self) -> bool:
+        """根对象是否已闭合"""
+        return self._finished
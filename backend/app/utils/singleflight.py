@@ -0,0 +1,119 @@
+"""
+请求合并（single-flight）- 相同键的并发调用只执行一次，其余调用方等待同一结果
+
+- 共享调用以独立 Task 运行，调用方通过 asyncio.shield 等待：
+  单个调用方被取消（如客户端断开）不会取消共享调用
+- 所有调用方都已离开时才取消共享调用，避免无人等待的上游请求继续占用资源
+- 调用结束后立即移除，不缓存结果（结果缓存由各自的缓存服务负责）
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """一次进行中的共享调用"""
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """请求合并器"""
+
+    def __init__(self, name: str = ""):
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+        self.coalesced = 0  # 被合并（未实际发起）的请求数
+
+    def _lookup(self, key: Hashable) -> Optional[_Call]:
+        """查找同一事件循环中仍在进行的调用"""
+        call = self._calls.get(key)
+        if call is None or call.task.done() or call.task.get_loop() is not asyncio.get_running_loop():
+            return None
+        return call
+
+    def _start(self, keys: List[Hashable], coro: Awaitable) -> _Call:
+        call = _Call(asyncio.ensure_future(coro))
+        for key in keys:
+            self._calls[key] = call
+
+        def on_done(task: asyncio.Task):
+            for key in keys:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            # 所有调用方都已离开时异常无人读取，这里读取一次避免 "exception was never retrieved"
+            if not task.cancelled() and task.exception() is not None:
+                logger.debug(f"[{self.name}] 共享调用失败: {task.exception()}")
+
+        call.task.add_done_callback(on_done)
+        return call
+
+    @staticmethod
+    async def _wait(calls: List[_Call]) -> List[Any]:
+        for call in calls:
+            call.waiters += 1
+        try:
+            return await asyncio.gather(*(asyncio.shield(call.task) for call in calls))
+        finally:
+            for call in calls:
+                call.waiters -= 1
+                if call.waiters == 0 and not call.task.done():
+                    call.task.cancel()
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        执行或加入键为 key 的调用
+        Args:
+            key: 请求键，相同键视为相同请求
+            fn: 无参协程函数，仅在没有进行中的调用时执行
+        """
+        call = self._lookup(key)
+        if call is None:
+            call = self._start([key], fn())
+        else:
+            self.coalesced += 1
+        return (await self._wait([call]))[0]
+
+    async def do_many(self, keys: List[Hashable],
+                      fn: Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]]) -> Dict[Hashable, Any]:
+        """
+        批量版本：已有进行中调用的键直接等待，其余键合并为一次 fn(键列表) 调用
+        Args:
+            keys: 请求键列表
+            fn: 协程函数，参数为需要新发起的键列表，返回 {键: 结果}
+        Returns:
+            {键: 结果}，fn 未返回的键不出现在结果中
+        """
+        key_calls: Dict[Hashable, _Call] = {}
+        fresh = []
+        for key in dict.fromkeys(keys):
+            call = self._lookup(key)
+            if call is None:
+                fresh.append(key)
+            else:
+                key_calls[key] = call
+        self.coalesced += len(key_calls)
+
+        if fresh:
+            call = self._start(fresh, fn(fresh))
+            for key in fresh:
+                key_calls[key] = call
+
+        calls = list({id(call): call for call in key_calls.values()}.values())
+        results = dict(zip((id(call) for call in calls), await self._wait(calls)))
+        return {
+            key: results[id(call)][key]
+            for key, call in key_calls.items()
+            if key in results[id(call)]
+        }
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len({id(call) for call in self._calls.values()}),
+            "coalesced": self.coalesced
+        }
@@ -0,0 +1,14 @@
+"""Server-Sent Events 工具"""
+import json
+
+# 禁用代理缓冲，保证事件即时送达浏览器
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",
+}
+
+
+def format_sse(event: str, data) -> str:
+    """格式化一条 SSE 事件，data 序列化为 JSON"""
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    return f"event: {event}\ndata: {payload}\n\n"
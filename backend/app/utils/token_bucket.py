@@ -0,0 +1,207 @@
+"""
+令牌桶限速 - 按请求数（RPM）和 token 数（TPM）两个桶限制上游调用速率
+
+- 调用前按估算 token 数预留，响应后按实际用量结算（多退少补，可透支）
+- 等待中的请求按优先级放行：交互式 < 普通 < 批量，同优先级先到先得；
+  桶不足时高优先级请求排在所有低优先级请求之前
+- 优先级通过上下文变量传递，调用方用 request_priority() 标记，无需逐层传参
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+INTERACTIVE = 0  # 用户正在等待的请求（解析预览）
+NORMAL = 1
+BATCH = 2  # 后台任务（解析队列、批量回填、汇总分析）
+
+PRIORITY_NAMES = {INTERACTIVE: "interactive", NORMAL: "normal", BATCH: "batch"}
+
+_current_priority: ContextVar[int] = ContextVar("rate_priority", default=NORMAL)
+
+
+def current_priority() -> int:
+    return _current_priority.get()
+
+
+@contextmanager
+def request_priority(priority: int):
+    """在 with 块内发起的上游调用使用指定优先级（对其中创建的子任务同样生效）"""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        try:
+            _current_priority.reset(token)
+        except ValueError:
+            # 异步生成器可能在另一个上下文中被关闭（如客户端断开），此时无需恢复
+            pass
+
+
+class _Bucket:
+    """单个令牌桶，rate 为每分钟额度，0 表示不限"""
+
+    def __init__(self, per_minute: int, burst_seconds: float):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, per_minute * burst_seconds / 60.0) if per_minute > 0 else 0.0
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.rate <= 0
+
+    def refill(self, now: float):
+        if not self.unlimited:
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def clamp(self, amount: float) -> float:
+        """单次请求的需求不超过桶容量，否则永远无法放行"""
+        return min(amount, self.capacity)
+
+    def delay_for(self, amount: float) -> float:
+        """攒够 amount 还需等待的秒数"""
+        if self.unlimited:
+            return 0.0
+        return max(0.0, (self.clamp(amount) - self.tokens) / self.rate)
+
+
+class PriorityRateLimiter:
+    """
+    按优先级放行的双令牌桶限速器
+
+    单个事件循环内使用；等待队列由一个调度任务按桶的恢复速度依次放行
+    """
+
+    def __init__(self, name: str, rpm: int, tpm: int, burst_seconds: float = 5.0):
+        self.name = name
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = _Bucket(rpm, burst_seconds)
+        self._tokens = _Bucket(tpm, burst_seconds)
+        self._waiters: List[tuple] = []  # (优先级, 序号, future, token 数)
+        self._seq = itertools.count()
+        self._dispatcher: Optional[asyncio.Task] = None
+
+        # 统计信息
+        self.total_acquired = 0
+        self.total_waited = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    @property
+    def unlimited(self) -> bool:
+        return self._requests.unlimited and self._tokens.unlimited
+
+    def _refill(self):
+        now = time.monotonic()
+        self._requests.refill(now)
+        self._tokens.refill(now)
+
+    def _delay_for(self, tokens: int) -> float:
+        return max(self._requests.delay_for(1), self._tokens.delay_for(tokens))
+
+    def _take(self, tokens: int):
+        self._requests.tokens -= self._requests.clamp(1)
+        self._tokens.tokens -= self._tokens.clamp(tokens)
+
+    async def acquire(self, tokens: int = 0, priority: Optional[int] = None) -> float:
+        """
+        获取一次请求额度（预留 tokens 个 token）
+        Args:
+            priority: 为空时取当前上下文的优先级
+        Returns:
+            排队等待的秒数
+        """
+        self.total_acquired += 1
+        if self.unlimited:
+            return 0.0
+
+        self._refill()
+        if not self._waiters and self._delay_for(tokens) <= 0:
+            self._take(tokens)
+            return 0.0
+
+        priority = current_priority() if priority is None else priority
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future, tokens))
+        if self._dispatcher is None or self._dispatcher.done() or self._dispatcher.get_loop() is not loop:
+            self._dispatcher = loop.create_task(self._dispatch())
+
+        started = time.monotonic()
+        await future
+        waited = time.monotonic() - started
+        self.total_waited += 1
+        self.total_wait_seconds += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        return waited
+
+    async def _dispatch(self):
+        """按优先级依次放行等待中的请求，桶不足时睡到队首请求可放行为止"""
+        while self._waiters:
+            _, _, future, tokens = self._waiters[0]
+            if future.done():  # 等待方已取消
+                heapq.heappop(self._waiters)
+                continue
+            self._refill()
+            delay = self._delay_for(tokens)
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            heapq.heappop(self._waiters)
+            self._take(tokens)
+            future.set_result(None)
+
+    def settle(self, reserved: int, actual: int):
+        """按实际 token 用量结算预留额度"""
+        if self._tokens.unlimited or actual == reserved:
+            return
+        self._refill()
+        self._tokens.tokens = min(
+            self._tokens.capacity,
+            self._tokens.tokens + self._tokens.clamp(reserved) - actual
+        )
+
+    def wait_time(self, tokens: int = 0, priority: int = NORMAL) -> float:
+        """按当前桶余量估算新请求（指定优先级）需要排队的秒数"""
+        if self.unlimited:
+            return 0.0
+        self._refill()
+        ahead = [w for w in self._waiters if not w[2].done() and w[0] <= priority]
+        requests_needed = len(ahead) + 1
+        tokens_needed = sum(self._tokens.clamp(w[3]) for w in ahead) + self._tokens.clamp(tokens)
+        waits = [0.0]
+        if not self._requests.unlimited:
+            waits.append((requests_needed - self._requests.tokens) / self._requests.rate)
+        if not self._tokens.unlimited:
+            waits.append((tokens_needed - self._tokens.tokens) / self._tokens.rate)
+        return max(waits)
+
+    def snapshot(self) -> dict:
+        waiting: Dict[str, int] = {name: 0 for name in PRIORITY_NAMES.values()}
+        for priority, _, future, _ in self._waiters:
+            if not future.done():
+                name = PRIORITY_NAMES.get(priority, str(priority))
+                waiting[name] = waiting.get(name, 0) + 1
+        return {
+            "name": self.name,
+            "rpm": self.rpm,
+            "tpm": self.tpm,
+            "available_requests": None if self._requests.unlimited else round(self._requests.tokens, 2),
+            "available_tokens": None if self._tokens.unlimited else round(self._tokens.tokens),
+            "waiting": waiting,
+            "estimated_wait_seconds": {
+                name: round(self.wait_time(priority=priority), 2) for priority, name in PRIORITY_NAMES.items()
+            },
+            "total_acquired": self.total_acquired,
+            "total_waited": self.total_waited,
+            "avg_wait_seconds": (
+                round(self.total_wait_seconds / self.total_waited, 3) if self.total_waited else 0.0
+            ),
+            "max_wait_seconds": round(self.max_wait_seconds, 3)
+        }
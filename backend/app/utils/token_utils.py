@@ -0,0 +1,10 @@
+"""Token 数估算"""
+
+
+def estimate_tokens(text: str) -> int:
+    """估算中文文本的 token 数（粗略：1个中文字≈1.5 token）"""
+    if not text:
+        return 0
+    chinese_chars = sum(1 for c in text if '\u4e00' <= c <= '\u9fff')
+    other_chars = len(text) - chinese_chars
+    return int(chinese_chars * 1.5 + other_chars * 0.3)
@@ -2,6 +2,8 @@
 补录历史周报的 report_items 数据
 
 将 2025 年的周报内容通过 LLM 解析，填充 project_name 等结构化字段
+多份周报打包成一个请求批量解析（见 ReportParserService.parse_reports_batch），
+加 --reparse 可重新解析已有条目的周报
 """
 import asyncio
 import sys
@@ -13,73 +15,45 @@ sys.stdout.reconfigure(line_buffering=True)
 # 添加项目路径
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from sqlalchemy import select, func
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import async_session
-from app.models.report import Report, ReportItem, ItemType, ReportStatus
+from app.models.report import Report, ReportItem, ReportStatus
 from app.models.user import User
 from app.services.report_parser_service import ReportParserService
+from app.utils.token_bucket import request_priority, BATCH
 import time
 
 
-async def get_reports_without_items(db: AsyncSession, year: int) -> list:
-    """获取没有 report_items 的周报"""
-    # 子查询：已有 items 的 report_id
-    subquery = select(ReportItem.report_id).distinct()
+# 每处理多少份周报保存一次并输出进度
+CHUNK_SIZE = 40
+
+
+async def get_reports_without_items(db: AsyncSession, year: int, include_parsed: bool = False) -> list:
+    """获取没有 report_items 的周报（include_parsed 为 True 时返回全部已提交周报）"""
+    conditions = [Report.year == year, Report.status == ReportStatus.submitted]
+    if not include_parsed:
+        # 子查询：已有 items 的 report_id
+        subquery = select(ReportItem.report_id).distinct()
+        conditions.append(~Report.id.in_(subquery))
 
     result = await db.execute(
         select(Report, User)
         .join(User)
-        .where(
-            Report.year == year,
-            Report.status == ReportStatus.submitted,
-            ~Report.id.in_(subquery)
-        )
+        .where(*conditions)
         .order_by(Report.week_num, User.real_name)
     )
     return result.all()
 
 
-async def save_parsed_items(db: AsyncSession, report_id: int, parse_result):
-    """保存解析结果到 report_items 表（parse_result 是 ParseResult Pydantic 对象）"""
-    count = 0
-
-    # 保存本周工作
-    for i, item in enumerate(parse_result.this_week_items or []):
-        report_item = ReportItem(
-            report_id=report_id,
-            item_type=ItemType.this_week,
-            project_name=item.project_name,
-            content=item.content or "",
-            sequence=i
-        )
-        db.add(report_item)
-        count += 1
-
-    # 保存下周计划
-    for i, item in enumerate(parse_result.next_week_items or []):
-        report_item = ReportItem(
-            report_id=report_id,
-            item_type=ItemType.next_week,
-            project_name=item.project_name,
-            content=item.content or "",
-            sequence=i
-        )
-        db.add(report_item)
-        count += 1
-
-    await db.commit()
-    return count
-
-
-async def backfill_year(year: int, dry_run: bool = False, provider: str = "deepseek"):
+async def backfill_year(year: int, dry_run: bool = False, provider: str = "deepseek", reparse: bool = False):
     """补录指定年份的数据"""
     parser = ReportParserService()
     parser.llm.provider = provider  # 使用指定的 LLM 提供商
     print(f"🤖 LLM 提供商: {provider}")
 
     async with async_session() as db:
-        reports = await get_reports_without_items(db, year)
+        reports = await get_reports_without_items(db, year, include_parsed=reparse)
         total = len(reports)
 
         if total == 0:
@@ -99,31 +73,38 @@ async def backfill_year(year: int, dry_run: bool = False, provider: str = "deeps
         success = 0
         failed = 0
         total_items = 0
+        started = time.time()
 
-        for i, (report, user) in enumerate(reports):
-            try:
-                print(f"[{i+1}/{total}] 处理: 第{report.week_num}周 {user.real_name}...", end=" ", flush=True)
-
-                # 调用 LLM 解析
-                parse_result = await parser.parse_report_text(
-                    report.this_week_work or "",
-                    report.next_week_plan or ""
-                )
-
-                # 保存结果
-                items_count = await save_parsed_items(db, report.id, parse_result)
-                total_items += items_count
-                success += 1
-
-                print(f"✅ {items_count} 条")
-
-                # 限速：避免 API 请求过快
-                if i < total - 1:
-                    await asyncio.sleep(0.5)
+        for start in range(0, total, CHUNK_SIZE):
+            chunk = reports[start:start + CHUNK_SIZE]
+            print(f"[{start + 1}-{start + len(chunk)}/{total}] 批量解析中...", end=" ", flush=True)
 
+            # 调用 LLM 批量解析
+            try:
+                parse_results = await parser.parse_reports_batch([
+                    (report.id, report.this_week_work or "", report.next_week_plan or "")
+                    for report, _ in chunk
+                ])
             except Exception as e:
-                failed += 1
+                failed += len(chunk)
                 print(f"❌ 失败: {e}")
+                continue
+
+            # 保存结果
+            chunk_items = 0
+            for report, user in chunk:
+                try:
+                    # 与在线解析相同的保存逻辑（记录来源行和解析来源，之后修改周报可增量解析）
+                    items_count = await parser.save_parsed_items(db, report, parse_results[report.id])
+                    chunk_items += items_count
+                    success += 1
+                except Exception as e:
+                    await db.rollback()
+                    failed += 1
+                    print(f"\n   ❌ 第{report.week_num}周 {user.real_name} 保存失败: {e}")
+
+            total_items += chunk_items
+            print(f"✅ {chunk_items} 条, 已用时 {time.time() - started:.0f}s")
 
         print(f"\n{'='*50}")
         print(f"📊 补录完成统计:")
@@ -138,6 +119,7 @@ async def main():
     arg_parser = argparse.ArgumentParser(description="补录历史周报的 report_items 数据")
     arg_parser.add_argument("--year", type=int, default=2025, help="要补录的年份 (默认 2025)")
     arg_parser.add_argument("--dry-run", action="store_true", help="仅显示待处理数据，不实际执行")
+    arg_parser.add_argument("--reparse", action="store_true", help="重新解析已有条目的周报（覆盖原条目）")
     arg_parser.add_argument("--provider", type=str, default="deepseek",
                           choices=["deepseek", "dashscope", "qwen"],
                           help="LLM 提供商 (默认 deepseek)")
@@ -151,7 +133,8 @@ async def main():
     print(f"模式: {'Dry Run' if args.dry_run else '实际执行'}")
     print()
 
-    await backfill_year(args.year, dry_run=args.dry_run, provider=args.provider)
+    with request_priority(BATCH):
+        await backfill_year(args.year, dry_run=args.dry_run, provider=args.provider, reparse=args.reparse)
 
 
 if __name__ == "__main__":
@@ -10,6 +10,18 @@ MIGRATIONS = [
     ('users', 'must_change_password', 'BOOLEAN', '1'),
     ('weekly_summary', 'llm_analysis', 'TEXT', None),
     ('weekly_summary', 'analyzed_at', 'DATETIME', None),
+    ('report_items', 'source_line', 'TEXT', None),
+    ('report_items', 'parse_source', 'VARCHAR(20)', None),
+    ('reports', 'parsed_lines', 'TEXT', None),
+    ('daily_report_items', 'parse_source', 'VARCHAR(20)', None),
+    ('parse_jobs', 'locked_by', 'VARCHAR(100)', None),
+    ('parse_jobs', 'locked_at', 'DATETIME', None),
+]
+
+UNIQUE_INDEXES = [
+    # (表名, 索引名, 列名) —— 已存在的普通索引重建为唯一索引
+    ('projects', 'idx_projects_name_key', 'name_key'),
+    ('project_aliases', 'idx_project_aliases_key', 'alias_key'),
 ]
 
 def get_existing_columns(cursor, table):
@@ -23,7 +35,11 @@ def migrate():
         cursor = conn.cursor()
 
         for table, column, col_type, default in MIGRATIONS:
-            if column in get_existing_columns(cursor, table):
+            existing = get_existing_columns(cursor, table)
+            if not existing:
+                print(f"跳过: 表 {table} 不存在（启动应用时按模型创建）")
+                continue
+            if column in existing:
                 print(f"跳过: {table}.{column} 已存在")
                 continue
 
@@ -32,6 +48,25 @@ def migrate():
             print(f"执行迁移: {sql}")
             cursor.execute(sql)
 
+        for table, index, column in UNIQUE_INDEXES:
+            if not get_existing_columns(cursor, table):
+                print(f"跳过: 表 {table} 不存在（启动应用时按模型创建）")
+                continue
+            cursor.execute(f'PRAGMA index_list({table})')
+            if any(row[1] == index and row[2] for row in cursor.fetchall()):
+                print(f"跳过: {table}.{index} 已是唯一索引")
+                continue
+
+            cursor.execute(f'SELECT {column} FROM {table} GROUP BY {column} HAVING COUNT(*) > 1')
+            duplicates = [row[0] for row in cursor.fetchall()]
+            if duplicates:
+                print(f"警告: {table}.{column} 存在重复值，请先在项目管理中处理后重新执行: {duplicates}")
+                continue
+
+            print(f"执行迁移: 重建 {table}.{index} 为唯一索引")
+            cursor.execute(f'DROP INDEX IF EXISTS {index}')
+            cursor.execute(f'CREATE UNIQUE INDEX {index} ON {table} ({column})')
+
         conn.commit()
 
     print("迁移完成!")
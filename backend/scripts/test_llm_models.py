@@ -13,6 +13,8 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from app.services.report_parser_service import ReportParserService
 from app.config import get_settings
+from app.utils.token_utils import estimate_tokens
+from app.utils.json_stream import parse_llm_json
 
 settings = get_settings()
 
@@ -28,13 +30,6 @@ TEST_NEXT_WEEK = """1. 继续清明上河园项目开发
 3. 参加AI升级技术评审"""
 
 
-def estimate_tokens(text: str) -> int:
-    """估算中文文本的 token 数（粗略：1个中文字≈1.5 token）"""
-    chinese_chars = sum(1 for c in text if '\u4e00' <= c <= '\u9fff')
-    other_chars = len(text) - chinese_chars
-    return int(chinese_chars * 1.5 + other_chars * 0.3)
-
-
 async def call_dashscope(prompt: str, system: str, model: str) -> tuple[str, dict]:
     """调用 DashScope API，返回响应和 usage 信息"""
     url = "https://dashscope.aliyuncs.com/compatible-mode/v1/chat/completions"
@@ -146,8 +141,9 @@ async def test_model(model_name: str, provider: str):
         # 尝试解析 JSON
         parse_success = False
         try:
-            cleaned = parser._clean_json_response(response)
-            parsed = json.loads(cleaned)
+            parsed, complete = parse_llm_json(response, ("this_week_items", "next_week_items"))
+            if not complete:
+                print("\n⚠️  输出被截断，仅保留已完整的条目")
             this_week_count = len(parsed.get("this_week_items", []))
             next_week_count = len(parsed.get("next_week_items", []))
             print(f"\n✅ 解析成功: 本周{this_week_count}条, 下周{next_week_count}条")
@@ -1,4 +1,4 @@
-import request from './request'
+import request, { postEventStream } from './request'
 
 export const dailyReportApi = {
   // 获取今日日报
@@ -46,6 +46,13 @@ export const dailyReportApi = {
     }, { timeout: 60000 })
   },
 
+  // 流式解析预览（SSE）：每解析出一条即回调 onEvent('item', item)，结束时 onEvent('done', result)
+  parsePreviewStream(workContent, onEvent) {
+    return postEventStream('/daily-reports/parse-preview/stream', {
+      work_content: workContent
+    }, onEvent)
+  },
+
   // 获取本周日报汇总（用于生成周报）
   getWeekSummary(year, weekNum) {
     const params = {}
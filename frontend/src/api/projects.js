@@ -35,9 +35,11 @@ export const projectsApi = {
     return request.put(`/admin/projects/rename/${encodeURIComponent(name)}`, { new_name: newName })
   },
 
-  // 删除项目
-  deleteProject(name) {
-    return request.delete(`/admin/projects/delete/${encodeURIComponent(name)}`)
+  // 删除项目（mergeInto：历史条目和任务并入的项目，不传则保留原项目名）
+  deleteProject(name, mergeInto) {
+    return request.delete(`/admin/projects/delete/${encodeURIComponent(name)}`, {
+      params: mergeInto ? { merge_into: mergeInto } : undefined
+    })
   },
 
   // ========== 子项目管理 ==========
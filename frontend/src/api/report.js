@@ -1,4 +1,4 @@
-import request from './request'
+import request, { postEventStream } from './request'
 
 export const reportApi = {
   getCurrent() {
@@ -48,6 +48,14 @@ export const reportApi = {
     }, { timeout: 60000 })
   },
 
+  // 流式解析预览（SSE）：每解析出一条即回调 onEvent('item', item)，结束时 onEvent('done', result)
+  parsePreviewStream(thisWeekWork, nextWeekPlan, onEvent) {
+    return postEventStream('/reports/parse-preview/stream', {
+      this_week_work: thisWeekWork,
+      next_week_plan: nextWeekPlan
+    }, onEvent)
+  },
+
   // 管理员查看指定用户的周报
   getUserReports(userId, year) {
     const params = {}
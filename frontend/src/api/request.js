@@ -40,4 +40,47 @@ request.interceptors.response.use(
   }
 )
 
+/**
+ * POST 请求并按 Server-Sent Events 逐条读取响应
+ * @param {string} url 相对 baseURL 的路径
+ * @param {object} data 请求体
+ * @param {(event: string, data: any) => void} onEvent 每收到一条事件回调
+ */
+export async function postEventStream(url, data, onEvent) {
+  const token = localStorage.getItem('token')
+  const response = await fetch(`${baseURL}${url}`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      ...(token ? { Authorization: `Bearer ${token}` } : {})
+    },
+    body: JSON.stringify(data)
+  })
+  if (!response.ok) {
+    throw new Error(`请求失败: ${response.status}`)
+  }
+
+  const reader = response.body.getReader()
+  const decoder = new TextDecoder()
+  let buffer = ''
+  while (true) {
+    const { done, value } = await reader.read()
+    if (done) break
+    buffer += decoder.decode(value, { stream: true })
+    // 事件之间以空行分隔
+    let boundary
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const block = buffer.slice(0, boundary)
+      buffer = buffer.slice(boundary + 2)
+      let event = 'message'
+      let payload = ''
+      for (const line of block.split('\n')) {
+        if (line.startsWith('event:')) event = line.slice(6).trim()
+        else if (line.startsWith('data:')) payload += line.slice(5).trim()
+      }
+      if (payload) onEvent(event, JSON.parse(payload))
+    }
+  }
+}
+
 export default request